@@ -0,0 +1,174 @@
+import glob
+import json
+import os
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+import numpy as np
+from stable_baselines3.common.callbacks import BaseCallback
+
+from training_profile import TrainingProfile
+from simulateur import AdvancedSimulator
+from env import TrainingEnv
+
+
+class ThroughputCallback(BaseCallback):
+    """Mesure le débit de l'environnement (FPS) et le temps de mise à jour des gradients"""
+    def __init__(self, verbose: int = 0):
+        super().__init__(verbose)
+        self.rollout_start = None
+        self.rollout_start_steps = 0
+        self.last_rollout_end = None
+        self.fps_history = []
+        self.update_time_history = []
+
+    def _on_rollout_start(self) -> None:
+        now = time.perf_counter()
+        # Le temps écoulé depuis la fin du rollout précédent correspond à model.train()
+        if self.last_rollout_end is not None:
+            update_time = now - self.last_rollout_end
+            self.update_time_history.append(update_time)
+            self.logger.record("time/gradient_update_s", update_time)
+        self.rollout_start = now
+        self.rollout_start_steps = self.num_timesteps
+
+    def _on_step(self) -> bool:
+        return True
+
+    def _on_rollout_end(self) -> None:
+        now = time.perf_counter()
+        elapsed = max(now - self.rollout_start, 1e-9)
+        fps = (self.num_timesteps - self.rollout_start_steps) / elapsed
+        self.fps_history.append(fps)
+        self.logger.record("time/env_fps", fps)
+        self.last_rollout_end = now
+
+
+def checkpoint_paths(checkpoint_dir: str, name_prefix: str = "ppo_v1") -> List[str]:
+    """Checkpoints existants, du plus ancien au plus récent"""
+    paths = glob.glob(os.path.join(checkpoint_dir, f"{name_prefix}_*_steps.zip"))
+    return sorted(paths, key=lambda p: int(os.path.basename(p).split("_")[-2]))
+
+
+def callback_state_path(checkpoint_path: str) -> str:
+    """Fichier d'état des callbacks associé à un checkpoint"""
+    return checkpoint_path[:-len(".zip")] + ".callbacks.json"
+
+
+class RollingCheckpointCallback(BaseCallback):
+    """
+    Sauvegarde le modèle tous les N pas en ne gardant que les derniers checkpoints.
+    L'état des callbacks de `state_callbacks` (get_state) est écrit à côté de chaque
+    checkpoint ; les checkpoints déjà présents (reprise) comptent dans la rétention.
+    """
+    def __init__(self, save_freq: int, save_dir: str = "checkpoints",
+                 name_prefix: str = "ppo_v1", keep_last: int = 3,
+                 state_callbacks: Optional[Dict[str, BaseCallback]] = None, verbose: int = 0):
+        super().__init__(verbose)
+        self.save_freq = save_freq
+        self.save_dir = save_dir
+        self.name_prefix = name_prefix
+        self.keep_last = keep_last
+        self.state_callbacks = state_callbacks or {}
+        self.saved = deque()
+
+    def _init_callback(self) -> None:
+        os.makedirs(self.save_dir, exist_ok=True)
+        self.saved = deque(checkpoint_paths(self.save_dir, self.name_prefix))
+
+    def _on_step(self) -> bool:
+        if self.n_calls % self.save_freq == 0:
+            path = os.path.join(self.save_dir,
+                                f"{self.name_prefix}_{self.num_timesteps}_steps.zip")
+            # État des callbacks écrit avant le modèle : un checkpoint présent a toujours le sien
+            state_path = callback_state_path(path)
+            with open(state_path + ".tmp", 'w') as f:
+                json.dump({name: callback.get_state() for name, callback in self.state_callbacks.items()}, f)
+            os.replace(state_path + ".tmp", state_path)
+            # Écriture dans un fichier temporaire puis remplacement atomique
+            tmp_path = path + ".tmp"
+            self.model.save(tmp_path)
+            os.replace(tmp_path, path)
+            if path not in self.saved:
+                self.saved.append(path)
+            if self.verbose > 0:
+                print(f"Checkpoint sauvegardé : {path}")
+
+            # Rétention : supprimer les plus anciens
+            while len(self.saved) > self.keep_last:
+                old_path = self.saved.popleft()
+                for stale in (old_path, callback_state_path(old_path)):
+                    if os.path.exists(stale):
+                        os.remove(stale)
+        return True
+
+
+class PlateauEvalCallback(BaseCallback):
+    """
+    Évaluation déterministe périodique sur des profils réservés,
+    avec arrêt anticipé quand la récompense d'évaluation stagne
+    """
+    def __init__(self, eval_profiles: List[TrainingProfile], eval_freq: int = 10000,
+                 patience: int = 5, min_delta: float = 1.0,
+                 best_model_path: Optional[str] = None, verbose: int = 0):
+        super().__init__(verbose)
+        self.eval_envs = [TrainingEnv(AdvancedSimulator(profile)) for profile in eval_profiles]
+        self.eval_freq = eval_freq
+        self.patience = patience
+        self.min_delta = min_delta
+        self.best_model_path = best_model_path
+        self.best_reward = -np.inf
+        self.evals_without_improvement = 0
+        self.eval_history = []
+
+    def get_state(self) -> Dict:
+        """État de l'arrêt anticipé, sauvegardé avec les checkpoints"""
+        return {'best_reward': self.best_reward,
+                'evals_without_improvement': self.evals_without_improvement,
+                'eval_history': self.eval_history}
+
+    def set_state(self, state: Dict) -> None:
+        self.best_reward = state['best_reward']
+        self.evals_without_improvement = state['evals_without_improvement']
+        self.eval_history = [tuple(entry) for entry in state['eval_history']]
+
+    def _evaluate(self) -> float:
+        rewards = []
+        for env in self.eval_envs:
+            obs, _ = env.reset()
+            total_reward = 0.0
+            done = False
+            while not done:
+                action, _ = self.model.predict(obs, deterministic=True)
+                obs, reward, terminated, truncated, _ = env.step(action)
+                total_reward += reward
+                done = terminated or truncated
+            rewards.append(total_reward)
+        return float(np.mean(rewards))
+
+    def _on_step(self) -> bool:
+        if self.n_calls % self.eval_freq != 0:
+            return True
+
+        mean_reward = self._evaluate()
+        self.eval_history.append((self.num_timesteps, mean_reward))
+        self.logger.record("eval/mean_reward", mean_reward)
+
+        if mean_reward > self.best_reward + self.min_delta:
+            self.best_reward = mean_reward
+            self.evals_without_improvement = 0
+            if self.best_model_path is not None:
+                self.model.save(self.best_model_path)
+        else:
+            self.evals_without_improvement += 1
+
+        if self.verbose > 0:
+            print(f"Évaluation à {self.num_timesteps} pas : {mean_reward:.2f} "
+                  f"(meilleure : {self.best_reward:.2f})")
+
+        if self.evals_without_improvement >= self.patience:
+            if self.verbose > 0:
+                print(f"Arrêt anticipé : pas d'amélioration depuis {self.patience} évaluations")
+            return False
+        return True
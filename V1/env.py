@@ -19,7 +19,7 @@ class TrainingEnv(gym.Env):
 
     def reset(self, *, seed=None, options=None):
         self.np_random, seed = gym.utils.seeding.np_random(seed)
-        self.state = self.simulateur.reset()
+        self.state = self.simulateur.reset(seed)
         return self.state, {}
 
     def step(self, action):
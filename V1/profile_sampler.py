@@ -0,0 +1,120 @@
+import json
+import os
+from typing import Dict, Tuple
+
+import numpy as np
+
+# Plages de tirage des profils (bornes incluses pour les entiers)
+DEFAULT_RANGES = {
+    'volume_initial': (20.0, 40.0),
+    'intensite_moyenne': (5.0, 7.0),
+    'progression': (0.05, 0.15),
+    'recovery_every': (3, 5),    # récupération toutes les n semaines (TrainingProfile : 4), cadence élargie
+    'semaines_totales': (8, 12),  # 12 semaines au plus : time_remaining reste dans l'espace d'observation
+    'taper_weeks': (1, 3),       # semaines d'affûtage en fin de plan
+}
+PARAM_NAMES = ('volume_initial', 'intensite_moyenne', 'progression', 'recovery_every',
+               'semaines_totales', 'tapering_start')
+
+
+def weekly_loads(volume_initial: np.ndarray, intensite_moyenne: np.ndarray, progression: np.ndarray,
+                 recovery_every: np.ndarray, semaines_totales: np.ndarray, tapering_start: np.ndarray,
+                 max_weeks: int) -> np.ndarray:
+    """
+    Charges hebdomadaires (N, max_weeks) de N profils ; NaN après la fin de chaque plan.
+    Volume ×0.85 à partir de tapering_start et les semaines multiples de recovery_every,
+    sinon ×(1 + progression). TrainingProfile._calculate_weekly_loads applique la même
+    règle avec une récupération fixe toutes les 4 semaines (sa branche %8 est
+    inatteignable) : recovery_every = 4 redonne exactement ses charges, la plage de
+    DEFAULT_RANGES élargit la cadence pour la domain randomization.
+    """
+    weeks = np.arange(1, max_weeks + 1)
+    taper = weeks >= tapering_start[:, None]
+    recovery = weeks % recovery_every[:, None] == 0
+    factors = np.where(taper | recovery, 0.85, 1 + progression[:, None])
+    loads = volume_initial[:, None] * np.cumprod(factors, axis=1) * intensite_moyenne[:, None]
+    loads[weeks > semaines_totales[:, None]] = np.nan
+    return loads
+
+
+class SampledProfile:
+    """Vue légère d'une ligne de ProfileTable, utilisable à la place de TrainingProfile"""
+    def __init__(self, charges_hebdo: np.ndarray, params: Dict[str, float]):
+        self.charges_hebdo = charges_hebdo
+        for name, value in params.items():
+            setattr(self, name, value)
+
+
+class ProfileTable:
+    """
+    Table de profils d'entraînement aléatoires (domain randomization) : charges
+    hebdomadaires cibles (N, semaines) et paramètres de chaque profil, générées en
+    une passe vectorisée et mises en cache sur disque par graine.
+    """
+    def __init__(self, directory: str):
+        self.directory = directory
+        with open(os.path.join(directory, "meta.json")) as f:
+            self.meta = json.load(f)
+        # Chargées en mémoire : quelques Mo même pour des centaines de milliers de profils
+        self.loads = np.load(os.path.join(directory, "loads.npy"))
+        self.params = np.load(os.path.join(directory, "params.npy"))
+        self.n_weeks = self.params[:, PARAM_NAMES.index('semaines_totales')].astype(np.int64)
+
+    def __len__(self) -> int:
+        return len(self.loads)
+
+    def profile(self, i: int) -> SampledProfile:
+        """Profil i ; charges_hebdo est une vue sur la table (aucune copie)"""
+        return SampledProfile(self.loads[i, :self.n_weeks[i]],
+                              dict(zip(PARAM_NAMES, self.params[i].tolist())))
+
+    def sample(self, rng: np.random.Generator) -> SampledProfile:
+        return self.profile(int(rng.integers(len(self))))
+
+    @staticmethod
+    def sample_params(n: int, rng: np.random.Generator,
+                      ranges: Dict[str, Tuple[float, float]] = None) -> Dict[str, np.ndarray]:
+        ranges = dict(DEFAULT_RANGES, **(ranges or {}))
+        params = {name: rng.uniform(*ranges[name], size=n)
+                  for name in ('volume_initial', 'intensite_moyenne', 'progression')}
+        for name in ('recovery_every', 'semaines_totales', 'taper_weeks'):
+            low, high = ranges[name]
+            params[name] = rng.integers(low, high + 1, size=n)
+        params['tapering_start'] = params['semaines_totales'] - params.pop('taper_weeks') + 1
+        return params
+
+    @classmethod
+    def generate(cls, directory: str, n_profiles: int = 100000, seed: int = 0,
+                 ranges: Dict[str, Tuple[float, float]] = None) -> "ProfileTable":
+        os.makedirs(directory, exist_ok=True)
+        rng = np.random.default_rng(seed)
+        params = cls.sample_params(n_profiles, rng, ranges)
+        max_weeks = int(params['semaines_totales'].max())
+        loads = weekly_loads(max_weeks=max_weeks, **params)
+
+        np.save(os.path.join(directory, "loads.npy"), loads.astype(np.float32))
+        np.save(os.path.join(directory, "params.npy"),
+                np.column_stack([params[name] for name in PARAM_NAMES]).astype(np.float64))
+        # Les métadonnées sont écrites en dernier : leur présence marque une table complète
+        with open(os.path.join(directory, "meta.json"), 'w') as f:
+            json.dump(cls._meta(n_profiles, seed, ranges), f)
+        return cls(directory)
+
+    @staticmethod
+    def _meta(n_profiles: int, seed: int, ranges) -> Dict:
+        ranges = dict(DEFAULT_RANGES, **(ranges or {}))
+        return {'n_profiles': n_profiles, 'seed': seed,
+                'ranges': {name: list(bounds) for name, bounds in sorted(ranges.items())}}
+
+    @classmethod
+    def get_or_create(cls, directory: str, n_profiles: int = 100000, seed: int = 0,
+                      ranges: Dict[str, Tuple[float, float]] = None) -> "ProfileTable":
+        """Ouvre la table si elle existe avec les mêmes paramètres, sinon la génère"""
+        meta_path = os.path.join(directory, "meta.json")
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+            if meta == cls._meta(n_profiles, seed, ranges):
+                return cls(directory)
+            os.remove(meta_path)
+        return cls.generate(directory, n_profiles, seed, ranges)
@@ -2,10 +2,15 @@ import numpy as np
 from dataclasses import dataclass
 from typing import List, Tuple, Optional, Dict
 from training_profile import TrainingProfile
+from profile_sampler import ProfileTable
 
 class AdvancedSimulator:
-   def __init__(self, profile: Optional[TrainingProfile] = None):
+   def __init__(self, profile: Optional[TrainingProfile] = None,
+                profile_table: Optional[ProfileTable] = None, seed: Optional[int] = None):
        self.profile = profile or TrainingProfile()
+       # Domain randomization : un profil de la table est tiré à chaque reset
+       self.profile_table = profile_table
+       self.rng = np.random.default_rng(seed)
        # Pour suivre les séances de la semaine
        self.current_week_sessions = {
            'intensive': 0,  # Nombre de séances intensives
@@ -14,8 +19,12 @@ class AdvancedSimulator:
        self.week_history = []  # Historique des séances
        self.reset()
 
-   def reset(self):
-       """Réinitialise le simulateur"""
+   def reset(self, seed: Optional[int] = None):
+       """Réinitialise le simulateur (et tire un nouveau profil si une table est fournie)"""
+       if seed is not None:
+           self.rng = np.random.default_rng(seed)
+       if self.profile_table is not None:
+           self.profile = self.profile_table.sample(self.rng)
        self.fitness = 50
        self.fatigue = 10
        self.form = self.fitness - self.fatigue  # Forme initiale
@@ -23,7 +32,7 @@ class AdvancedSimulator:
        self.week_day = 0
        self.weekly_load = 0  # Charge accumulée cette semaine
        self.target_load = self.profile.charges_hebdo[0]
-       self.time_remaining = 84
+       self.time_remaining = 7 * len(self.profile.charges_hebdo)
        self.consecutive_rest = 0
        self.week_history = []
        self.current_week_sessions = {
@@ -1,20 +1,9 @@
-from training_profile import TrainingProfile
-from simulateur import AdvancedSimulator
-from env import TrainingEnv
-from stable_baselines3 import PPO
-from stable_baselines3.common.vec_env import DummyVecEnv
+from train import train_ppo
 import numpy as np
 
-# Création du profil et du simulateur
-profile = TrainingProfile()
-simulateur = AdvancedSimulator(profile)
-
-# Initialisation de l'environnement vectorisé
-vec_env = DummyVecEnv([lambda: TrainingEnv(simulateur)])
-
-# Initialisation et entraînement du modèle
-model = PPO("MlpPolicy", vec_env, verbose=1)
-model.learn(total_timesteps=500000)
+# Entraînement avec télémétrie, checkpoints et arrêt anticipé
+# (le modèle final est sauvegardé dans training_model_v1.zip)
+model, vec_env = train_ppo(total_timesteps=500000)
 
 # Test du modèle entraîné
 print("\nGénération du programme d'entraînement sur 84 jours :")
@@ -62,6 +51,3 @@ for day in range(84):
     if done:
         print("Simulation terminée.")
         break
-
-# Sauvegarder le modèle
-model.save("training_model_v1")
\ No newline at end of file
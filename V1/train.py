@@ -0,0 +1,92 @@
+import json
+import os
+from typing import List, Optional
+
+from stable_baselines3 import PPO
+from stable_baselines3.common.callbacks import CallbackList
+from stable_baselines3.common.vec_env import DummyVecEnv
+
+from training_profile import TrainingProfile
+from simulateur import AdvancedSimulator
+from profile_sampler import ProfileTable
+from env import TrainingEnv
+from callbacks import (ThroughputCallback, RollingCheckpointCallback, PlateauEvalCallback,
+                       callback_state_path, checkpoint_paths)
+
+
+def make_holdout_profiles() -> List[TrainingProfile]:
+    """Profils réservés à l'évaluation, différents du profil d'entraînement"""
+    return [
+        TrainingProfile(volume_initial=25, progression=0.10, tapering_start=10),
+        TrainingProfile(volume_initial=35, progression=0.08, tapering_start=11),
+        TrainingProfile(volume_initial=30, progression=0.15, tapering_start=9),
+    ]
+
+
+def latest_checkpoint(checkpoint_dir: str, name_prefix: str = "ppo_v1") -> Optional[str]:
+    """Retourne le checkpoint le plus récent, ou None s'il n'y en a pas"""
+    paths = checkpoint_paths(checkpoint_dir, name_prefix)
+    return paths[-1] if paths else None
+
+
+def train_ppo(total_timesteps: int = 500000,
+              checkpoint_dir: str = "checkpoints",
+              save_freq: int = 20000,
+              keep_last: int = 3,
+              eval_freq: int = 10000,
+              patience: int = 5,
+              min_delta: float = 1.0,
+              resume: bool = True,
+              output_path: str = "training_model_v1",
+              n_profiles: Optional[int] = None,
+              profile_seed: int = 0,
+              profile_dir: str = "profiles",
+              verbose: int = 1):
+    """
+    Entraîne PPO avec télémétrie, checkpoints glissants et arrêt anticipé.
+    Avec n_profiles, chaque épisode tire un profil dans une table aléatoire
+    précalculée (mise en cache dans profile_dir) au lieu du profil par défaut.
+    """
+    profile = TrainingProfile()
+    profile_table = None
+    if n_profiles:
+        profile_table = ProfileTable.get_or_create(os.path.join(profile_dir, f"seed_{profile_seed}"),
+                                                   n_profiles, seed=profile_seed)
+    simulateur = AdvancedSimulator(profile, profile_table=profile_table, seed=profile_seed)
+    vec_env = DummyVecEnv([lambda: TrainingEnv(simulateur)])
+
+    # Reprise après un crash depuis le dernier checkpoint
+    checkpoint = latest_checkpoint(checkpoint_dir) if resume else None
+    if checkpoint is not None:
+        print(f"Reprise depuis {checkpoint}")
+        model = PPO.load(checkpoint, env=vec_env, verbose=verbose)
+    else:
+        model = PPO("MlpPolicy", vec_env, verbose=verbose)
+
+    plateau = PlateauEvalCallback(make_holdout_profiles(), eval_freq=eval_freq,
+                                  patience=patience, min_delta=min_delta,
+                                  best_model_path=os.path.join(checkpoint_dir, "best_model"),
+                                  verbose=verbose)
+    # L'arrêt anticipé reprend là où le checkpoint l'a laissé (meilleure récompense, patience)
+    if checkpoint is not None and os.path.exists(callback_state_path(checkpoint)):
+        with open(callback_state_path(checkpoint)) as f:
+            plateau.set_state(json.load(f)['plateau'])
+
+    # L'évaluation passe avant le checkpoint : un checkpoint pris au même pas inclut son résultat
+    callbacks = CallbackList([
+        ThroughputCallback(),
+        plateau,
+        RollingCheckpointCallback(save_freq, checkpoint_dir, keep_last=keep_last,
+                                  state_callbacks={'plateau': plateau}, verbose=verbose),
+    ])
+
+    model.learn(total_timesteps=total_timesteps - model.num_timesteps,
+                callback=callbacks,
+                reset_num_timesteps=checkpoint is None)
+
+    model.save(output_path)
+    return model, vec_env
+
+
+if __name__ == "__main__":
+    train_ppo()
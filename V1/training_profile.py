@@ -4,12 +4,17 @@ from dataclasses import dataclass
 @dataclass
 class TrainingProfile:
     """Profil de charge sur 12 semaines"""
-    def __init__(self):
-        self.semaines_totales = 12
-        self.volume_initial = 30
-        self.intensite_moyenne = 6
-        self.progression = 0.12
-        self.tapering_start = 10
+    def __init__(self,
+                 semaines_totales: int = 12,
+                 volume_initial: float = 30,
+                 intensite_moyenne: float = 6,
+                 progression: float = 0.12,
+                 tapering_start: int = 10):
+        self.semaines_totales = semaines_totales
+        self.volume_initial = volume_initial
+        self.intensite_moyenne = intensite_moyenne
+        self.progression = progression
+        self.tapering_start = tapering_start
         self.charges_hebdo = self._calculate_weekly_loads()
         
     def _calculate_weekly_loads(self):
@@ -1,6 +1,5 @@
 # agent.py
 import numpy as np
-import tensorflow as tf
 from collections import deque
 import random
 
@@ -22,6 +21,9 @@ class DQNAgent:
         self.model = self._build_model()
         
     def _build_model(self):
+        # Import différé : TensorFlow n'est chargé qu'à la construction du réseau
+        import tensorflow as tf
+        
         model = tf.keras.Sequential([
             tf.keras.layers.Dense(64, input_dim=self.state_size, activation='relu'),
             tf.keras.layers.Dense(64, activation='relu'),
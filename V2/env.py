@@ -1,5 +1,7 @@
 import numpy as np
 
+from physio import get_engine, performance, forme
+
 class MarathonEnv:
     def __init__(self):
         # État initial
@@ -69,17 +71,18 @@ class MarathonEnv:
         effort = (action['volume'] * action['intensity']) / 100  # Division pour réduire l'échelle
         
         if action['type'] == 'rest':
-            new_state['fatigue'] = self.state['fatigue'] * np.exp(-1/self.tau_fatigue)
-            new_state['fitness'] = self.state['fitness'] * np.exp(-1/self.tau_fitness)
-        else:
-            new_state['fatigue'] = (effort + np.exp(-1/self.tau_fatigue) * self.state['fatigue'])
-            new_state['fitness'] = (effort + np.exp(-1/self.tau_fitness) * self.state['fitness'])
+            effort = 0.0
+        
+        # Modèle de Banister partagé (décroissances précalculées)
+        engine = get_engine(self.tau_fitness, self.tau_fatigue)
+        new_state['fitness'], new_state['fatigue'] = engine.step(
+            self.state['fitness'], self.state['fatigue'], effort)
         
         # Calcul des métriques dérivées
-        new_state['performance'] = (new_state['fitness'] - new_state['fatigue'])/2
+        new_state['performance'] = performance(new_state['fitness'], new_state['fatigue'])
         if new_state['performance'] < 0.05:  # Seuil minimal plus bas
             new_state['performance'] = 0.05
-        new_state['form'] = new_state['fitness'] - 2*new_state['fatigue']
+        new_state['form'] = forme(new_state['fitness'], new_state['fatigue'])
         
         # Borner les valeurs
         new_state['fatigue'] = min(1.0, max(0.0, new_state['fatigue']))
@@ -119,9 +122,10 @@ class MarathonEnv:
             
         return reward
 
-# Test de l'environnement
-env = MarathonEnv()
-print("État initial:", env.state)
+if __name__ == "__main__":
+    # Test de l'environnement
+    env = MarathonEnv()
+    print("État initial:", env.state)
 
 # # Test avec différentes séances
 # week_plan = [
@@ -1,7 +1,8 @@
 import numpy as np
-import matplotlib.pyplot as plt
 from copy import deepcopy
 
+from physio import get_engine, performance, forme
+
 class MarathonEnv:
     def __init__(self):
         self.state = {
@@ -63,17 +64,17 @@ class MarathonEnv:
         effort = (action['volume'] * action['intensity']) / 100
         
         if action['type'] == 'rest':
-            new_state['fatigue'] = self.state['fatigue'] * np.exp(-1/self.tau_fatigue)
-            new_state['fitness'] = self.state['fitness'] * np.exp(-1/self.tau_fitness)
-        else:
-            new_state['fatigue'] = (effort + np.exp(-1/self.tau_fatigue) * self.state['fatigue'])
-            new_state['fitness'] = (effort + np.exp(-1/self.tau_fitness) * self.state['fitness'])
+            effort = 0.0
+            
+        engine = get_engine(self.tau_fitness, self.tau_fatigue)
+        new_state['fitness'], new_state['fatigue'] = engine.step(
+            self.state['fitness'], self.state['fatigue'], effort)
             
-        new_state['performance'] = (new_state['fitness'] - new_state['fatigue'])/2
+        new_state['performance'] = performance(new_state['fitness'], new_state['fatigue'])
         if new_state['performance'] < 0.05:
             new_state['performance'] = 0.05
             
-        new_state['form'] = new_state['fitness'] - 2*new_state['fatigue']
+        new_state['form'] = forme(new_state['fitness'], new_state['fatigue'])
         
         new_state['fatigue'] = min(1.0, max(0.0, new_state['fatigue']))
         new_state['fitness'] = min(1.0, max(0.0, new_state['fitness']))
@@ -182,6 +183,8 @@ def test_scenarios():
 
 def plot_training_response(history):
     """Visualise l'évolution des métriques"""
+    import matplotlib.pyplot as plt
+    
     plt.figure(figsize=(12,8))
     plt.plot(history['fitness'], label='Fitness', marker='o')
     plt.plot(history['fatigue'], label='Fatigue', marker='o')
@@ -2,11 +2,26 @@ from dataclasses import dataclass
 from typing import Dict, List, Tuple
 from enum import Enum
 import numpy as np
-from collections import defaultdict
+from collections import defaultdict, deque
 import random
 import json
+import ast
 from queue import PriorityQueue
-from typing import Tuple, Dict, Set
+from typing import Tuple, Dict, Set, Iterable
+import sys
+import threading
+import itertools
+import time
+from contextlib import nullcontext
+from physio import get_engine, performance, forme
+from state_encoder import StateEncoder
+from tile_coding import TileCodingQ
+from world_model import WorldModel
+from background_planner import BackgroundPlanner
+from model_solver import solve_model
+from action_space import action_equivalence_classes, reduction_report
+from workload import WorkloadTracker
+from weather import WeatherBank, CONDITION_VALUES
 
 class TrainingType(Enum):
     """ Type d'entrainement possible par l'environement """
@@ -56,28 +71,49 @@ class ModelPriorityQueue:
         self.pq = PriorityQueue()
         self.theta = theta
         self.seen_items = set()  # Pour éviter les doublons
+        # Journal des opérations depuis le dernier checkpoint (None : désactivé) :
+        # [priorité, état-action] par insertion, un entier par suite de retraits
+        self.changes = None
     
     def push(self, priority: float, state_action: Tuple):
         if priority > self.theta and state_action not in self.seen_items:
             # Priorité négative car PriorityQueue est min heap
             self.pq.put((-priority, state_action))
             self.seen_items.add(state_action)
+            if self.changes is not None:
+                self.changes.append([priority, state_action])
     
     def pop(self) -> Tuple[float, Tuple]:
         if not self.pq.empty():
             priority, state_action = self.pq.get()
             self.seen_items.remove(state_action)
+            if self.changes is not None:
+                if self.changes and isinstance(self.changes[-1], int):
+                    self.changes[-1] += 1
+                else:
+                    self.changes.append(1)
             return -priority, state_action
         return None
     
     def empty(self) -> bool:
         return self.pq.empty()
+    
+    def peek_priority(self) -> float:
+        """Plus grande priorité en attente (None si la file est vide)"""
+        if self.pq.empty():
+            return None
+        return -self.pq.queue[0][0]
+    
+    def __len__(self) -> int:
+        return self.pq.qsize()
 
 class MarathonTrainingState:
     def __init__(self):
         # Paramètres du modèle de Bannister
         self.tau_fatigue = 15  # constante de temps fatigue
         self.tau_fitness = 45  # constante de temps fitness
+        self.k_fatigue = 1.0   # gain fatigue
+        self.k_fitness = 1.0   # gain fitness
         
         # États du modèle
         self.fitness = 0.0
@@ -88,10 +124,11 @@ class MarathonTrainingState:
         # Autres attributs
         self.fc_repos = 60
         self.vma = 15.0
-        self.volume_hebdo = 0.0
+        self.volume_hebdo = 0.0  # heures sur les 7 derniers jours
         self.derniers_entrainements = []
         self.blessures_actives = []
-        self.risque_blessure = 0.0
+        self.risque_blessure = 0.0  # dérivé du ratio charge aiguë:chronique
+        self.charges = WorkloadTracker()
         self.jours_avant_marathon = 120
         self.meteo = WeatherCondition.IDEAL
         self.temperature = 20.0
@@ -99,13 +136,52 @@ class MarathonTrainingState:
 
     def update_bannister(self, effort: float):
         """Met à jour le modèle de Bannister après un entraînement"""
-        # Mise à jour fatigue et fitness selon vos formules
-        self.fatigue = effort + np.exp(-1/self.tau_fatigue) * self.fatigue
-        self.fitness = effort + np.exp(-1/self.tau_fitness) * self.fitness
+        # Mise à jour fatigue et fitness via le moteur partagé (décroissances précalculées)
+        engine = get_engine(self.tau_fitness, self.tau_fatigue, self.k_fitness, self.k_fatigue)
+        self.fitness, self.fatigue = engine.step(self.fitness, self.fatigue, effort)
         
         # Calcul des indicateurs
-        self.performance = (self.fitness - self.fatigue) / 2
-        self.forme = self.fitness - 2 * self.fatigue
+        self.performance = performance(self.fitness, self.fatigue)
+        self.forme = forme(self.fitness, self.fatigue)
+
+    def update_workload(self, training_load: float, duree: int):
+        """Met à jour les charges glissantes 7 j / 28 j et le risque de blessure"""
+        self.charges.update(training_load, duree)
+        self.volume_hebdo = float(self.charges.weekly_hours)
+        self.risque_blessure = float(self.charges.risk)
+
+    @property
+    def acwr(self) -> float:
+        """Ratio charge aiguë:chronique"""
+        return float(self.charges.acwr)
+
+    # Champs scalaires échangés par to_dict / from_dict
+    SERIALIZED_FIELDS = ('tau_fatigue', 'tau_fitness', 'k_fatigue', 'k_fitness', 'fitness', 'fatigue',
+                         'performance', 'forme', 'fc_repos', 'vma', 'volume_hebdo', 'risque_blessure',
+                         'jours_avant_marathon', 'temperature')
+
+    def to_dict(self) -> Dict:
+        """État sérialisable en JSON (les charges glissantes ne sont pas transmises)"""
+        data = {name: getattr(self, name) for name in self.SERIALIZED_FIELDS}
+        data['meteo'] = self.meteo.value
+        data['derniers_entrainements'] = [t.value for t in self.derniers_entrainements]
+        data['zones_fc'] = {name: list(zone) for name, zone in self.zones_fc.__dict__.items()}
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "MarathonTrainingState":
+        """État reconstruit depuis to_dict() ; les champs absents gardent leur valeur par défaut"""
+        state = cls()
+        for name in cls.SERIALIZED_FIELDS:
+            if name in data:
+                setattr(state, name, data[name])
+        if 'meteo' in data:
+            state.meteo = WeatherCondition(data['meteo'])
+        if 'derniers_entrainements' in data:
+            state.derniers_entrainements = [TrainingType(t) for t in data['derniers_entrainements']]
+        if 'zones_fc' in data:
+            state.zones_fc = TrainingZones(**{name: tuple(zone) for name, zone in data['zones_fc'].items()})
+        return state
 
     def discretize(self) -> tuple:
         """Discrétise l'état pour le Q-learning"""
@@ -140,8 +216,19 @@ class TrainingAction:
         )
 
 class MarathonEnvironment:
-    def __init__(self):
-        self.state = MarathonTrainingState()
+    # Conditions météo indexées par leur code dans la banque de scénarios
+    WEATHER_BY_CODE = [WeatherCondition(value) for value in CONDITION_VALUES]
+
+    def __init__(self, athlete_params: Dict[str, float] = None,
+                 weather_bank: WeatherBank = None):
+        # Paramètres de Banister propres à l'athlète (tau_fitness, tau_fatigue, k_fitness, k_fatigue)
+        self.athlete_params = dict(athlete_params or {})
+        # Banque de scénarios météo précalculés (sans banque : temps idéal, 20 °C)
+        self.weather_bank = weather_bank
+        self.weather = None
+        self.weather_index = None
+        self.day = 0
+        self.state = self._initial_state()
         self.history = []
         
         # Définition des zones appropriées par type d'entraînement
@@ -172,18 +259,48 @@ class MarathonEnvironment:
             TrainingType.FORCE: [30, 45]
         }
     
-    def reset(self):
-        self.state = MarathonTrainingState()
+    def _initial_state(self) -> MarathonTrainingState:
+        state = MarathonTrainingState()
+        for param, value in self.athlete_params.items():
+            setattr(state, param, value)
+        return state
+
+    def reset(self, seed: int = None):
+        """Réinitialise l'épisode ; `seed` choisit le scénario météo dans la banque"""
+        self.state = self._initial_state()
         self.history = []
+        self.day = 0
+        if self.weather_bank is not None:
+            if seed is None:
+                seed = random.randrange(len(self.weather_bank))
+            self.weather_index = seed % len(self.weather_bank)
+            self.weather = self.weather_bank.scenario(seed)
+            self._apply_weather(self.state, 0)
         return self.state
+
+    def _apply_weather(self, state: MarathonTrainingState, day: int):
+        conditions, temperature, _ = self.weather
+        day = min(day, len(conditions) - 1)
+        state.meteo = self.WEATHER_BY_CODE[conditions[day]]
+        state.temperature = float(temperature[day])
+
+    def _weather_load_factor(self) -> float:
+        """Multiplicateur de charge dû à la météo du jour (précalculé dans la banque)"""
+        if self.weather is None:
+            return 1.0
+        load_factor = self.weather[2]
+        return float(load_factor[min(self.day, len(load_factor) - 1)])
     
     def step(self, action: TrainingAction) -> Tuple[MarathonTrainingState, float, bool]:
         # Sauvegarder l'historique
         self.history.append((self.state, action))
         
-        # Copier l'état actuel
-        new_state = MarathonTrainingState()
+        # Copier l'état actuel (sans repasser par __init__) ; les champs mutables sont
+        # copiés pour que les états précédents restent intacts
+        new_state = MarathonTrainingState.__new__(MarathonTrainingState)
         new_state.__dict__.update(self.state.__dict__)
+        new_state.derniers_entrainements = list(self.state.derniers_entrainements)
+        new_state.charges = self.state.charges.copy()
         
         # Mettre à jour l'historique des entraînements
         new_state.derniers_entrainements.append(action.type)
@@ -191,15 +308,22 @@ class MarathonEnvironment:
             new_state.derniers_entrainements.pop(0)
         
         # Calculer la charge d'entraînement et appliquer le modèle de Bannister
-        training_load = self._calculate_training_load(action)
+        weather_factor = self._weather_load_factor()
+        training_load = self._calculate_training_load(action) * weather_factor
         new_state.update_bannister(training_load)
+        new_state.update_workload(training_load, action.duree)
         
         # Calculer la récompense
-        reward = self._calculate_reward(new_state, action, training_load)
+        reward = self._calculate_reward(new_state, action, training_load, weather_factor)
         
         # Mise à jour du temps restant
         new_state.jours_avant_marathon = max(0, new_state.jours_avant_marathon - 1)
         
+        # Météo du lendemain
+        self.day += 1
+        if self.weather is not None:
+            self._apply_weather(new_state, self.day)
+        
         # Vérifier si l'entraînement est terminé
         done = new_state.jours_avant_marathon <= 0
         
@@ -237,7 +361,8 @@ class MarathonEnvironment:
         
         return normalized_effort
 
-    def _calculate_reward(self, state: MarathonTrainingState, action: TrainingAction, training_load: float) -> float:
+    def _calculate_reward(self, state: MarathonTrainingState, action: TrainingAction, training_load: float,
+                          weather_factor: float = 1.0) -> float:
         reward = 0
         
         # Progression de performance
@@ -285,6 +410,13 @@ class MarathonEnvironment:
         if action.duree in self.durees_par_type[action.type]:
             reward += 1.0
         
+        # Pénalité pour une séance faite dans de mauvaises conditions météo
+        if action.type != TrainingType.REPOS:
+            reward -= 5.0 * (weather_factor - 1.0)
+        
+        # Pénalité pour risque de blessure (ratio aigu:chronique trop élevé)
+        reward -= 3.0 * state.risque_blessure
+        
         # Pénalité pour surcharge
         if state.fatigue > 1.5 * state.fitness:
             reward -= 5.0
@@ -297,26 +429,112 @@ class AdvancedDynaQMarathon:
                  n_planning_steps: int = 10,
                  learning_rate: float = 0.1,
                  discount_factor: float = 0.95,
-                 epsilon: float = 0.1):
-        self.Q = defaultdict(lambda: defaultdict(float))
-        self.model = {}
+                 epsilon: float = 0.1,
+                 state_encoder: StateEncoder = None,
+                 value_backend: str = "table",
+                 tile_coding_params: Dict = None,
+                 model_capacity: int = None,
+                 model_eviction: str = "lru",
+                 planning_budget_ms: float = None,
+                 planning_threshold: float = None,
+                 max_planning_steps: int = 10000,
+                 deduplicate_actions: bool = True,
+                 imagination_batch_size: int = None,
+                 imagination_depth: int = 10,
+                 imagination_every: int = 10,
+                 imagination_buffer: int = 2048):
+        # Les lectures ne créent pas d'entrées : une entrée absente vaut 0
+        self.Q = defaultdict(dict)
         self.n_planning_steps = n_planning_steps
         self.lr = learning_rate
         self.gamma = discount_factor
         self.epsilon = epsilon
+        # Encodeur d'état optionnel (sinon MarathonTrainingState.discretize)
+        self.state_encoder = state_encoder
 
         self.pq = ModelPriorityQueue()
         self.predecessors = defaultdict(set)
+        # Modèle du monde, borné par model_capacity transitions si précisé
+        self.model = WorldModel(model_capacity, model_eviction, self.predecessors)
+        
+        # Planification adaptative : budget de temps par pas réel et/ou seuil de priorité.
+        # Sans l'un ni l'autre, plan() fait exactement n_planning_steps balayages.
+        self.planning_budget_ms = planning_budget_ms
+        self.planning_threshold = planning_threshold
+        self.max_planning_steps = max_planning_steps
+        self.last_planning_sweeps = 0
+        self.total_planning_sweeps = 0
+        
+        # Rollouts imaginés (voir imagine) : tous les imagination_every pas réels, un batch
+        # d'états récents est prolongé de imagination_depth jours dans le simulateur
+        self.imagination_batch_size = imagination_batch_size
+        self.imagination_depth = imagination_depth
+        self.imagination_every = imagination_every
+        self.recent_states = deque(maxlen=imagination_buffer)
+        self.n_real_steps = 0
+        self.total_imagined_transitions = 0
+        self._imagination_env = None
+        
+        # Planification en tâche de fond (voir start_background_planning)
+        self.background_planner = None
+        self._q_lock = nullcontext()
         
         # Générer l'espace d'actions
-        self.actions = self._generate_action_space()
+        self.all_actions = self._generate_action_space()
+        
+        # Regrouper les actions équivalentes (même dynamique, même récompense) :
+        # seule l'action canonique de chaque classe est évaluée par l'agent. Le sondage
+        # de l'environnement est différé au premier accès (voir __getattr__) : un modèle
+        # sauvegardé fournit ses classes à load_model sans sonder.
+        self.deduplicate_actions = deduplicate_actions
+        
+        # Backend de valeurs : table Q (défaut) ou approximation linéaire par tile coding
+        self.value_approx = None
+        if value_backend == "tile_coding":
+            self._set_value_approx(TileCodingQ([a.discretize() for a in self.actions],
+                                               **(tile_coding_params or {})))
+        elif value_backend != "table":
+            raise ValueError(f"Backend de valeurs inconnu : {value_backend}")
         
         # Historique d'apprentissage
         self.training_history = []
         self.rewards_history = []
+        self.episode_rewards = []
+        self.evaluation_history = []
+        # Entrées de Q modifiées depuis le dernier checkpoint (None : suivi désactivé)
+        self.q_changes = None
     
-    def _generate_action_space(self) -> List[TrainingAction]:
-        """Génère l'espace d'actions discrétisé"""
+    # Attributs dérivés des classes d'actions équivalentes, calculés à la demande
+    _ACTION_SPACE_ATTRS = frozenset({'actions', 'action_classes', 'action_variants', 'action_space_report',
+                                     '_action_cum_weights', '_n_action_keys'})
+    
+    def __getattr__(self, name):
+        # Appelé seulement si l'attribut n'existe pas encore
+        if name in AdvancedDynaQMarathon._ACTION_SPACE_ATTRS and 'all_actions' in self.__dict__:
+            if self.deduplicate_actions:
+                classes = action_equivalence_classes(self.all_actions, MarathonEnvironment)
+            else:
+                classes = [[i] for i in range(len(self.all_actions))]
+            self._set_action_classes(classes)
+            return getattr(self, name)
+        raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
+    
+    def _set_action_classes(self, classes: List[List[int]]):
+        self.action_classes = [list(members) for members in classes]
+        self.actions = [self.all_actions[members[0]] for members in classes]
+        self.action_variants = {}
+        for members in classes:
+            self.action_variants.setdefault(self.all_actions[members[0]].discretize(), []).extend(
+                self.all_actions[i] for i in members)
+        self.action_space_report = reduction_report(classes)
+        # L'exploration garde la même loi sur les actions effectives que sans regroupement
+        self._action_cum_weights = list(itertools.accumulate(len(m) for m in classes)) \
+            if self.deduplicate_actions else None
+        self._n_action_keys = len({a.discretize() for a in self.actions})
+    
+    @staticmethod
+    def action_grid() -> List[TrainingAction]:
+        """Toutes les combinaisons (type, durée, intensité, zone), valides ou non"""
         actions = []
         
         # Action de repos
@@ -327,12 +545,17 @@ class AdvancedDynaQMarathon:
             for duree in [30, 45, 60, 90, 120]:
                 for intensite in [0.6, 0.7, 0.8, 0.9]:
                     for zone in range(1, 6):
-                        if self._is_valid_combination(training_type, duree, intensite, zone):
-                            actions.append(TrainingAction(training_type, duree, intensite, zone))
+                        actions.append(TrainingAction(training_type, duree, intensite, zone))
         
         return actions
     
-    def _is_valid_combination(self, type: TrainingType, duree: int, intensite: float, zone: int) -> bool:
+    def _generate_action_space(self) -> List[TrainingAction]:
+        """Génère l'espace d'actions discrétisé"""
+        return [a for a in self.action_grid()
+                if self._is_valid_combination(a.type, a.duree, a.intensite, a.zone_fc)]
+    
+    @staticmethod
+    def _is_valid_combination(type: TrainingType, duree: int, intensite: float, zone: int) -> bool:
         contraintes_type = {
             TrainingType.REPOS: lambda d, i, z: d == 0 and z == 1,
             TrainingType.ENDURANCE: lambda d, i, z: d in [45, 60, 90] and z in [2, 3],  # Ajout de 90 min
@@ -350,85 +573,313 @@ class AdvancedDynaQMarathon:
             return contraintes_type[type](duree, intensite, zone)
         return False
     
+    def _set_value_approx(self, value_approx: TileCodingQ):
+        self.value_approx = value_approx
+        # Colonne de poids de chaque action de self.actions
+        self._approx_columns = np.array([value_approx.action_index[a.discretize()]
+                                         for a in self.actions])
+
+    def state_key(self, state: MarathonTrainingState) -> tuple:
+        """Clé de Q d'un état selon l'encodeur configuré"""
+        if self.value_approx is not None:
+            return self.value_approx.state_key(state)
+        if self.state_encoder is None:
+            return state.discretize()
+        return self.state_encoder.encode(state)
+
+    def state_space_report(self) -> Dict:
+        """Occupation de l'espace d'états par la table Q (nécessite un encodeur)"""
+        if self.state_encoder is None:
+            raise ValueError("state_space_report() requiert un state_encoder")
+        return self.state_encoder.occupancy(self.Q.keys())
+    
+    def q_value(self, state_key: tuple, action_key: tuple) -> float:
+        if self.value_approx is not None:
+            return self.value_approx.value(state_key, action_key)
+        row = self.Q.get(state_key)
+        return row.get(action_key, 0.0) if row else 0.0
+
+    def max_q(self, state_key: tuple) -> float:
+        """Valeur de la meilleure action dans un état"""
+        if self.value_approx is not None:
+            return self.value_approx.max_value(state_key)
+        row = self.Q.get(state_key)
+        if not row:
+            return 0.0
+        best = max(row.values())
+        # Les actions sans entrée valent 0
+        if len(row) < self._n_action_keys:
+            return max(best, 0.0)
+        return best
+
+    def update_q(self, state_key: tuple, action_key: tuple, target: float):
+        """Rapproche Q(s, a) de la cible avec le taux d'apprentissage"""
+        with self._q_lock:
+            if self.value_approx is not None:
+                self.value_approx.update(state_key, action_key, target, self.lr)
+            else:
+                row = self.Q[state_key]
+                old_value = row.get(action_key, 0.0)
+                row[action_key] = old_value + self.lr * (target - old_value)
+                if self.q_changes is not None:
+                    self.q_changes.add((state_key, action_key))
+    
+    def _random_action(self, rng: random.Random = None) -> TrainingAction:
+        """Action d'exploration ; rng : générateur local (par défaut le module random)"""
+        rng = rng or random
+        if self._action_cum_weights is None:
+            return rng.choice(self.actions)
+        return rng.choices(self.actions, cum_weights=self._action_cum_weights)[0]
+    
     def get_action(self, state: MarathonTrainingState) -> TrainingAction:
         """Sélectionne une action selon la politique epsilon-greedy"""
         if random.random() < self.epsilon:
-            return random.choice(self.actions)
+            return self._random_action()
             
-        state_key = state.discretize()
+        state_key = self.state_key(state)
+        if self.value_approx is not None:
+            values = self.value_approx.values(state_key)[self._approx_columns]
+            return self.actions[int(np.argmax(values))]
         if state_key not in self.Q:
-            return random.choice(self.actions)
+            return self._random_action()
             
-        return max(self.actions, 
-                  key=lambda a: self.Q[state_key][a.discretize()])
-    
+        row = self.Q[state_key]
+        return max(self.actions,
+                  key=lambda a: row.get(a.discretize(), 0.0))
+
+    def greedy_action_indices(self, state_keys: List[tuple], rng: random.Random = None) -> np.ndarray:
+        """
+        Indices dans self.actions des actions gloutonnes pour un batch de clés d'état
+        (même choix que get_action avec epsilon = 0 ; état inconnu : action aléatoire,
+        tirée avec rng si fourni pour ne pas consommer le générateur global).
+        """
+        if self.value_approx is not None:
+            values = self.value_approx.values_batch(np.asarray(state_keys, dtype=np.float64))
+            return np.argmax(values[:, self._approx_columns], axis=1)
+        action_keys = [a.discretize() for a in self.actions]
+        indices = np.empty(len(state_keys), dtype=np.int64)
+        for i, state_key in enumerate(state_keys):
+            row = self.Q.get(state_key)
+            if row is None:
+                indices[i] = self.actions.index(self._random_action(rng))
+            else:
+                indices[i] = int(np.argmax([row.get(key, 0.0) for key in action_keys]))
+        return indices
+
     def learn(self, state, action, reward, next_state):
-        state_key = state.discretize()
+        state_key = self.state_key(state)
         action_key = action.discretize()
-        next_state_key = next_state.discretize()
+        next_state_key = self.state_key(next_state)
         
         # Calcul de l'erreur de priorité
-        old_value = self.Q[state_key][action_key]
-        best_next_value = max([self.Q[next_state_key][a.discretize()] 
-                            for a in self.actions])
+        old_value = self.q_value(state_key, action_key)
+        best_next_value = self.max_q(next_state_key)
         new_value = reward + self.gamma * best_next_value
         priority = abs(new_value - old_value)
         
         # Mise à jour standard
-        self.Q[state_key][action_key] = old_value + self.lr * (new_value - old_value)
-        
-        # Mise à jour du modèle
-        self.model[(state_key, action_key)] = (reward, next_state_key)
-        
-        # Mise à jour des prédécesseurs
-        self.predecessors[next_state_key].add((state_key, action_key))
-        
-        # Ajouter à la file de priorité
-        self.pq.push(priority, (state_key, action_key))
+        self.update_q(state_key, action_key, new_value)
         
-        # Planification
-        self.plan()
+        if self.background_planner is not None:
+            # Le modèle et la planification sont gérés par le thread de fond
+            self.background_planner.submit(state_key, action_key, reward, next_state_key, priority)
+        else:
+            self.record_transition(state_key, action_key, reward, next_state_key, priority)
+            
+            # Planification
+            self.plan()
         
         # Sauvegarder l'historique
         self.training_history.append((state_key, action_key, reward, next_state_key))
         self.rewards_history.append(reward)
+        self.n_real_steps += 1
+        
+        if self.imagination_batch_size:
+            self.recent_states.append(state)
+            if self.n_real_steps % self.imagination_every == 0:
+                self.imagine()
+    
+    def record_transition(self, state_key: tuple, action_key: tuple, reward: float,
+                          next_state_key: tuple, priority: float):
+        """Ajoute une transition réelle au modèle et à la file de priorité"""
+        # Mise à jour du modèle et des prédécesseurs (avec éviction si le modèle est borné)
+        self.model.record((state_key, action_key), reward, next_state_key, priority)
+        
+        # Ajouter à la file de priorité
+        self.pq.push(priority, (state_key, action_key))
     
-    def plan(self):
-        """Planification avec Prioritized Sweeping"""
+    def bulk_record(self, transitions: Iterable[Tuple[tuple, tuple, float, tuple]]) -> int:
+        """
+        Charge en une passe des transitions hors ligne (état, action, récompense, état suivant)
+        dans le modèle, l'index des prédécesseurs et la file de priorité, sans planifier.
+        Retourne le nombre de transitions chargées.
+        """
+        n_loaded = 0
+        with self._q_lock:
+            for state_key, action_key, reward, next_state_key in transitions:
+                target = reward + self.gamma * self.max_q(next_state_key)
+                priority = abs(target - self.q_value(state_key, action_key))
+                self.record_transition(state_key, action_key, reward, next_state_key, priority)
+                n_loaded += 1
+        return n_loaded
+
+    def plan(self) -> int:
+        """Planification avec Prioritized Sweeping ; retourne le nombre de balayages effectués"""
         if not self.model:
-            return
-            
-        for _ in range(self.n_planning_steps):
-            if self.pq.empty():
-                break
-                
-            result = self.pq.pop()
-            if result is None:
+            return 0
+        
+        n_sweeps = 0
+        if self.planning_budget_ms is None and self.planning_threshold is None:
+            for _ in range(self.n_planning_steps):
+                if not self.sweep_once():
+                    break
+                n_sweeps += 1
+        else:
+            # Mode adaptatif : continuer tant que des erreurs TD importantes sont en attente
+            deadline = None
+            if self.planning_budget_ms is not None:
+                deadline = time.perf_counter() + self.planning_budget_ms / 1000
+            threshold = self.pq.theta if self.planning_threshold is None else self.planning_threshold
+            while n_sweeps < self.max_planning_steps:
+                top_priority = self.pq.peek_priority()
+                if top_priority is None or top_priority < threshold:
+                    break
+                if deadline is not None and time.perf_counter() >= deadline:
+                    break
+                self.sweep_once()
+                n_sweeps += 1
+        
+        self.last_planning_sweeps = n_sweeps
+        self.total_planning_sweeps += n_sweeps
+        return n_sweeps
+
+    def _epsilon_greedy_indices(self, state_keys: List[tuple]) -> np.ndarray:
+        """get_action pour un batch de clés d'état (indices dans self.actions)"""
+        indices = self.greedy_action_indices(state_keys)
+        explore = np.random.random(len(indices)) < self.epsilon
+        n_explore = int(explore.sum())
+        if n_explore:
+            if self._action_cum_weights is None:
+                indices[explore] = np.random.randint(0, len(self.actions), size=n_explore)
+            else:
+                # Même loi que _random_action (random.choices avec poids cumulés)
+                draws = np.random.random(n_explore) * self._action_cum_weights[-1]
+                indices[explore] = np.searchsorted(self._action_cum_weights, draws, side='right')
+        return indices
+
+    def imagine(self) -> int:
+        """
+        Planification par rollouts imaginés : un batch d'états réels récents est prolongé
+        de imagination_depth jours dans un environnement batché, sous la politique
+        epsilon-greedy courante. Les transitions imaginées mettent Q à jour couche par
+        couche, du dernier jour imaginé au premier, chaque couche en une seule passe :
+        la valeur remonte ainsi de toute la profondeur à chaque appel.
+        Retourne le nombre de transitions imaginées.
+        """
+        from batch_env import BatchMarathonEnvironment
+        
+        batch_size = self.imagination_batch_size
+        if len(self.recent_states) < batch_size:
+            return 0
+        if self._imagination_env is None:
+            self._imagination_env = BatchMarathonEnvironment(batch_size, self.actions)
+        env = self._imagination_env.load_states(random.sample(self.recent_states, batch_size))
+        
+        layers = []
+        active = env.jours_avant_marathon > 0
+        state_keys = env.state_keys(self)
+        for _ in range(self.imagination_depth):
+            if not active.any():
                 break
-                
-            priority, (state_key, action_key) = result
-            reward, next_state_key = self.model[(state_key, action_key)]
+            actions = self._epsilon_greedy_indices(state_keys)
+            rewards, dones = env.step(actions)
+            next_state_keys = env.state_keys(self)
+            layers.append((state_keys, actions, rewards, next_state_keys, np.flatnonzero(active)))
+            active = active & ~dones
+            state_keys = next_state_keys
+        
+        action_keys = [a.discretize() for a in self.actions]
+        n_transitions = 0
+        for state_keys, actions, rewards, next_state_keys, rows in reversed(layers):
+            if self.value_approx is not None:
+                next_values = self.value_approx.values_batch(
+                    np.asarray([next_state_keys[i] for i in rows], dtype=np.float64)).max(axis=1)
+                with self._q_lock:
+                    self.value_approx.update_batch([state_keys[i] for i in rows], self._approx_columns[actions[rows]],
+                                                   rewards[rows] + self.gamma * next_values, self.lr)
+            else:
+                # Cibles de la couche calculées avant toute mise à jour
+                targets = rewards[rows] + self.gamma * np.array([self.max_q(next_state_keys[i]) for i in rows])
+                for i, target in zip(rows, targets):
+                    self.update_q(state_keys[i], action_keys[actions[i]], float(target))
+            n_transitions += len(rows)
+        
+        self.total_imagined_transitions += n_transitions
+        return n_transitions
+
+    def sweep_once(self) -> bool:
+        """Un pas de prioritized sweeping ; retourne False si la file est vide"""
+        if self.pq.empty():
+            return False
             
-            # Mise à jour Q
-            best_next_value = max([self.Q[next_state_key][a.discretize()] 
-                                for a in self.actions])
-            value = reward + self.gamma * best_next_value
-            self.Q[state_key][action_key] += self.lr * (value - self.Q[state_key][action_key])
+        result = self.pq.pop()
+        if result is None:
+            return False
             
-            # Mise à jour des prédécesseurs
-            for prev_state_key, prev_action_key in self.predecessors[state_key]:
-                if (prev_state_key, prev_action_key) in self.model:
-                    prev_reward, _ = self.model[(prev_state_key, prev_action_key)]
-                    prev_value = self.Q[prev_state_key][prev_action_key]
-                    new_value = prev_reward + self.gamma * max([self.Q[state_key][a.discretize()] 
-                                                            for a in self.actions])
-                    priority = abs(new_value - prev_value)
-                    self.pq.push(priority, (prev_state_key, prev_action_key))
+        priority, (state_key, action_key) = result
+        # Transition évincée du modèle depuis son ajout à la file
+        if (state_key, action_key) not in self.model:
+            return True
+        reward, next_state_key = self.model[(state_key, action_key)]
+        
+        # Mise à jour Q
+        best_next_value = self.max_q(next_state_key)
+        value = reward + self.gamma * best_next_value
+        self.update_q(state_key, action_key, value)
+        
+        # Mise à jour des prédécesseurs
+        state_value = self.max_q(state_key)
+        for prev_state_key, prev_action_key in self.predecessors.get(state_key, ()):
+            if (prev_state_key, prev_action_key) in self.model:
+                prev_reward, _ = self.model[(prev_state_key, prev_action_key)]
+                prev_value = self.q_value(prev_state_key, prev_action_key)
+                new_value = prev_reward + self.gamma * state_value
+                priority = abs(new_value - prev_value)
+                self.pq.push(priority, (prev_state_key, prev_action_key))
+                self.model.update_priority((prev_state_key, prev_action_key), priority)
+        return True
+
+    def start_background_planning(self, handoff_size: int = 1024,
+                                  sweeps_per_batch: int = 32) -> BackgroundPlanner:
+        """Passe la planification dans un thread de fond découplé des pas d'environnement"""
+        if self.background_planner is None:
+            self._q_lock = threading.Lock()
+            self.background_planner = BackgroundPlanner(self, handoff_size, sweeps_per_batch)
+            self.background_planner.start()
+        return self.background_planner
+
+    def stop_background_planning(self, drain: bool = True) -> Dict:
+        """Arrête le thread de fond et revient à la planification synchrone"""
+        if self.background_planner is None:
+            return {}
+        planner = self.background_planner
+        planner.stop(drain)
+        self.background_planner = None
+        self._q_lock = nullcontext()
+        return planner.stats()
+
+    def polish(self, method: str = "value", tol: float = 1e-6) -> Dict:
+        """Post-entraînement : résout le modèle appris hors ligne et réécrit Q"""
+        return solve_model(self, method, tol)
 
     def get_training_recommendation(self, state: MarathonTrainingState) -> Dict:
         """Génère une recommandation d'entraînement détaillée"""
         action = self.get_action(state)
-        
+        return self.describe_recommendation(state, action, self.state_key(state))
+
+    def describe_recommendation(self, state: MarathonTrainingState, action: TrainingAction,
+                                state_key: tuple) -> Dict:
+        """Recommandation détaillée pour une action déjà choisie"""
         training_descriptions = {
             TrainingType.REPOS: "Journée de repos pour la récupération",
             TrainingType.ENDURANCE: "Entraînement d'endurance à allure modérée",
@@ -455,12 +906,76 @@ class AdvancedDynaQMarathon:
             "description": training_descriptions[action.type],
             "duree": action.duree,
             "intensite": action.intensite,
+            "intensites_equivalentes": sorted({a.intensite for a in
+                                               self.action_variants.get(action.discretize(), [action])}),
             "zone_fc": zone_descriptions[action.zone_fc],
             "fc_cible": state.zones_fc.__dict__[f'z{action.zone_fc}'],
-            "confiance": self.Q[state.discretize()][action.discretize()]
+            "confiance": self.q_value(state_key, action.discretize())
         }
     
-    def save_model(self, filepath: str):
+    def memory_report(self) -> Dict:
+        """Taille de la table Q : états, entrées, octets et part d'entrées à la valeur par défaut"""
+        n_entries = 0
+        n_default = 0
+        n_bytes = sys.getsizeof(self.Q)
+        for state_key, row in self.Q.items():
+            n_bytes += sys.getsizeof(state_key) + sys.getsizeof(row)
+            for value in row.values():
+                n_bytes += sys.getsizeof(value)
+                n_default += int(value == 0.0)
+            n_entries += len(row)
+        return {
+            'states': len(self.Q),
+            'entries': n_entries,
+            'bytes': n_bytes,
+            'default_fraction': n_default / n_entries if n_entries else 0.0,
+            'model_entries': len(self.model),
+        }
+
+    def compact(self, drop_unreachable: bool = False) -> Dict:
+        """
+        Supprime les entrées à la valeur par défaut sans changer la politique gloutonne :
+        une ligne entièrement nulle garde une entrée pour que l'état reste connu.
+        Avec drop_unreachable, supprime aussi les états absents du modèle (ni source ni
+        successeur d'une transition) ; ces états deviennent inconnus (action aléatoire).
+        Ignoré si le modèle est borné (une transition évincée ne rend pas un état inaccessible)
+        ou avec les rollouts imaginés (leurs états mis à jour n'entrent pas dans le modèle).
+        Retourne le nombre d'entrées et d'états supprimés.
+        """
+        reachable = None
+        if drop_unreachable and self.model and self.model.capacity is None and not self.imagination_batch_size:
+            reachable = {state_key for state_key, _ in self.model}
+            reachable.update(next_state for _, next_state in self.model.values())
+
+        removed_entries = 0
+        removed_states = 0
+        for state_key in list(self.Q):
+            row = self.Q[state_key]
+            if reachable is not None and state_key not in reachable:
+                removed_entries += len(row)
+                removed_states += 1
+                if self.q_changes is not None:
+                    self.q_changes.update((state_key, action_key) for action_key in row)
+                del self.Q[state_key]
+                continue
+            zeros = [a for a, value in row.items() if value == 0.0]
+            if len(zeros) == len(row):
+                # Toutes les actions valent 0 : une entrée suffit à garder l'état connu
+                zeros = zeros[1:]
+            for action_key in zeros:
+                del row[action_key]
+                removed_entries += 1
+                # Suppression suivie : le checkpoint suivant en écrit la trace
+                if self.q_changes is not None:
+                    self.q_changes.add((state_key, action_key))
+            if not row:
+                removed_states += 1
+                del self.Q[state_key]
+        return {'removed_entries': removed_entries, 'removed_states': removed_states}
+    
+    def save_model(self, filepath: str, compact: bool = True):
+        if compact:
+            self.compact()
         model_data = {
             'Q': {str(state): {str(action): value 
                 for action, value in actions.items()}
@@ -474,6 +989,15 @@ class AdvancedDynaQMarathon:
                 'epsilon': self.epsilon
             }
         }
+        if self.state_encoder is not None:
+            model_data['state_encoder'] = self.state_encoder.to_dict()
+        if self.deduplicate_actions:
+            # Classes d'actions équivalentes : le rechargement évite de sonder l'environnement
+            model_data['action_classes'] = self.action_classes
+        if self.value_approx is not None:
+            # Les poids sont sauvegardés à côté du JSON
+            model_data['value_approx'] = self.value_approx.to_dict()
+            np.save(filepath + '.weights.npy', self.value_approx.weights)
         with open(filepath, 'w') as f:
             json.dump(model_data, f)
 
@@ -481,33 +1005,107 @@ class AdvancedDynaQMarathon:
         with open(filepath, 'r') as f:
             model_data = json.load(f)
         
-        self.Q = defaultdict(lambda: defaultdict(float))
+        classes = model_data.get('action_classes')
+        if (self.deduplicate_actions and 'actions' not in self.__dict__ and classes
+                and sum(len(members) for members in classes) == len(self.all_actions)):
+            self._set_action_classes(classes)
+        
+        # Clés sérialisées par str() : relues par literal_eval, une fois par chaîne distincte
+        parsed = {}
+        def parse(text):
+            key = parsed.get(text)
+            if key is None:
+                key = parsed[text] = ast.literal_eval(text)
+            return key
+        
+        self.Q = defaultdict(dict)
         for state_str, actions in model_data['Q'].items():
-            state = eval(state_str)
+            state = parse(state_str)
             for action_str, value in actions.items():
-                action = eval(action_str)
+                action = parse(action_str)
                 self.Q[state][action] = value
         
-        self.model = {eval(k): (v[0], eval(v[1])) 
-                    for k, v in model_data['model'].items()}
+        # Reconstruire le modèle et l'index des prédécesseurs
+        self.predecessors = defaultdict(set)
+        self.model = WorldModel(self.model.capacity, self.model.eviction, self.predecessors)
+        for k, v in model_data['model'].items():
+            self.model.record(parse(k), v[0], parse(v[1]))
         
         for param, value in model_data['params'].items():
             setattr(self, param, value)
+        
+        if 'state_encoder' in model_data:
+            self.state_encoder = StateEncoder.from_dict(model_data['state_encoder'])
+        
+        if 'value_approx' in model_data:
+            value_approx = TileCodingQ.from_dict(model_data['value_approx'])
+            value_approx.weights = np.load(filepath + '.weights.npy')
+            self._set_value_approx(value_approx)
+
 
 
+def train_agent(episodes: int = 5000,
+                n_planning_steps: int = 10,
+                learning_rate: float = 0.1,
+                discount_factor: float = 0.95,
+                initial_epsilon: float = 0.9,
+                final_epsilon: float = 0.1,
+                seed: int = None,
+                agent: "AdvancedDynaQMarathon" = None,
+                start_episode: int = 0,
+                stop_episode: int = None,
+                background_planning: bool = False,
+                eval_every: int = None,
+                eval_episodes: int = 64,
+                checkpoint_dir: str = None,
+                checkpoint_every: int = 100,
+                compact_every: int = 20,
+                weather_bank: WeatherBank = None,
+                verbose: bool = True):
+    """
+    Fonction pour entraîner l'agent.
 
-def train_agent(episodes: int = 5000):
-    """Fonction pour entraîner l'agent"""
-    env = MarathonEnvironment()
-    agent = AdvancedDynaQMarathon()
+    `episodes` fixe la longueur du schéma epsilon décroissant ; `start_episode`
+    et `stop_episode` permettent de n'en exécuter qu'une tranche (reprise d'un agent existant).
+    Avec `eval_every`, la politique gloutonne est évaluée tous les `eval_every` épisodes
+    sur `eval_episodes` athlètes (résultats dans agent.evaluation_history).
+    Avec `checkpoint_dir`, un checkpoint incrémental est écrit tous les `checkpoint_every`
+    épisodes et l'entraînement reprend au dernier checkpoint s'il en existe un.
+    Avec `weather_bank`, l'épisode n joue le scénario météo de graine `seed + n`
+    (reproductible, y compris après une reprise) ; l'évaluation utilise la même banque.
+    """
+    if seed is not None:
+        random.seed(seed)
+        np.random.seed(seed)
+
+    env = MarathonEnvironment(weather_bank=weather_bank)
+    if agent is None:
+        agent = AdvancedDynaQMarathon(n_planning_steps=n_planning_steps,
+                                      learning_rate=learning_rate,
+                                      discount_factor=discount_factor)
+    
+    schedule = {'episodes': episodes, 'initial_epsilon': initial_epsilon, 'final_epsilon': final_epsilon}
+    checkpoints = None
+    if checkpoint_dir is not None:
+        from checkpoint import CheckpointManager
+        
+        checkpoints = CheckpointManager(checkpoint_dir, compact_every)
+        if checkpoints.exists():
+            restored = checkpoints.restore(agent)
+            start_episode = restored['episode']
+            if verbose:
+                print(f"Reprise à l'épisode {start_episode} depuis {checkpoint_dir}")
+        else:
+            checkpoints.attach(agent)
+    
+    if background_planning:
+        agent.start_background_planning()
     
     # Pour le epsilon décroissant
-    initial_epsilon = 0.9
-    final_epsilon = 0.1
     epsilon_decay = (initial_epsilon - final_epsilon) / episodes
     
-    for episode in range(episodes):
-        state = env.reset()
+    for episode in range(start_episode, episodes if stop_episode is None else stop_episode):
+        state = env.reset((seed or 0) + episode)
         total_reward = 0
         done = False
         
@@ -522,8 +1120,31 @@ def train_agent(episodes: int = 5000):
             total_reward += reward
             state = next_state
             
-        if episode % 100 == 0:
+        agent.episode_rewards.append(total_reward)
+        if verbose and episode % 100 == 0:
             print(f"Episode {episode}, Total Reward: {total_reward}")
+        
+        if eval_every and (episode + 1) % eval_every == 0:
+            from evaluation import evaluate_agent
+            
+            with agent._q_lock:
+                summary = evaluate_agent(agent, eval_episodes, seed=episode, weather_bank=weather_bank)
+            agent.evaluation_history.append({'episode': episode + 1, **summary})
+            if verbose:
+                ret = summary['return']
+                print(f"Évaluation {episode + 1}: retour glouton {ret['mean']:.2f} "
+                      f"[{ret['ci_low']:.2f}, {ret['ci_high']:.2f}]")
+        
+        if checkpoints is not None and (episode + 1) % checkpoint_every == 0:
+            # Le thread de planification est suspendu le temps du checkpoint
+            if background_planning:
+                agent.stop_background_planning()
+            checkpoints.save(agent, episode + 1, schedule)
+            if background_planning:
+                agent.start_background_planning()
+    
+    if background_planning:
+        agent.stop_background_planning()
     
     return agent, env
 
@@ -0,0 +1,89 @@
+import copy
+import random
+from enum import Enum
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+
+def _value_signature(value):
+    if isinstance(value, (float, np.floating)):
+        return round(float(value), 10)
+    if isinstance(value, np.ndarray):
+        return tuple(np.round(value.astype(np.float64), 10).ravel())
+    if isinstance(value, (list, tuple)):
+        return tuple(_value_signature(v) for v in value)
+    if isinstance(value, Enum):
+        return value
+    if hasattr(value, '__dict__'):
+        return _state_signature(value)
+    try:
+        hash(value)
+        return value
+    except TypeError:
+        return repr(value)
+
+
+def _state_signature(state) -> tuple:
+    return tuple((name, _value_signature(value)) for name, value in sorted(vars(state).items()))
+
+
+def _probe_states(env_factory, actions, n_probe_states: int, seed: int) -> list:
+    """États de test pris à intervalles réguliers le long d'une trajectoire aléatoire"""
+    rng = random.Random(seed)
+    env = env_factory()
+    state = env.reset()
+    states = []
+    n_days = state.jours_avant_marathon
+    probe_days = set(np.linspace(0, n_days - 1, n_probe_states).astype(int))
+    for day in range(n_days):
+        if day in probe_days:
+            states.append(copy.deepcopy(state))
+        state, _, done = env.step(rng.choice(actions))
+        if done:
+            break
+    return states
+
+
+@lru_cache(maxsize=16)
+def _equivalence_classes(action_params: Tuple[tuple, ...], action_cls, env_factory,
+                         n_probe_states: int, seed: int) -> Tuple[Tuple[int, ...], ...]:
+    actions = [action_cls(*params) for params in action_params]
+    probes = _probe_states(env_factory, actions, n_probe_states, seed)
+    env = env_factory()
+
+    classes = {}
+    for index, action in enumerate(actions):
+        signature = []
+        for probe in probes:
+            # step() ne modifie pas l'état courant (il en fait une copie) : pas de deepcopy ici
+            env.state = probe
+            next_state, reward, done = env.step(action)
+            signature.append((round(float(reward), 10), done, _state_signature(next_state)))
+        classes.setdefault(tuple(signature), []).append(index)
+    return tuple(tuple(members) for members in classes.values())
+
+
+def action_equivalence_classes(actions: list, env_factory,
+                               n_probe_states: int = 8, seed: int = 0) -> List[List[int]]:
+    """
+    Regroupe les actions ayant exactement la même dynamique et la même récompense.
+
+    Chaque action est jouée depuis les mêmes états de test ; deux actions sont
+    équivalentes si la récompense et l'état suivant sont identiques sur tous les tests.
+    Retourne les classes (indices dans `actions`), dans l'ordre de première apparition.
+    """
+    action_params = tuple((a.type, a.duree, a.intensite, a.zone_fc) for a in actions)
+    classes = _equivalence_classes(action_params, type(actions[0]), env_factory,
+                                   n_probe_states, seed)
+    return [list(members) for members in classes]
+
+
+def reduction_report(classes: List[List[int]]) -> Dict:
+    n_actions = sum(len(members) for members in classes)
+    return {
+        'actions': n_actions,
+        'canonical_actions': len(classes),
+        'reduction_factor': n_actions / len(classes) if classes else 1.0,
+    }
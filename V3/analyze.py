@@ -1,12 +1,16 @@
+import csv
+
 from Dyna import MarathonEnvironment, AdvancedDynaQMarathon
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 
-def generate_full_training_plan():
+# pandas et matplotlib sont importés dans les fonctions qui en ont besoin :
+# générer un plan ne les charge pas
+
+PLAN_COLUMNS = ['jour', 'type', 'duree', 'zone_fc', 'fitness', 'fatigue', 'performance']
+
+def generate_full_training_plan(model_path: str = 'trained_marathon_model.json'):
     # Charger le modèle entraîné
     agent = AdvancedDynaQMarathon()
-    agent.load_model('trained_marathon_model.json')
+    agent.load_model(model_path)
     
     # Générer le plan
     env = MarathonEnvironment()
@@ -32,7 +36,19 @@ def generate_full_training_plan():
     
     return training_data
 
-def plot_physiological_values(training_data):
+def save_training_plan(training_data, path: str = 'plan_marathon.csv'):
+    """Écrit le plan en CSV (mêmes colonnes que DataFrame.to_csv, sans pandas)"""
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=PLAN_COLUMNS, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(training_data)
+
+def plot_physiological_values(training_data, output_path: str = 'evolution_physiologique.png'):
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    import pandas as pd
+    
     df = pd.DataFrame(training_data)
     
     # Configuration du style
@@ -57,25 +73,24 @@ def plot_physiological_values(training_data):
     ax.axvspan(96, 120, alpha=0.2, color='red', label='Affûtage')
     
     plt.tight_layout()
-    plt.savefig('evolution_physiologique.png', dpi=300, bbox_inches='tight')
+    plt.savefig(output_path, dpi=300, bbox_inches='tight')
     plt.close()
 
 def analyze_training_distribution(training_data):
-    df = pd.DataFrame(training_data)
+    import pandas as pd
     
-    # Analyser par phase
-    phases = {
-        'Base (1-48j)': df[df['jour'] <= 48],
-        'Spécifique (49-96j)': df[(df['jour'] > 48) & (df['jour'] <= 96)],
-        'Affûtage (97-120j)': df[df['jour'] > 96]
-    }
+    df = pd.DataFrame(training_data)
     
-    distribution = {}
-    for phase_name, phase_data in phases.items():
-        type_counts = phase_data['type'].value_counts()
-        distribution[phase_name] = type_counts
+    # Analyser par phase : une seule agrégation groupée (phase, type)
+    phases = pd.cut(df['jour'], bins=[0, 48, 96, float('inf')],
+                    labels=['Base (1-48j)', 'Spécifique (49-96j)', 'Affûtage (97-120j)'])
+    distribution = pd.crosstab(df['type'], phases)
+    distribution.columns = distribution.columns.astype(str)
+    distribution.columns.name = None
+    distribution.index.name = None
     
-    return pd.DataFrame(distribution)
+    # Types absents d'une phase : NaN, comme avec value_counts par phase
+    return distribution.where(distribution > 0)
 
 if __name__ == "__main__":
     # Générer le plan
@@ -84,8 +99,7 @@ if __name__ == "__main__":
     
     # Sauvegarder en CSV
     print("Sauvegarde du plan en CSV...")
-    df = pd.DataFrame(training_data)
-    df.to_csv('plan_marathon.csv', index=False)
+    save_training_plan(training_data, 'plan_marathon.csv')
     
     # Créer le graphique
     print("Création du graphique d'évolution physiologique...")
@@ -0,0 +1,82 @@
+import queue
+import threading
+import time
+from typing import Dict
+
+
+class BackgroundPlanner:
+    """
+    Planification Dyna en tâche de fond.
+
+    La boucle principale n'exécute que les pas d'environnement et les mises à jour
+    directes de Q, puis transmet chaque transition via une file bornée.
+    Le thread de planification est le seul à modifier le modèle, les prédécesseurs
+    et la file de priorité : il intègre les transitions reçues puis vide la file
+    de priorité en continu pendant le temps libre.
+    """
+    def __init__(self, agent, handoff_size: int = 1024, sweeps_per_batch: int = 32):
+        self.agent = agent
+        self.handoff = queue.Queue(maxsize=handoff_size)
+        self.sweeps_per_batch = sweeps_per_batch
+        self.n_sweeps = 0
+        self.n_transitions = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="dyna-planner", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def submit(self, state_key: tuple, action_key: tuple, reward: float,
+               next_state_key: tuple, priority: float):
+        """Transmet une transition réelle (bloque si la file est pleine)"""
+        self.handoff.put((state_key, action_key, reward, next_state_key, priority))
+
+    def flush(self):
+        """Attend que toutes les transitions transmises aient été intégrées au modèle"""
+        self.handoff.join()
+
+    def stop(self, drain: bool = True):
+        """Arrête le thread ; avec drain=True, intègre d'abord les transitions en attente"""
+        if drain:
+            self.flush()
+        self._stop.set()
+        self._thread.join()
+
+    def stats(self) -> Dict:
+        return {
+            'sweeps': self.n_sweeps,
+            'transitions': self.n_transitions,
+            'pending_handoff': self.handoff.qsize(),
+        }
+
+    def _apply(self, item):
+        self.agent.record_transition(*item)
+        self.n_transitions += 1
+        self.handoff.task_done()
+
+    def _drain(self):
+        while True:
+            try:
+                item = self.handoff.get_nowait()
+            except queue.Empty:
+                return
+            self._apply(item)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._drain()
+            if self.agent.pq.empty():
+                # Rien à balayer : attendre la prochaine transition
+                try:
+                    item = self.handoff.get(timeout=0.05)
+                except queue.Empty:
+                    continue
+                self._apply(item)
+                continue
+
+            for _ in range(self.sweeps_per_batch):
+                if not self.agent.sweep_once():
+                    break
+                self.n_sweeps += 1
+            # Laisser la main à la boucle principale entre deux lots
+            time.sleep(0)
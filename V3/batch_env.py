@@ -0,0 +1,263 @@
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from Dyna import MarathonEnvironment, MarathonTrainingState, TrainingAction, TrainingType
+from physio import BanisterEngine, performance, forme
+from workload import WorkloadTracker
+from weather import WeatherBank
+
+TYPE_CODES = {training_type: code for code, training_type in enumerate(TrainingType)}
+HISTORY_LENGTH = 7
+NO_SESSION = -1
+
+# Séquences récompensées par MarathonEnvironment._calculate_reward
+GOOD_SEQUENCES = np.array([
+    [TYPE_CODES[TrainingType.ENDURANCE], TYPE_CODES[TrainingType.INTERVAL], TYPE_CODES[TrainingType.REPOS]],
+    [TYPE_CODES[TrainingType.LONG], TYPE_CODES[TrainingType.REPOS], TYPE_CODES[TrainingType.INTERVAL]],
+    [TYPE_CODES[TrainingType.INTERVAL], TYPE_CODES[TrainingType.REPOS], TYPE_CODES[TrainingType.ENDURANCE]],
+])
+
+# Attributs lus par MarathonTrainingState.discretize(), dans l'ordre de la clé
+DISCRETIZED_FIELDS = ('fitness', 'fatigue', 'performance', 'vma', 'volume_hebdo',
+                      'risque_blessure', 'jours_avant_marathon', 'temperature')
+
+
+def discretize_features(values: np.ndarray) -> np.ndarray:
+    """Clés discretize() (N, 8) en int64 pour une matrice (N, 8) de DISCRETIZED_FIELDS"""
+    values = np.asarray(values, dtype=np.float64)
+    return np.column_stack([
+        np.round(values[:, 0] * 10),
+        np.round(values[:, 1] * 10),
+        np.round(values[:, 2] * 10),
+        np.round(values[:, 3] * 2),
+        np.round(values[:, 4] / 10),
+        np.round(values[:, 5] * 10),
+        np.minimum(120, values[:, 6]),
+        np.round(values[:, 7] / 5),
+    ]).astype(np.int64)
+
+
+class BatchMarathonEnvironment:
+    """
+    N environnements MarathonEnvironment simulés ensemble, avec un état en tableaux
+    (un élément par athlète) et des actions données par indice dans un catalogue.
+
+    La dynamique et la récompense reproduisent MarathonEnvironment.step ; les parties
+    qui ne dépendent que de l'action (charge, bonus de zone et de durée) sont
+    précalculées à partir de l'environnement scalaire lui-même.
+    """
+    def __init__(self, n_envs: int, actions: List[TrainingAction],
+                 athlete_params: Dict[str, Sequence[float]] = None,
+                 weather_bank: WeatherBank = None):
+        self.n_envs = n_envs
+        self.actions = list(actions)
+        self.weather_bank = weather_bank
+        self.athlete_params = {name: np.broadcast_to(np.asarray(value, dtype=np.float64), (n_envs,))
+                               for name, value in (athlete_params or {}).items()}
+
+        defaults = MarathonTrainingState()
+        params = {name: self.athlete_params.get(name, getattr(defaults, name))
+                  for name in ('tau_fitness', 'tau_fatigue', 'k_fitness', 'k_fatigue')}
+        self.engine = BanisterEngine(**params)
+
+        # Tables par action, dérivées de l'environnement scalaire
+        scalar_env = MarathonEnvironment()
+        self.action_type = np.array([TYPE_CODES[a.type] for a in self.actions])
+        self.action_duree = np.array([a.duree for a in self.actions], dtype=np.float64)
+        self.action_load = np.array([scalar_env._calculate_training_load(a) for a in self.actions])
+        self.action_static_reward = np.array([
+            2.0 * (a.zone_fc in scalar_env.zones_par_type[a.type]) +
+            1.0 * (a.duree in scalar_env.durees_par_type[a.type])
+            for a in self.actions])
+        self.action_is_long = self.action_type == TYPE_CODES[TrainingType.LONG]
+        self.action_is_rest = self.action_type == TYPE_CODES[TrainingType.REPOS]
+
+        self.reset()
+
+    def reset(self, seeds: Sequence[int] = None):
+        """Réinitialise tous les environnements ; `seeds` choisit les scénarios météo"""
+        n = self.n_envs
+        defaults = MarathonTrainingState()
+        self.fitness = np.zeros(n)
+        self.fatigue = np.zeros(n)
+        self.performance = np.zeros(n)
+        self.forme = np.zeros(n)
+        self.vma = np.array(self.athlete_params.get('vma', np.full(n, defaults.vma)), dtype=np.float64)
+        self.volume_hebdo = np.zeros(n)
+        self.risque_blessure = np.zeros(n)
+        self.jours_avant_marathon = np.full(n, defaults.jours_avant_marathon, dtype=np.int64)
+        self.temperature = np.full(n, defaults.temperature)
+        self.meteo = np.zeros(n, dtype=np.int64)
+        self.charges = WorkloadTracker((n,))
+        self.history = np.full((n, HISTORY_LENGTH), NO_SESSION, dtype=np.int64)
+        self.history_count = np.zeros(n, dtype=np.int64)
+        self.day = 0
+        self.last_load = np.zeros(n)
+
+        self.weather = None
+        if self.weather_bank is not None:
+            if seeds is None:
+                seeds = np.random.randint(0, len(self.weather_bank), size=n)
+            index = np.asarray(seeds) % len(self.weather_bank)
+            order = np.argsort(index)
+            # Lecture triée dans le memory-map puis remise dans l'ordre des environnements
+            conditions = np.empty((n, self.weather_bank.n_days), dtype=np.int64)
+            temperature = np.empty((n, self.weather_bank.n_days))
+            load_factor = np.empty((n, self.weather_bank.n_days))
+            conditions[order] = self.weather_bank.conditions[index[order]]
+            temperature[order] = self.weather_bank.temperature[index[order]]
+            load_factor[order] = self.weather_bank.load_factor[index[order]]
+            self.weather = (conditions, temperature, load_factor)
+            self._apply_weather(0)
+        return self
+
+    def load_states(self, states: Sequence[MarathonTrainingState]):
+        """
+        Place l'environnement i dans l'état scalaire states[i] (inverse de to_state) :
+        attributs physiologiques, historique, charges glissantes et paramètres de l'athlète.
+        Les environnements chargés n'ont pas de météo (température figée à celle de l'état).
+        """
+        if len(states) != self.n_envs:
+            raise ValueError(f"{len(states)} états pour {self.n_envs} environnements")
+        for name in ('fitness', 'fatigue', 'performance', 'forme', 'vma', 'volume_hebdo',
+                     'risque_blessure', 'temperature'):
+            setattr(self, name, np.array([getattr(s, name) for s in states], dtype=np.float64))
+        self.jours_avant_marathon = np.array([s.jours_avant_marathon for s in states], dtype=np.int64)
+        conditions = [c.value for c in MarathonEnvironment.WEATHER_BY_CODE]
+        self.meteo = np.array([conditions.index(s.meteo.value) for s in states], dtype=np.int64)
+
+        self.history = np.full((self.n_envs, HISTORY_LENGTH), NO_SESSION, dtype=np.int64)
+        for i, s in enumerate(states):
+            recent = [TYPE_CODES[t] for t in s.derniers_entrainements[-HISTORY_LENGTH:]]
+            if recent:
+                self.history[i, -len(recent):] = recent
+        self.history_count = np.array([min(len(s.derniers_entrainements), HISTORY_LENGTH) for s in states],
+                                      dtype=np.int64)
+
+        # Tampons circulaires remis dans l'ordre chronologique : position commune 0
+        self.charges = WorkloadTracker((self.n_envs,))
+        for name in ('acute', 'chronic', 'volume'):
+            rolling = getattr(self.charges, name)
+            scalars = [getattr(s.charges, name) for s in states]
+            rolling.buffer = np.stack([np.roll(r.buffer, -r.position) for r in scalars], axis=1)
+            rolling.total = np.array([r.total for r in scalars], dtype=np.float64)
+            rolling.count = np.array([r.count for r in scalars], dtype=np.int64)
+            rolling.position = 0
+
+        self.athlete_params = {name: np.array([getattr(s, name) for s in states], dtype=np.float64)
+                               for name in ('tau_fitness', 'tau_fatigue', 'k_fitness', 'k_fatigue')}
+        self.engine = BanisterEngine(**self.athlete_params)
+        self.weather = None
+        self.day = 0
+        self.last_load = np.zeros(self.n_envs)
+        return self
+
+    def _apply_weather(self, day: int):
+        conditions, temperature, _ = self.weather
+        day = min(day, conditions.shape[1] - 1)
+        self.meteo = conditions[:, day]
+        self.temperature = temperature[:, day].astype(np.float64)
+
+    def step(self, action_indices: np.ndarray):
+        """Un jour pour tous les environnements ; retourne (récompenses, terminés)"""
+        action_indices = np.asarray(action_indices)
+        types = self.action_type[action_indices]
+
+        # Historique des 7 derniers types de séance
+        self.history[:, :-1] = self.history[:, 1:]
+        self.history[:, -1] = types
+        self.history_count = np.minimum(self.history_count + 1, HISTORY_LENGTH)
+
+        weather_factor = np.ones(self.n_envs)
+        if self.weather is not None:
+            weather_factor = self.weather[2][:, min(self.day, self.weather[2].shape[1] - 1)]
+        load = self.action_load[action_indices] * weather_factor
+        self.last_load = load
+
+        self.fitness, self.fatigue = self.engine.step_batch(self.fitness, self.fatigue, load)
+        self.performance = performance(self.fitness, self.fatigue)
+        self.forme = forme(self.fitness, self.fatigue)
+        self.charges.update(load, self.action_duree[action_indices])
+        self.volume_hebdo = self.charges.weekly_hours
+        self.risque_blessure = self.charges.risk
+
+        rewards = self._rewards(action_indices, types, weather_factor)
+
+        self.jours_avant_marathon = np.maximum(0, self.jours_avant_marathon - 1)
+        self.day += 1
+        if self.weather is not None:
+            self._apply_weather(self.day)
+        dones = self.jours_avant_marathon <= 0
+        return rewards, dones
+
+    def _rewards(self, action_indices: np.ndarray, types: np.ndarray,
+                 weather_factor: np.ndarray) -> np.ndarray:
+        rewards = (self.performance - (self.fitness - self.fatigue) / 2) * 10
+
+        # Sorties longues (l'action du jour fait déjà partie de l'historique)
+        is_long = self.action_is_long[action_indices]
+        has_long = (self.history == TYPE_CODES[TrainingType.LONG]).any(axis=1)
+        rewards -= 5.0 * (is_long & has_long)
+        rewards += 4.0 * (is_long & ~has_long & (self.jours_avant_marathon > 60))
+
+        # Compteurs par environnement : les états chargés par load_states n'ont pas le même âge
+        has_three = self.history_count >= 3
+        if has_three.any():
+            last_three = self.history[:, -3:]
+            good = (last_three[:, None, :] == GOOD_SEQUENCES[None]).all(axis=2).any(axis=1)
+            rewards += 2.0 * (good & has_three)
+
+        full_week = self.history_count >= HISTORY_LENGTH
+        if full_week.any():
+            counts = np.zeros((self.n_envs, len(TYPE_CODES)), dtype=np.int64)
+            played = self.history != NO_SESSION
+            np.add.at(counts, (np.arange(self.n_envs)[:, None], np.where(played, self.history, 0)), played)
+            rewards -= (counts > 2).sum(axis=1) * full_week
+
+        rewards += self.action_static_reward[action_indices]
+        rewards -= 5.0 * (weather_factor - 1.0) * ~self.action_is_rest[action_indices]
+        rewards -= 3.0 * self.risque_blessure
+        rewards -= 5.0 * (self.fatigue > 1.5 * self.fitness)
+        return rewards
+
+    # --- Clés d'état pour l'agent ---------------------------------------------
+
+    def feature_matrix(self, names: Sequence[str]) -> np.ndarray:
+        """Matrice (N, F) des attributs demandés"""
+        return np.column_stack([np.asarray(getattr(self, name), dtype=np.float64) for name in names])
+
+    def discretize(self) -> List[tuple]:
+        """Équivalent vectorisé de MarathonTrainingState.discretize()"""
+        return [tuple(row) for row in discretize_features(self.feature_matrix(DISCRETIZED_FIELDS)).tolist()]
+
+    def state_keys(self, agent) -> list:
+        """Clés d'état au format de l'agent (discretize, encodeur ou tile coding)"""
+        if agent.value_approx is not None:
+            return agent.value_approx.state_keys(self.feature_matrix(agent.value_approx.feature_names))
+        if agent.state_encoder is not None:
+            bins = agent.state_encoder.encode_batch(self.feature_matrix(agent.state_encoder.names))
+            return [tuple(row) for row in bins.tolist()]
+        return self.discretize()
+
+    def to_state(self, i: int) -> MarathonTrainingState:
+        """Reconstitue l'état scalaire de l'environnement i (présentation, API scalaires)"""
+        state = MarathonTrainingState()
+        for name in ('fitness', 'fatigue', 'performance', 'forme', 'vma', 'volume_hebdo',
+                     'risque_blessure', 'temperature'):
+            setattr(state, name, float(getattr(self, name)[i]))
+        state.jours_avant_marathon = int(self.jours_avant_marathon[i])
+        state.meteo = MarathonEnvironment.WEATHER_BY_CODE[int(self.meteo[i])]
+        types = list(TrainingType)
+        state.derniers_entrainements = [types[t] for t in self.history[i] if t != NO_SESSION]
+        for name, value in self.athlete_params.items():
+            setattr(state, name, float(value[i]))
+        # Charges glissantes de l'environnement i (inverse de load_states)
+        for name in ('acute', 'chronic', 'volume'):
+            batched = getattr(self.charges, name)
+            rolling = getattr(state.charges, name)
+            rolling.buffer = batched.buffer[:, i].copy()
+            rolling.total = np.float64(batched.total[i])
+            rolling.position = batched.position
+            rolling.count = int(batched.count[i]) if np.ndim(batched.count) else batched.count
+        return state
@@ -0,0 +1,342 @@
+import ast
+import json
+import os
+import random
+import time
+from collections import deque
+from typing import Dict, List
+
+import numpy as np
+
+from Dyna import MarathonTrainingState
+from world_model import WorldModel
+
+
+def _fsync_dir(directory: str):
+    # Rend durable le renommage (sans effet sur les systèmes qui ne le permettent pas)
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _write_atomic(path: str, text: str):
+    """Écrit un fichier complet puis le substitue à l'ancien : jamais de fichier à moitié écrit"""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    _fsync_dir(os.path.dirname(os.path.abspath(path)))
+
+
+def _rng_state() -> Dict:
+    version, internal, gauss = random.getstate()
+    name, keys, pos, has_gauss, cached = np.random.get_state()
+    return {'python': [version, list(internal), gauss],
+            'numpy': [name, keys.tolist(), pos, has_gauss, cached]}
+
+
+def _set_rng_state(state: Dict):
+    version, internal, gauss = state['python']
+    random.setstate((version, tuple(internal), gauss))
+    name, keys, pos, has_gauss, cached = state['numpy']
+    np.random.set_state((name, np.array(keys, dtype=np.uint32), pos, has_gauss, cached))
+
+
+def _state_record(state: MarathonTrainingState) -> Dict:
+    """État complet, charges glissantes comprises (to_dict ne les transmet pas)"""
+    record = state.to_dict()
+    record['charges'] = {name: [rolling.buffer.tolist(), float(rolling.total), rolling.position, rolling.count]
+                         for name, rolling in _rolling_sums(state.charges)}
+    return record
+
+
+def _state_from_record(record: Dict) -> MarathonTrainingState:
+    state = MarathonTrainingState.from_dict(record)
+    for name, rolling in _rolling_sums(state.charges):
+        buffer, total, position, count = record['charges'][name]
+        rolling.buffer = np.array(buffer, dtype=np.float64)
+        rolling.total = np.float64(total)
+        rolling.position = position
+        rolling.count = count
+    return state
+
+
+def _rolling_sums(charges):
+    return [(name, getattr(charges, name)) for name in ('acute', 'chronic', 'volume')]
+
+
+class CheckpointManager:
+    """
+    Checkpoints incrémentaux d'un AdvancedDynaQMarathon pendant l'entraînement.
+
+    Le répertoire contient un instantané complet (snapshot.json) et un journal en ajout
+    seul (deltas.jsonl) : chaque checkpoint n'y écrit que les entrées de Q et du modèle
+    modifiées ou supprimées depuis le précédent, les opérations de la file de priorité,
+    les poids du tile coding modifiés, epsilon, l'épisode suivant, l'état des
+    générateurs aléatoires, le compteur de pas réels et les états ajoutés au tampon
+    des rollouts imaginés : sa taille suit le nombre de modifications, pas celle des
+    tables. Le journal est compacté dans un nouvel instantané (file et poids complets)
+    tous les `compact_every` deltas, ou dès qu'il dépasse la taille de l'instantané.
+    Les instantanés sont remplacés de façon atomique et une ligne de journal tronquée
+    par un crash est ignorée à la reprise.
+
+    Le suivi des modifications passe par agent.q_changes, agent.model.changes,
+    agent.pq.changes et agent.value_approx.changes.
+    Avec la planification en tâche de fond, le thread doit être arrêté pendant save().
+    """
+    SNAPSHOT = "snapshot.json"
+    LOG = "deltas.jsonl"
+    # Ancien nom des poids (réécrits à chaque checkpoint), encore lu à la reprise
+    WEIGHTS = "weights.npy"
+
+    def __init__(self, directory: str, compact_every: int = 20):
+        self.directory = directory
+        self.compact_every = compact_every
+        self.snapshot_path = os.path.join(directory, self.SNAPSHOT)
+        self.log_path = os.path.join(directory, self.LOG)
+        self.seq = 0
+        self.n_deltas = 0
+        self.snapshot_bytes = 0
+        self.log_bytes = 0
+        self._n_rewards = 0
+        self._n_real_steps = 0
+        self._parsed = {}
+        os.makedirs(directory, exist_ok=True)
+
+    def exists(self) -> bool:
+        return os.path.exists(self.snapshot_path)
+
+    def attach(self, agent):
+        """Active le suivi des modifications de Q, du modèle, de la file et des poids"""
+        agent.q_changes = set()
+        agent.model.changes = set()
+        agent.pq.changes = []
+        if agent.value_approx is not None:
+            agent.value_approx.changes = np.zeros(agent.value_approx.weights.shape, dtype=bool)
+        self._n_rewards = len(agent.episode_rewards)
+        self._n_real_steps = agent.n_real_steps
+
+    # --- Écriture -------------------------------------------------------------
+
+    def save(self, agent, episode: int, schedule: Dict = None) -> Dict:
+        """Checkpoint à la fin de l'épisode `episode - 1` : delta, ou instantané si nécessaire"""
+        if agent.q_changes is None or agent.model.changes is None or agent.pq.changes is None:
+            self.attach(agent)
+        if not self.exists() or self.n_deltas >= self.compact_every or self.log_bytes > self.snapshot_bytes:
+            return self.snapshot(agent, episode, schedule)
+
+        start = time.perf_counter()
+        self.seq += 1
+        delta = self._header(agent, episode, schedule)
+        # Entrée supprimée (compact) : [état, action] sans valeur
+        delta['Q'] = [[str(s), str(a), agent.Q[s][a]] if a in agent.Q.get(s, ()) else [str(s), str(a)]
+                      for s, a in agent.q_changes]
+        delta['model'] = [self._model_entry(agent.model, sa) if sa in agent.model else [str(sa)]
+                          for sa in agent.model.changes]
+        delta['pq_ops'] = [[op[0], str(op[1])] if isinstance(op, list) else op for op in agent.pq.changes]
+        if agent.value_approx is not None:
+            tiles, columns = np.nonzero(agent.value_approx.changes)
+            delta['weights'] = [tiles.tolist(), columns.tolist(),
+                                agent.value_approx.weights[tiles, columns].tolist()]
+        delta['episode_rewards'] = agent.episode_rewards[self._n_rewards:]
+        n_new_states = min(agent.n_real_steps - self._n_real_steps, len(agent.recent_states))
+        delta['recent_states'] = [_state_record(state) for state in
+                                  list(agent.recent_states)[len(agent.recent_states) - n_new_states:]]
+        line = json.dumps(delta) + "\n"
+        with open(self.log_path, 'a') as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+
+        self.n_deltas += 1
+        self.log_bytes += len(line)
+        report = {'kind': 'delta', 'seq': self.seq, 'q_entries': len(delta['Q']),
+                  'model_entries': len(delta['model']), 'bytes': len(line),
+                  'seconds': time.perf_counter() - start}
+        self._reset_changes(agent)
+        return report
+
+    def snapshot(self, agent, episode: int, schedule: Dict = None) -> Dict:
+        """Instantané complet ; le journal est vidé une fois l'instantané en place"""
+        start = time.perf_counter()
+        # Nouveau numéro : les deltas déjà inclus (crash avant le vidage du journal) sont plus anciens
+        self.seq += 1
+        data = self._header(agent, episode, schedule)
+        data['pq'] = [[-neg_priority, str(sa)] for neg_priority, sa in agent.pq.pq.queue]
+        data['Q'] = [[str(s), str(a), value] for s, row in agent.Q.items() for a, value in row.items()]
+        data['model'] = [self._model_entry(agent.model, sa) for sa in agent.model]
+        data['episode_rewards'] = agent.episode_rewards
+        data['recent_states'] = [_state_record(state) for state in agent.recent_states]
+        if agent.value_approx is not None:
+            data['weights'] = self._save_weights(agent)
+        text = json.dumps(data)
+        _write_atomic(self.snapshot_path, text)
+        # Un crash ici laisse des deltas déjà inclus : ignorés grâce à leur numéro
+        _write_atomic(self.log_path, "")
+        self._remove_stale_weights(data.get('weights'))
+
+        self.n_deltas = 0
+        self.snapshot_bytes = len(text)
+        self.log_bytes = 0
+        report = {'kind': 'snapshot', 'seq': self.seq, 'q_entries': len(data['Q']),
+                  'model_entries': len(data['model']), 'bytes': len(text),
+                  'seconds': time.perf_counter() - start}
+        self._reset_changes(agent)
+        return report
+
+    def _header(self, agent, episode: int, schedule: Dict) -> Dict:
+        return {
+            'seq': self.seq,
+            'episode': episode,
+            'schedule': schedule or {},
+            'params': {'epsilon': agent.epsilon,
+                       'total_planning_sweeps': agent.total_planning_sweeps,
+                       'n_real_steps': agent.n_real_steps},
+            'rng': _rng_state(),
+        }
+
+    @staticmethod
+    def _model_entry(model: WorldModel, state_action) -> List:
+        reward, next_state = model[state_action]
+        return [str(state_action), reward, str(next_state), model.priorities.get(state_action, 0.0)]
+
+    def _save_weights(self, agent) -> str:
+        """Poids complets du tile coding, dans un fichier propre à l'instantané"""
+        name = f"weights-{self.seq}.npy"
+        path = os.path.join(self.directory, name)
+        with open(path + ".tmp", 'wb') as f:
+            np.save(f, agent.value_approx.weights)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + ".tmp", path)
+        return name
+
+    def _remove_stale_weights(self, current: str):
+        # Poids des instantanés précédents, inutiles une fois le nouvel instantané en place
+        for name in os.listdir(self.directory):
+            if name.startswith("weights") and name.endswith(".npy") and name != current:
+                os.remove(os.path.join(self.directory, name))
+
+    def _reset_changes(self, agent):
+        agent.q_changes.clear()
+        agent.model.changes.clear()
+        agent.pq.changes.clear()
+        if agent.value_approx is not None:
+            agent.value_approx.changes[:] = False
+        self._n_rewards = len(agent.episode_rewards)
+        self._n_real_steps = agent.n_real_steps
+
+    # --- Reprise ----------------------------------------------------------------
+
+    def _parse(self, text: str):
+        key = self._parsed.get(text)
+        if key is None:
+            key = self._parsed[text] = ast.literal_eval(text)
+        return key
+
+    def _read_log(self) -> List[Dict]:
+        """Deltas valides du journal ; une ligne incomplète (crash) et la suite sont retirées"""
+        if not os.path.exists(self.log_path):
+            return []
+        deltas = []
+        valid_bytes = 0
+        with open(self.log_path, 'rb') as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    deltas.append(json.loads(line))
+                except ValueError:
+                    break
+                valid_bytes += len(line)
+        if valid_bytes < os.path.getsize(self.log_path):
+            with open(self.log_path, 'r+b') as f:
+                f.truncate(valid_bytes)
+        self.log_bytes = valid_bytes
+        return deltas
+
+    def restore(self, agent) -> Dict:
+        """
+        Recharge le dernier état : Q, modèle, prédécesseurs, file de priorité, poids,
+        epsilon, récompenses par épisode et générateurs aléatoires. Retourne l'épisode suivant
+        et le schéma d'epsilon enregistrés.
+        """
+        with open(self.snapshot_path) as f:
+            text = f.read()
+        snapshot = json.loads(text)
+        self.snapshot_bytes = len(text)
+        deltas = [d for d in self._read_log() if d['seq'] > snapshot['seq']]
+        self.n_deltas = len(deltas)
+        parse = self._parse
+
+        agent.Q.clear()
+        for state_str, action_str, value in snapshot['Q']:
+            agent.Q[parse(state_str)][parse(action_str)] = value
+        agent.predecessors.clear()
+        agent.model = WorldModel(agent.model.capacity, agent.model.eviction, agent.predecessors)
+        for state_action, reward, next_state, priority in snapshot['model']:
+            agent.model.record(parse(state_action), reward, parse(next_state), priority)
+        agent.episode_rewards = list(snapshot['episode_rewards'])
+        agent.recent_states = deque((_state_from_record(r) for r in snapshot.get('recent_states', [])),
+                                    maxlen=agent.recent_states.maxlen)
+
+        agent.pq = type(agent.pq)(agent.pq.theta)
+        for priority, state_action in snapshot['pq']:
+            agent.pq.push(priority, parse(state_action))
+        if agent.value_approx is not None:
+            weights_path = os.path.join(self.directory, snapshot.get('weights', self.WEIGHTS))
+            if os.path.exists(weights_path):
+                agent.value_approx.weights = np.load(weights_path)
+
+        last = snapshot
+        for delta in deltas:
+            for entry in delta['Q']:
+                state_key, action_key = parse(entry[0]), parse(entry[1])
+                if len(entry) == 3:
+                    agent.Q[state_key][action_key] = entry[2]
+                elif action_key in agent.Q.get(state_key, ()):
+                    del agent.Q[state_key][action_key]
+                    if not agent.Q[state_key]:
+                        del agent.Q[state_key]
+            for entry in delta['model']:
+                state_action = parse(entry[0])
+                if len(entry) == 1:
+                    if state_action in agent.model:
+                        agent.model.remove(state_action)
+                else:
+                    agent.model.record(state_action, entry[1], parse(entry[2]), entry[3])
+            agent.episode_rewards.extend(delta['episode_rewards'])
+            agent.recent_states.extend(_state_from_record(r) for r in delta.get('recent_states', []))
+            if 'pq' in delta:
+                # Ancien format : file complète dans chaque delta
+                agent.pq = type(agent.pq)(agent.pq.theta)
+                for priority, state_action in delta['pq']:
+                    agent.pq.push(priority, parse(state_action))
+            # Les opérations rejouées dans l'ordre redonnent exactement le même tas
+            for op in delta.get('pq_ops', ()):
+                if isinstance(op, list):
+                    agent.pq.push(op[0], parse(op[1]))
+                else:
+                    for _ in range(op):
+                        agent.pq.pop()
+            if 'weights' in delta and agent.value_approx is not None:
+                tiles, columns, values = delta['weights']
+                agent.value_approx.weights[tiles, columns] = values
+            last = delta
+
+        for param, value in last['params'].items():
+            setattr(agent, param, value)
+        _set_rng_state(last['rng'])
+
+        self.seq = last['seq']
+        self.attach(agent)
+        return {'episode': last['episode'], 'schedule': last['schedule'], 'deltas': len(deltas)}
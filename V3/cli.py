@@ -0,0 +1,202 @@
+"""
+Points d'entrée en ligne de commande du projet V3. Le moteur de Banister partagé
+avec V2 s'installe une fois depuis la racine du dépôt : pip install -e .
+
+    python cli.py train --episodes 5000 --output trained_marathon_model.json
+    python cli.py plan --model trained_marathon_model.json --output plan_marathon.csv
+    python cli.py analyze --model trained_marathon_model.json
+    python cli.py cohort --model trained_marathon_model.json --athletes 10000
+    python cli.py distill --model trained_marathon_model.json --method tree
+    python cli.py benchmark
+
+Les modules lourds (numpy, Dyna, gymnasium, pandas, matplotlib) ne sont importés que par la
+commande qui les utilise : `--help` et les commandes sans tracé démarrent vite.
+"""
+import argparse
+import sys
+import time
+
+
+def cmd_train(args):
+    from Dyna import AdvancedDynaQMarathon, train_agent
+
+    agent = AdvancedDynaQMarathon(n_planning_steps=args.planning_steps,
+                                  imagination_batch_size=args.imagination_batch,
+                                  imagination_depth=args.imagination_depth)
+    if args.warm_start:
+        from warm_start import warm_start
+
+        warm_start(agent, args.warm_start, verbose=not args.quiet)
+    weather_bank = None
+    if args.weather_dir:
+        from weather import WeatherBank
+
+        weather_bank = WeatherBank.get_or_create(args.weather_dir, args.weather_scenarios)
+    agent, _ = train_agent(episodes=args.episodes, agent=agent,
+                           seed=args.seed, background_planning=args.background,
+                           eval_every=args.eval_every, checkpoint_dir=args.checkpoint_dir,
+                           checkpoint_every=args.checkpoint_every, weather_bank=weather_bank,
+                           verbose=not args.quiet)
+    agent.save_model(args.output)
+    print(f"Modèle sauvegardé : {args.output}")
+
+
+def cmd_plan(args):
+    from analyze import generate_full_training_plan, save_training_plan
+
+    training_data = generate_full_training_plan(args.model)
+    save_training_plan(training_data, args.output)
+    print(f"Plan de {len(training_data)} jours écrit dans {args.output}")
+
+
+def cmd_analyze(args):
+    from analyze import (generate_full_training_plan, save_training_plan,
+                         plot_physiological_values, analyze_training_distribution)
+
+    training_data = generate_full_training_plan(args.model)
+    save_training_plan(training_data, args.plan_output)
+    plot_physiological_values(training_data, args.figure)
+    print(analyze_training_distribution(training_data))
+
+
+def cmd_cohort(args):
+    from Dyna import AdvancedDynaQMarathon
+    from cohort import PlanStore, cohort_report
+
+    agent = AdvancedDynaQMarathon()
+    agent.load_model(args.model)
+    store = PlanStore.generate(args.store, agent, args.athletes, seed=args.seed)
+    result = cohort_report(store, args.output, athletes=range(args.athlete_charts),
+                           max_workers=args.workers)
+    print(f"Rapport de cohorte ({len(store)} athlètes) : {len(result['charts'])} graphiques dans {args.output}")
+
+
+def cmd_distill(args):
+    from Dyna import AdvancedDynaQMarathon
+    from distill import distill
+
+    agent = AdvancedDynaQMarathon()
+    agent.load_model(args.model)
+    _, report = distill(agent, args.output, method=args.method, n_episodes=args.episodes,
+                        max_depth=args.max_depth, seed=args.seed)
+    print(f"Politique {report['method']} : {report['bytes'] / 1024:.0f} Ko "
+          f"({report['q_entries']} entrées de Q) dans {args.output}")
+    print(f"Accord avec la table : {report['agreement']:.1%} sur {report['states']} états, "
+          f"retour {report['return_distilled']:.2f} contre {report['return_full']:.2f}")
+
+
+def cmd_benchmark(args):
+    import numpy as np
+    from Dyna import AdvancedDynaQMarathon, MarathonEnvironment
+    from batch_env import BatchMarathonEnvironment
+    from evaluation import evaluate_agent
+
+    agent = AdvancedDynaQMarathon()
+    rng = np.random.default_rng(0)
+
+    env = MarathonEnvironment()
+    env.reset()
+    start = time.perf_counter()
+    for index in rng.integers(0, len(agent.actions), size=args.steps):
+        _, _, done = env.step(agent.actions[index])
+        if done:
+            env.reset()
+    scalar = args.steps / (time.perf_counter() - start)
+
+    batch_env = BatchMarathonEnvironment(args.batch_size, agent.actions)
+    n_steps = max(1, args.steps // args.batch_size)
+    start = time.perf_counter()
+    for _ in range(n_steps):
+        _, done = batch_env.step(rng.integers(0, len(agent.actions), size=args.batch_size))
+        if done.all():
+            batch_env.reset()
+    batched = n_steps * args.batch_size / (time.perf_counter() - start)
+
+    from gym_env import MarathonVectorEnv
+
+    vector_env = MarathonVectorEnv(args.batch_size)
+    vector_env.reset(seed=0)
+    start = time.perf_counter()
+    for _ in range(n_steps):
+        vector_env.step(vector_env.action_space.sample())
+    vectorized = n_steps * args.batch_size / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    evaluate_agent(agent, args.batch_size)
+    evaluation = time.perf_counter() - start
+
+    print(f"Environnement scalaire : {scalar:,.0f} pas/s")
+    print(f"Environnement batché ({args.batch_size}) : {batched:,.0f} pas/s")
+    print(f"VectorEnv gymnasium ({args.batch_size}) : {vectorized:,.0f} pas/s")
+    print(f"Évaluation gloutonne de {args.batch_size} épisodes : {evaluation:.2f} s")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="peakflow", description="Plans d'entraînement marathon (Dyna-Q)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    train = commands.add_parser("train", help="Entraîner un agent et le sauvegarder")
+    train.add_argument("--episodes", type=int, default=5000)
+    train.add_argument("--planning-steps", type=int, default=10)
+    train.add_argument("--seed", type=int, default=None)
+    train.add_argument("--background", action="store_true", help="Planification en tâche de fond")
+    train.add_argument("--imagination-batch", type=int, default=None,
+                       help="Rollouts imaginés depuis ce nombre d'états récents (désactivé par défaut)")
+    train.add_argument("--imagination-depth", type=int, default=10)
+    train.add_argument("--eval-every", type=int, default=None)
+    train.add_argument("--warm-start", nargs="+", metavar="CSV",
+                       help="Journaux de séances historiques chargés avant l'entraînement")
+    train.add_argument("--checkpoint-dir", default=None,
+                       help="Checkpoints incrémentaux ; reprise automatique s'il en existe")
+    train.add_argument("--checkpoint-every", type=int, default=100)
+    train.add_argument("--weather-dir", default=None,
+                       help="Banque de scénarios météo (générée si absente) ; un scénario par épisode")
+    train.add_argument("--weather-scenarios", type=int, default=10000)
+    train.add_argument("--output", default="trained_marathon_model.json")
+    train.add_argument("--quiet", action="store_true")
+    train.set_defaults(func=cmd_train)
+
+    plan = commands.add_parser("plan", help="Générer le plan complet en CSV (sans pandas)")
+    plan.add_argument("--model", default="trained_marathon_model.json")
+    plan.add_argument("--output", default="plan_marathon.csv")
+    plan.set_defaults(func=cmd_plan)
+
+    analyze = commands.add_parser("analyze", help="Plan, graphique et distribution par phase")
+    analyze.add_argument("--model", default="trained_marathon_model.json")
+    analyze.add_argument("--plan-output", default="plan_marathon.csv")
+    analyze.add_argument("--figure", default="evolution_physiologique.png")
+    analyze.set_defaults(func=cmd_analyze)
+
+    cohort = commands.add_parser("cohort", help="Plans d'une cohorte et rapport agrégé")
+    cohort.add_argument("--model", default="trained_marathon_model.json")
+    cohort.add_argument("--athletes", type=int, default=1000)
+    cohort.add_argument("--seed", type=int, default=0)
+    cohort.add_argument("--store", default="cohort_plans")
+    cohort.add_argument("--output", default="cohort_report")
+    cohort.add_argument("--athlete-charts", type=int, default=0)
+    cohort.add_argument("--workers", type=int, default=None)
+    cohort.set_defaults(func=cmd_cohort)
+
+    distill = commands.add_parser("distill", help="Exporter la politique gloutonne en artefact compact")
+    distill.add_argument("--model", default="trained_marathon_model.json")
+    distill.add_argument("--method", choices=("table", "tree"), default="table")
+    distill.add_argument("--episodes", type=int, default=2048, help="Trajectoires d'apprentissage de l'arbre")
+    distill.add_argument("--max-depth", type=int, default=10)
+    distill.add_argument("--seed", type=int, default=0)
+    distill.add_argument("--output", default="policy.npz")
+    distill.set_defaults(func=cmd_distill)
+
+    benchmark = commands.add_parser("benchmark", help="Débit des environnements et de l'évaluation")
+    benchmark.add_argument("--steps", type=int, default=20000)
+    benchmark.add_argument("--batch-size", type=int, default=256)
+    benchmark.set_defaults(func=cmd_benchmark)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,282 @@
+import json
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Iterable, List, Sequence
+
+import numpy as np
+
+from Dyna import AdvancedDynaQMarathon, TrainingType
+from batch_env import BatchMarathonEnvironment, TYPE_CODES
+from evaluation import sample_athletes
+
+# Phases du plan (mêmes bornes que analyze_training_distribution) : fin de chaque phase, en jours
+PHASES = (('Base (1-48j)', 48), ('Spécifique (49-96j)', 96), ('Affûtage (97-120j)', 120))
+TYPE_NAMES = [t.value for t in TrainingType]
+QUANTILES = (5, 25, 50, 75, 95)
+
+# Colonnes du stockage et leur type : une matrice (athlètes, jours) par colonne
+COLUMNS = {
+    'type': np.int8,
+    'duree': np.int16,
+    'zone_fc': np.int8,
+    'load': np.float32,
+    'fitness': np.float32,
+    'fatigue': np.float32,
+    'performance': np.float32,
+}
+
+
+class PlanStore:
+    """
+    Plans d'une cohorte en stockage colonne : un fichier .npy (athlètes × jours) par
+    colonne, ouvert en memory-map. Les agrégations lisent les colonnes par blocs.
+    """
+    def __init__(self, directory: str):
+        self.directory = directory
+        with open(os.path.join(directory, "meta.json")) as f:
+            self.meta = json.load(f)
+        self.columns = {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode='r')
+                        for name in COLUMNS}
+
+    def __len__(self) -> int:
+        return self.columns['type'].shape[0]
+
+    @property
+    def n_days(self) -> int:
+        return self.columns['type'].shape[1]
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.columns[name]
+
+    def athlete_records(self, i: int) -> List[Dict]:
+        """Plan de l'athlète i au format de generate_full_training_plan"""
+        return [{
+            'jour': day + 1,
+            'type': TYPE_NAMES[self['type'][i, day]],
+            'duree': int(self['duree'][i, day]),
+            'zone_fc': int(self['zone_fc'][i, day]),
+            'fitness': float(self['fitness'][i, day]),
+            'fatigue': float(self['fatigue'][i, day]),
+            'performance': float(self['performance'][i, day]),
+        } for day in range(self.n_days)]
+
+    @classmethod
+    def generate(cls, directory: str, agent: AdvancedDynaQMarathon, n_athletes: int,
+                 seed: int = 0, chunk_size: int = 4096) -> "PlanStore":
+        """Plans gloutons de n_athletes athlètes tirés au hasard, écrits bloc par bloc"""
+        os.makedirs(directory, exist_ok=True)
+        n_days = int(BatchMarathonEnvironment(1, agent.actions).jours_avant_marathon[0])
+        open_memmap = np.lib.format.open_memmap
+        arrays = {name: open_memmap(os.path.join(directory, f"{name}.npy"), mode='w+',
+                                    dtype=dtype, shape=(n_athletes, n_days))
+                  for name, dtype in COLUMNS.items()}
+
+        rng = np.random.default_rng(seed)
+        # Actions des états inconnus de la table Q, sans toucher au générateur global
+        fallback_rng = random.Random(seed)
+        action_zone = np.array([a.zone_fc for a in agent.actions])
+        for start in range(0, n_athletes, chunk_size):
+            stop = min(start + chunk_size, n_athletes)
+            env = BatchMarathonEnvironment(stop - start, agent.actions, sample_athletes(stop - start, rng))
+            for day in range(n_days):
+                actions = agent.greedy_action_indices(env.state_keys(agent), fallback_rng)
+                env.step(actions)
+                arrays['type'][start:stop, day] = env.action_type[actions]
+                arrays['duree'][start:stop, day] = env.action_duree[actions]
+                arrays['zone_fc'][start:stop, day] = action_zone[actions]
+                arrays['load'][start:stop, day] = env.last_load
+                arrays['fitness'][start:stop, day] = env.fitness
+                arrays['fatigue'][start:stop, day] = env.fatigue
+                arrays['performance'][start:stop, day] = env.performance
+        for array in arrays.values():
+            array.flush()
+        del arrays
+
+        with open(os.path.join(directory, "meta.json"), 'w') as f:
+            json.dump({'n_athletes': n_athletes, 'n_days': n_days, 'seed': seed}, f)
+        return cls(directory)
+
+
+# --- Agrégations vectorisées -------------------------------------------------
+
+def phase_of_day(n_days: int, phases=PHASES) -> np.ndarray:
+    """Indice de phase de chaque jour (0-indexé)"""
+    ends = np.array([end for _, end in phases])
+    return np.searchsorted(ends, np.arange(1, n_days + 1), side='left').clip(0, len(phases) - 1)
+
+
+def phase_type_distribution(store: PlanStore, phases=PHASES, chunk_size: int = 8192) -> Dict:
+    """
+    Nombre de séances par (phase, type) : un seul bincount sur l'indice combiné,
+    cumulé bloc par bloc d'athlètes.
+    """
+    n_types = len(TYPE_CODES)
+    combined_offset = phase_of_day(store.n_days, phases) * n_types
+    counts = np.zeros(len(phases) * n_types, dtype=np.int64)
+    for start in range(0, len(store), chunk_size):
+        types = np.asarray(store['type'][start:start + chunk_size], dtype=np.int64)
+        counts += np.bincount((types + combined_offset).ravel(), minlength=counts.size)
+    counts = counts.reshape(len(phases), n_types)
+    return {
+        'phases': [name for name, _ in phases],
+        'types': TYPE_NAMES,
+        'counts': counts,
+        'shares': counts / np.maximum(counts.sum(axis=1, keepdims=True), 1),
+    }
+
+
+def streaming_quantiles(blocks: Callable[[], Iterable[np.ndarray]], quantiles: Sequence[float] = QUANTILES,
+                        n_bins: int = 2048) -> np.ndarray:
+    """
+    Quantiles (len(quantiles), colonnes) de blocs de lignes (n, colonnes) en deux passes :
+    bornes par colonne, puis histogramme par colonne cumulé bloc par bloc. La mémoire ne
+    dépend que du nombre de colonnes et de n_bins. Résultat approché : la valeur est
+    interpolée linéairement dans la classe, d'où un écart à np.percentile de l'ordre d'une
+    largeur de classe ((max - min) / n_bins), ou de l'écart entre deux valeurs voisines
+    de l'échantillon pour une colonne à valeurs discrètes.
+    """
+    low = high = None
+    for block in blocks():
+        block_low, block_high = block.min(axis=0), block.max(axis=0)
+        low = block_low if low is None else np.minimum(low, block_low)
+        high = block_high if high is None else np.maximum(high, block_high)
+    n_columns = len(low)
+    width = (high - low) / n_bins
+    # Colonne constante : une seule classe, sans division par zéro
+    scale = np.where(width > 0, width, 1.0)
+
+    counts = np.zeros(n_columns * n_bins, dtype=np.int64)
+    column_offset = np.arange(n_columns) * n_bins
+    for block in blocks():
+        bins = np.clip(((block - low) / scale).astype(np.int64), 0, n_bins - 1)
+        counts += np.bincount((bins + column_offset).ravel(), minlength=counts.size)
+    counts = counts.reshape(n_columns, n_bins)
+
+    cumulative = np.cumsum(counts, axis=1)
+    result = np.empty((len(quantiles), n_columns))
+    for c in range(n_columns):
+        # Rang de np.percentile (interpolation linéaire), au centre de la masse de l'échantillon
+        targets = np.asarray(quantiles, dtype=np.float64) / 100 * (cumulative[c, -1] - 1) + 0.5
+        k = np.searchsorted(cumulative[c], targets, side='left').clip(0, n_bins - 1)
+        before = np.where(k > 0, cumulative[c, k - 1], 0)
+        fraction = np.where(counts[c, k] > 0, (targets - before) / np.maximum(counts[c, k], 1), 0.0)
+        result[:, c] = low[c] + (k + fraction.clip(0, 1)) * width[c]
+    return result
+
+
+def daily_quantiles(store: PlanStore, column: str, quantiles: Sequence[float] = QUANTILES,
+                    chunk_size: int = 8192) -> np.ndarray:
+    """Quantiles (len(quantiles), jours) d'une colonne sur la cohorte, par blocs d'athlètes"""
+    def blocks():
+        for start in range(0, len(store), chunk_size):
+            yield np.asarray(store[column][start:start + chunk_size], dtype=np.float64)
+    return streaming_quantiles(blocks, quantiles)
+
+
+def weekly_load_percentiles(store: PlanStore, quantiles: Sequence[float] = QUANTILES,
+                            chunk_size: int = 8192) -> np.ndarray:
+    """Quantiles (len(quantiles), semaines) de la charge hebdomadaire par athlète"""
+    n_weeks = store.n_days // 7
+
+    def blocks():
+        for start in range(0, len(store), chunk_size):
+            loads = np.asarray(store['load'][start:start + chunk_size, :n_weeks * 7], dtype=np.float64)
+            yield loads.reshape(len(loads), n_weeks, 7).sum(axis=2)
+    return streaming_quantiles(blocks, quantiles)
+
+
+def cohort_summary(store: PlanStore, quantiles: Sequence[float] = QUANTILES) -> Dict:
+    return {
+        'n_athletes': len(store),
+        'n_days': store.n_days,
+        'quantiles': list(quantiles),
+        'distribution': phase_type_distribution(store),
+        'load': daily_quantiles(store, 'load', quantiles),
+        'weekly_load': weekly_load_percentiles(store, quantiles),
+        'fitness': daily_quantiles(store, 'fitness', quantiles),
+        'fatigue': daily_quantiles(store, 'fatigue', quantiles),
+        'performance': daily_quantiles(store, 'performance', quantiles),
+    }
+
+
+# --- Rendu des graphiques (sans affichage, en parallèle) --------------------
+
+def _render_fan_chart(args) -> str:
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    name, bands, quantiles, path = args
+    days = np.arange(1, bands.shape[1] + 1)
+    fig, ax = plt.subplots(figsize=(12, 6))
+    n_bands = len(quantiles) // 2
+    for k in range(n_bands):
+        ax.fill_between(days, bands[k], bands[-1 - k], alpha=0.15 + 0.2 * k, color='tab:blue',
+                        label=f"{quantiles[k]}-{quantiles[-1 - k]} %")
+    if len(quantiles) % 2:
+        ax.plot(days, bands[n_bands], color='tab:blue', linewidth=2, label='Médiane')
+    ax.set_title(f"Cohorte : {name}")
+    ax.set_xlabel('Jours')
+    ax.legend()
+    ax.grid(True, alpha=0.3)
+    fig.tight_layout()
+    fig.savefig(path, dpi=100)
+    plt.close(fig)
+    return path
+
+
+def _render_distribution(args) -> str:
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    distribution, path = args
+    fig, ax = plt.subplots(figsize=(12, 6))
+    bottom = np.zeros(len(distribution['phases']))
+    for t, type_name in enumerate(distribution['types']):
+        ax.bar(distribution['phases'], distribution['shares'][:, t], bottom=bottom, label=type_name)
+        bottom += distribution['shares'][:, t]
+    ax.set_title('Répartition des séances par phase')
+    ax.legend(fontsize=8, ncol=2)
+    fig.tight_layout()
+    fig.savefig(path, dpi=100)
+    plt.close(fig)
+    return path
+
+
+def _render_athlete(args) -> str:
+    from analyze import plot_physiological_values
+
+    store_dir, athlete, path = args
+    plot_physiological_values(PlanStore(store_dir).athlete_records(athlete), path)
+    return path
+
+
+def cohort_report(store: PlanStore, output_dir: str, athletes: Sequence[int] = (),
+                  max_workers: int = None) -> Dict:
+    """
+    Agrégats de la cohorte (JSON) et graphiques : éventails fitness / fatigue /
+    performance / charge, répartition par phase et, en option, le plan de quelques
+    athlètes. Les graphiques sont rendus dans un pool de processus.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    summary = cohort_summary(store)
+    quantiles = summary['quantiles']
+
+    jobs = [(_render_fan_chart, (name, summary[name], quantiles, os.path.join(output_dir, f"{name}.png")))
+            for name in ('fitness', 'fatigue', 'performance', 'load')]
+    jobs.append((_render_distribution, (summary['distribution'], os.path.join(output_dir, "distribution.png"))))
+    jobs += [(_render_athlete, (store.directory, int(i), os.path.join(output_dir, f"athlete_{i}.png")))
+             for i in athletes]
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(func, args) for func, args in jobs]
+        charts = [future.result() for future in futures]
+
+    serializable = {key: (value.tolist() if isinstance(value, np.ndarray) else value)
+                    for key, value in summary.items() if key != 'distribution'}
+    serializable['distribution'] = {key: (value.tolist() if isinstance(value, np.ndarray) else value)
+                                    for key, value in summary['distribution'].items()}
+    with open(os.path.join(output_dir, "summary.json"), 'w') as f:
+        json.dump(serializable, f)
+    return {'summary': summary, 'charts': charts}
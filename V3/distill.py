@@ -0,0 +1,355 @@
+import json
+import os
+import random
+import time
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from Dyna import AdvancedDynaQMarathon
+from batch_env import BatchMarathonEnvironment, DISCRETIZED_FIELDS, discretize_features
+from evaluation import rollout_greedy, sample_athletes
+from state_encoder import StateEncoder
+
+DISTILL_METHODS = ('table', 'tree')
+
+
+def _action_specs(actions) -> List[Dict]:
+    return [{'type': a.type.value, 'duree': a.duree, 'intensite': a.intensite, 'zone_fc': a.zone_fc}
+            for a in actions]
+
+
+class CompactPolicy:
+    """
+    Politique gloutonne figée, interrogée sans la table Q ni l'agent.
+    Les requêtes sont des matrices (N, F) des attributs `fields` de MarathonTrainingState.
+    """
+    kind = None
+
+    def __init__(self, fields: Sequence[str], actions: List[Dict]):
+        self.fields = tuple(fields)
+        self.actions = list(actions)
+
+    def action_indices(self, values: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+    def state_matrix(self, states) -> np.ndarray:
+        return np.array([[getattr(s, name) for name in self.fields] for s in states], dtype=np.float64)
+
+    def recommend(self, state) -> Dict:
+        """Action recommandée pour un MarathonTrainingState"""
+        return dict(self.actions[int(self.action_indices(self.state_matrix([state]))[0])])
+
+    def __call__(self, env: BatchMarathonEnvironment) -> np.ndarray:
+        """Politique au format de rollout_greedy(policy=...)"""
+        return self.action_indices(env.feature_matrix(self.fields))
+
+    def _arrays(self) -> Dict[str, np.ndarray]:
+        raise NotImplementedError
+
+    def _meta(self) -> Dict:
+        return {}
+
+    def save(self, path: str) -> int:
+        """Écrit l'artefact (.npz compressé) et retourne sa taille en octets"""
+        meta = {'kind': self.kind, 'fields': list(self.fields), 'actions': self.actions, **self._meta()}
+        with open(path, 'wb') as f:
+            np.savez_compressed(f, meta=np.array(json.dumps(meta)), **self._arrays())
+        return os.path.getsize(path)
+
+
+class TablePolicy(CompactPolicy):
+    """
+    Table gloutonne quantifiée : un identifiant int64 par état connu (trié), l'indice
+    de l'action gloutonne (uint8) et sa valeur en float16. Recherche par searchsorted ;
+    les états absents de la table reçoivent default_action (le repos).
+    """
+    kind = 'table'
+
+    def __init__(self, fields: Sequence[str], actions: List[Dict], low: np.ndarray, span: np.ndarray,
+                 ids: np.ndarray, action_ids: np.ndarray, values: np.ndarray,
+                 encoder=None, default_action: int = 0):
+        super().__init__(fields, actions)
+        if isinstance(encoder, dict):
+            encoder = StateEncoder.from_dict(encoder)
+        self.encoder = encoder
+        self.low = np.asarray(low, dtype=np.int64)
+        self.span = np.asarray(span, dtype=np.int64)
+        self.strides = np.cumprod(np.concatenate([self.span[1:], [1]])[::-1])[::-1]
+        self.ids = ids
+        self.action_ids = action_ids
+        self.values = values
+        self.default_action = default_action
+
+    @classmethod
+    def from_agent(cls, agent: AdvancedDynaQMarathon, default_action: int = 0) -> "TablePolicy":
+        keys = [key for key, row in agent.Q.items() if row]
+        if not keys:
+            raise ValueError("Table Q vide : rien à distiller")
+        matrix = np.array(keys, dtype=np.int64)
+        greedy = agent.greedy_action_indices(keys)
+        values = np.array([agent.q_value(key, agent.actions[i].discretize()) for key, i in zip(keys, greedy)])
+
+        low = matrix.min(axis=0)
+        span = matrix.max(axis=0) - low + 1
+        if np.prod(span.astype(np.float64)) >= 2 ** 63:
+            raise ValueError("Espace de clés trop grand pour des identifiants int64")
+        policy = cls(agent.state_encoder.names if agent.state_encoder is not None else DISCRETIZED_FIELDS,
+                     _action_specs(agent.actions), low, span, np.empty(0, dtype=np.int64),
+                     np.empty(0, dtype=np.uint8), np.empty(0, dtype=np.float16),
+                     agent.state_encoder, default_action)
+        ids = (matrix - low) @ policy.strides
+        order = np.argsort(ids)
+        policy.ids = ids[order]
+        policy.action_ids = greedy[order].astype(np.min_scalar_type(len(agent.actions)))
+        policy.values = values[order].astype(np.float16)
+        return policy
+
+    def lookup(self, values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Positions dans la table et masque des états connus"""
+        values = np.asarray(values, dtype=np.float64)
+        keys = self.encoder.encode_batch(values) if self.encoder is not None else discretize_features(values)
+        offsets = keys - self.low
+        in_range = ((offsets >= 0) & (offsets < self.span)).all(axis=1)
+        ids = offsets @ self.strides
+        positions = np.searchsorted(self.ids, ids).clip(max=len(self.ids) - 1)
+        return positions, in_range & (self.ids[positions] == ids)
+
+    def action_indices(self, values: np.ndarray) -> np.ndarray:
+        positions, known = self.lookup(values)
+        return np.where(known, self.action_ids[positions], self.default_action).astype(np.int64)
+
+    def recommend(self, state) -> Dict:
+        positions, known = self.lookup(self.state_matrix([state]))
+        action = self.action_ids[positions[0]] if known[0] else self.default_action
+        return {**self.actions[int(action)], 'confiance': float(self.values[positions[0]]) if known[0] else 0.0}
+
+    def _arrays(self) -> Dict[str, np.ndarray]:
+        return {'low': self.low, 'span': self.span, 'ids': self.ids,
+                'action_ids': self.action_ids, 'values': self.values}
+
+    def _meta(self) -> Dict:
+        return {'encoder': self.encoder.to_dict() if self.encoder is not None else None,
+                'default_action': self.default_action}
+
+
+class TreePolicy(CompactPolicy):
+    """
+    Arbre de décision peu profond sur les attributs continus de l'état, appris par
+    imitation de la politique gloutonne (critère de Gini, seuils aux quantiles).
+    Répond aussi pour les états jamais vus par la table Q.
+    """
+    kind = 'tree'
+
+    def __init__(self, fields: Sequence[str], actions: List[Dict], feature: np.ndarray,
+                 threshold: np.ndarray, left: np.ndarray, right: np.ndarray, action: np.ndarray):
+        super().__init__(fields, actions)
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.action = action
+
+    def __len__(self) -> int:
+        return len(self.feature)
+
+    def action_indices(self, values: np.ndarray) -> np.ndarray:
+        values = np.asarray(values, dtype=np.float64)
+        rows = np.arange(len(values))
+        node = np.zeros(len(values), dtype=np.int64)
+        while True:
+            feature = self.feature[node]
+            internal = feature >= 0
+            if not internal.any():
+                break
+            go_left = values[rows, np.maximum(feature, 0)] <= self.threshold[node]
+            node = np.where(internal, np.where(go_left, self.left[node], self.right[node]), node)
+        return self.action[node].astype(np.int64)
+
+    @staticmethod
+    def _best_split(values: np.ndarray, labels: np.ndarray, n_classes: int,
+                    min_samples_leaf: int, n_thresholds: int):
+        n = len(labels)
+        parent = np.bincount(labels, minlength=n_classes)
+        if parent.max() == n:
+            return None
+        best_impurity = 1.0 - np.sum((parent / n) ** 2) - 1e-12
+        best = None
+        for f in range(values.shape[1]):
+            column = values[:, f]
+            quantiles = np.quantile(column, np.linspace(0, 1, n_thresholds + 2)[1:-1])
+            # Seuils en float32 : ceux de l'artefact, pour des décisions identiques à l'inférence
+            thresholds = np.unique(quantiles.astype(np.float32)).astype(np.float64)
+            # Gauche du seuil k : échantillons de bin <= k
+            bins = np.searchsorted(thresholds, column, side='left')
+            counts = np.bincount(bins * n_classes + labels, minlength=(len(thresholds) + 1) * n_classes)
+            left = np.cumsum(counts.reshape(-1, n_classes), axis=0)[:-1]
+            right = parent - left
+            n_left = left.sum(axis=1)
+            n_right = n - n_left
+            valid = (n_left >= min_samples_leaf) & (n_right >= min_samples_leaf)
+            if not valid.any():
+                continue
+            with np.errstate(divide='ignore', invalid='ignore'):
+                impurity = (n_left - (left ** 2).sum(axis=1) / n_left +
+                            n_right - (right ** 2).sum(axis=1) / n_right) / n
+            impurity = np.where(valid, impurity, np.inf)
+            k = int(np.argmin(impurity))
+            if impurity[k] < best_impurity:
+                best_impurity = impurity[k]
+                best = (f, thresholds[k])
+        return best
+
+    @classmethod
+    def fit(cls, values: np.ndarray, labels: np.ndarray, fields: Sequence[str], actions: List[Dict],
+            max_depth: int = 10, min_samples_leaf: int = 20, n_thresholds: int = 32) -> "TreePolicy":
+        """Construit l'arbre en profondeur d'abord, nœud par nœud (splits vectorisés)"""
+        values = np.asarray(values, dtype=np.float64)
+        labels = np.asarray(labels, dtype=np.int64)
+        n_classes = len(actions)
+        feature, threshold, left, right, action = [], [], [], [], []
+
+        def new_node(indices):
+            feature.append(-1)
+            threshold.append(0.0)
+            left.append(-1)
+            right.append(-1)
+            action.append(int(np.bincount(labels[indices], minlength=n_classes).argmax()))
+            return len(feature) - 1
+
+        stack = [(new_node(np.arange(len(labels))), np.arange(len(labels)), 0)]
+        while stack:
+            node, indices, depth = stack.pop()
+            if depth >= max_depth or len(indices) < 2 * min_samples_leaf:
+                continue
+            split = cls._best_split(values[indices], labels[indices], n_classes,
+                                    min_samples_leaf, n_thresholds)
+            if split is None:
+                continue
+            f, t = split
+            mask = values[indices, f] <= t
+            feature[node], threshold[node] = f, t
+            left[node] = new_node(indices[mask])
+            right[node] = new_node(indices[~mask])
+            stack.append((left[node], indices[mask], depth + 1))
+            stack.append((right[node], indices[~mask], depth + 1))
+
+        index_type = np.int16 if len(feature) < 2 ** 15 else np.int32
+        return cls(fields, actions, np.array(feature, dtype=np.int8), np.array(threshold, dtype=np.float32),
+                   np.array(left, dtype=index_type), np.array(right, dtype=index_type),
+                   np.array(action, dtype=np.min_scalar_type(n_classes)))
+
+    def _arrays(self) -> Dict[str, np.ndarray]:
+        return {'feature': self.feature, 'threshold': self.threshold, 'left': self.left,
+                'right': self.right, 'action': self.action}
+
+
+def load_policy(path: str) -> CompactPolicy:
+    """Recharge un artefact écrit par CompactPolicy.save (sans agent ni table Q)"""
+    with np.load(path) as data:
+        meta = json.loads(str(data['meta']))
+        arrays = {name: data[name] for name in data.files if name != 'meta'}
+    policy_class = {'table': TablePolicy, 'tree': TreePolicy}[meta.pop('kind')]
+    return policy_class(**meta, **arrays)
+
+
+def collect_states(agent: AdvancedDynaQMarathon, fields: Sequence[str], n_episodes: int,
+                   seed: int = 0, epsilon: float = 0.0,
+                   athlete_ranges: Dict[str, Tuple[float, float]] = None):
+    """
+    États visités par la politique gloutonne (avec une part epsilon d'actions aléatoires)
+    sur n_episodes athlètes : attributs (N, F), action gloutonne et présence dans la table Q.
+    """
+    rng = np.random.default_rng(seed)
+    fallback_rng = random.Random(seed)
+    env = BatchMarathonEnvironment(n_episodes, agent.actions, sample_athletes(n_episodes, rng, athlete_ranges))
+    values, labels, known = [], [], []
+    done = np.zeros(n_episodes, dtype=bool)
+    while not done.all():
+        keys = env.state_keys(agent)
+        greedy = agent.greedy_action_indices(keys, fallback_rng)
+        values.append(env.feature_matrix(fields))
+        labels.append(greedy)
+        known.append(np.array([bool(agent.Q.get(key)) for key in keys]))
+        explore = rng.random(n_episodes) < epsilon
+        _, done = env.step(np.where(explore, rng.integers(0, len(agent.actions), size=n_episodes), greedy))
+    return np.concatenate(values), np.concatenate(labels), np.concatenate(known)
+
+
+def _table_with_fallback(agent: AdvancedDynaQMarathon, policy: CompactPolicy):
+    """
+    Politique gloutonne de la table Q complète (format rollout_greedy(policy=...)) qui
+    délègue les états absents de la table à la politique compacte : les deux rollouts
+    de fidelity_report ne diffèrent alors que sur les états connus.
+    """
+    def actions(env: BatchMarathonEnvironment) -> np.ndarray:
+        keys = env.state_keys(agent)
+        known = np.array([bool(agent.Q.get(key)) for key in keys])
+        indices = policy(env)
+        if known.any():
+            indices[known] = agent.greedy_action_indices([key for key, k in zip(keys, known) if k])
+        return indices
+    return actions
+
+
+def fidelity_report(agent: AdvancedDynaQMarathon, policy: CompactPolicy,
+                    n_episodes: int = 256, seed: int = 1) -> Dict:
+    """
+    Fidélité de la politique compacte à la table complète : taux d'accord sur les états
+    connus visités par la politique gloutonne, et perte de retour sur les mêmes athlètes.
+    Les états absents de la table reçoivent la même action des deux côtés (celle de la
+    politique compacte) : la perte ne mesure que la distillation.
+    """
+    values, labels, known = collect_states(agent, policy.fields, n_episodes, seed)
+    agreement = float(np.mean(policy.action_indices(values[known]) == labels[known])) if known.any() else 0.0
+
+    full = rollout_greedy(agent, n_episodes, seed, policy=_table_with_fallback(agent, policy))['return']
+    distilled = rollout_greedy(agent, n_episodes, seed, policy=policy)['return']
+
+    single = values[:1]
+    start = time.perf_counter()
+    for _ in range(200):
+        policy.action_indices(single)
+    query_us = (time.perf_counter() - start) / 200 * 1e6
+
+    return {
+        'agreement': agreement,
+        'states': int(known.sum()),
+        'return_full': float(full.mean()),
+        'return_distilled': float(distilled.mean()),
+        'return_loss': float(full.mean() - distilled.mean()),
+        'relative_return_loss': float((full.mean() - distilled.mean()) / max(abs(full.mean()), 1e-9)),
+        'query_us': query_us,
+    }
+
+
+def distill(agent: AdvancedDynaQMarathon, path: str, method: str = "table",
+            n_episodes: int = 2048, epsilon: float = 0.1, seed: int = 0,
+            max_depth: int = 10, min_samples_leaf: int = 20,
+            report_episodes: int = 256) -> Tuple[CompactPolicy, Dict]:
+    """
+    Exporte la politique gloutonne d'un agent tabulaire en artefact compact :
+      - "table" : table gloutonne quantifiée (toutes les entrées de Q, sans le dict)
+      - "tree" : arbre de décision appris sur n_episodes trajectoires gloutonnes
+        (avec une part epsilon d'exploration pour couvrir les états voisins)
+    Retourne la politique et son rapport de fidélité (taille de l'artefact incluse).
+    """
+    if method not in DISTILL_METHODS:
+        raise ValueError(f"Méthode de distillation inconnue : {method}")
+    if agent.value_approx is not None:
+        raise ValueError("distill() requiert un agent tabulaire (les poids du tile coding sont déjà compacts)")
+
+    start = time.perf_counter()
+    if method == "table":
+        policy = TablePolicy.from_agent(agent)
+    else:
+        fields = agent.state_encoder.names if agent.state_encoder is not None else DISCRETIZED_FIELDS
+        values, labels, known = collect_states(agent, fields, n_episodes, seed, epsilon)
+        policy = TreePolicy.fit(values[known], labels[known], fields, _action_specs(agent.actions),
+                                max_depth=max_depth, min_samples_leaf=min_samples_leaf)
+    build_seconds = time.perf_counter() - start
+
+    report = {'method': method, 'bytes': policy.save(path), 'build_seconds': build_seconds,
+              'q_entries': sum(len(row) for row in agent.Q.values())}
+    report.update(fidelity_report(agent, policy, report_episodes, seed + 1))
+    return policy, report
@@ -0,0 +1,143 @@
+import random
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from Dyna import AdvancedDynaQMarathon
+from batch_env import BatchMarathonEnvironment
+from weather import WeatherBank
+
+# Plages de variation des athlètes évalués (constantes de temps de Banister, en jours)
+ATHLETE_RANGES = {
+    'tau_fitness': (35.0, 55.0),
+    'tau_fatigue': (10.0, 20.0),
+}
+# Au-delà de ce risque de blessure, un jour compte comme une violation
+RISK_LIMIT = 0.5
+
+METRICS = ('return', 'final_performance', 'peak_fatigue', 'overload_days', 'high_risk_days')
+
+
+def sample_athletes(n: int, rng: np.random.Generator,
+                    ranges: Dict[str, Tuple[float, float]] = None) -> Dict[str, np.ndarray]:
+    """Paramètres d'athlètes tirés uniformément dans les plages données"""
+    ranges = ATHLETE_RANGES if ranges is None else ranges
+    return {name: rng.uniform(low, high, size=n) for name, (low, high) in ranges.items()}
+
+
+def rollout_greedy(agent: AdvancedDynaQMarathon, n_episodes: int, seed: int = 0,
+                   weather_bank: WeatherBank = None,
+                   athlete_ranges: Dict[str, Tuple[float, float]] = None,
+                   policy: Callable[[BatchMarathonEnvironment], np.ndarray] = None) -> Dict[str, np.ndarray]:
+    """
+    Joue la politique gloutonne de l'agent sur n_episodes athlètes en parallèle
+    (un environnement batché) et retourne les métriques par épisode.
+    `policy` remplace la table Q : fonction env -> indices d'actions dans agent.actions.
+    """
+    rng = np.random.default_rng(seed)
+    # États inconnus de la table Q : action aléatoire reproductible, sans toucher au
+    # générateur global (l'évaluation pendant l'entraînement ne modifie pas la trajectoire)
+    fallback_rng = random.Random(seed)
+    athletes = sample_athletes(n_episodes, rng, athlete_ranges)
+    env = BatchMarathonEnvironment(n_episodes, agent.actions, athletes, weather_bank)
+    weather_seeds = rng.integers(0, 2 ** 31, size=n_episodes) if weather_bank is not None else None
+    env.reset(weather_seeds)
+
+    returns = np.zeros(n_episodes)
+    peak_fatigue = np.zeros(n_episodes)
+    overload_days = np.zeros(n_episodes, dtype=np.int64)
+    high_risk_days = np.zeros(n_episodes, dtype=np.int64)
+    done = np.zeros(n_episodes, dtype=bool)
+    # Tous les épisodes ont la même durée : ils se terminent ensemble
+    while not done.all():
+        if policy is None:
+            actions = agent.greedy_action_indices(env.state_keys(agent), fallback_rng)
+        else:
+            actions = policy(env)
+        rewards, done = env.step(actions)
+        returns += rewards
+        peak_fatigue = np.maximum(peak_fatigue, env.fatigue)
+        overload_days += env.fatigue > 1.5 * env.fitness
+        high_risk_days += env.risque_blessure > RISK_LIMIT
+
+    return {
+        'return': returns,
+        'final_performance': env.performance.copy(),
+        'peak_fatigue': peak_fatigue,
+        'overload_days': overload_days,
+        'high_risk_days': high_risk_days,
+    }
+
+
+def summarize(metrics: Dict[str, np.ndarray], confidence_z: float = 1.96) -> Dict[str, Dict]:
+    """Moyenne, écart-type et intervalle de confiance (approximation normale) par métrique"""
+    summary = {}
+    for name, values in metrics.items():
+        values = np.asarray(values, dtype=np.float64)
+        n = len(values)
+        std = float(values.std(ddof=1)) if n > 1 else 0.0
+        half_width = float(confidence_z * std / np.sqrt(n)) if n > 1 else 0.0
+        mean = float(values.mean())
+        summary[name] = {
+            'mean': mean,
+            'std': std,
+            'ci_low': mean - half_width,
+            'ci_high': mean + half_width,
+            'n': n,
+        }
+    return summary
+
+
+def evaluate_agent(agent: AdvancedDynaQMarathon, n_episodes: int = 256, seed: int = 0,
+                   weather_bank: WeatherBank = None,
+                   athlete_ranges: Dict[str, Tuple[float, float]] = None) -> Dict[str, Dict]:
+    """Évaluation gloutonne d'un agent en mémoire (rapide, utilisable pendant l'entraînement)"""
+    return summarize(rollout_greedy(agent, n_episodes, seed, weather_bank, athlete_ranges))
+
+
+def _evaluate_seed(args) -> Dict[str, np.ndarray]:
+    checkpoint, n_episodes, seed, weather_dir, athlete_ranges = args
+    agent = AdvancedDynaQMarathon()
+    agent.load_model(checkpoint)
+    weather_bank = WeatherBank(weather_dir) if weather_dir else None
+    return rollout_greedy(agent, n_episodes, seed, weather_bank, athlete_ranges)
+
+
+def evaluate_checkpoint(checkpoint: str, seeds: Sequence[int] = range(8),
+                        episodes_per_seed: int = 128, weather_dir: str = None,
+                        athlete_ranges: Dict[str, Tuple[float, float]] = None,
+                        max_workers: int = None) -> Dict:
+    """
+    Évalue un modèle sauvegardé (save_model) : une graine par processus, chaque
+    processus joue episodes_per_seed athlètes en batch. Les métriques de toutes
+    les graines sont regroupées avant le calcul des intervalles de confiance.
+    """
+    jobs = [(checkpoint, episodes_per_seed, seed, weather_dir, athlete_ranges) for seed in seeds]
+    if max_workers == 1:
+        results = [_evaluate_seed(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(_evaluate_seed, jobs))
+
+    merged = {name: np.concatenate([r[name] for r in results]) for name in METRICS}
+    return {
+        'checkpoint': checkpoint,
+        'seeds': list(seeds),
+        'summary': summarize(merged),
+        'per_seed_return': [float(r['return'].mean()) for r in results],
+    }
+
+
+def format_summary(summary: Dict[str, Dict]) -> List[str]:
+    """Lignes lisibles « métrique : moyenne [IC 95 %] »"""
+    return [f"{name}: {s['mean']:.3f} [{s['ci_low']:.3f}, {s['ci_high']:.3f}] (n={s['n']})"
+            for name, s in summary.items()]
+
+
+if __name__ == "__main__":
+    import sys
+
+    result = evaluate_checkpoint(sys.argv[1] if len(sys.argv) > 1 else 'trained_marathon_model.json')
+    for line in format_summary(result['summary']):
+        print(line)
@@ -0,0 +1,155 @@
+from typing import Dict, List, Tuple
+
+import gymnasium as gym
+import numpy as np
+from gymnasium.vector import AutoresetMode, VectorEnv
+
+from Dyna import AdvancedDynaQMarathon, MarathonEnvironment, MarathonTrainingState, TrainingAction
+from batch_env import BatchMarathonEnvironment, HISTORY_LENGTH, NO_SESSION, TYPE_CODES
+from evaluation import sample_athletes
+from weather import CONDITION_VALUES, WeatherBank
+
+# Attributs continus de MarathonTrainingState repris dans l'observation
+OBSERVATION_FIELDS = ('fitness', 'fatigue', 'performance', 'forme', 'volume_hebdo',
+                      'risque_blessure', 'jours_avant_marathon', 'temperature')
+# Observation : OBSERVATION_FIELDS, code météo, puis les 7 derniers types de séance
+# (codes de TYPE_CODES, alignés à droite, NO_SESSION avant la première semaine)
+OBSERVATION_LOW = np.array([0, 0, -np.inf, -np.inf, 0, 0, 0, -np.inf, 0] + [NO_SESSION] * HISTORY_LENGTH,
+                           dtype=np.float32)
+OBSERVATION_HIGH = np.array([np.inf] * 6 + [120, np.inf, len(CONDITION_VALUES) - 1] +
+                            [len(TYPE_CODES) - 1] * HISTORY_LENGTH, dtype=np.float32)
+# Pénalité d'une action invalide (jouée comme un repos) quand le masque n'est pas respecté
+INVALID_ACTION_PENALTY = 5.0
+
+
+def action_catalog(include_invalid: bool = True) -> Tuple[List[TrainingAction], np.ndarray]:
+    """
+    Catalogue d'actions de l'espace Discrete et masque des actions valides
+    (_is_valid_combination). Sans include_invalid : uniquement les actions valides,
+    dans l'ordre de AdvancedDynaQMarathon.all_actions.
+    """
+    grid = AdvancedDynaQMarathon.action_grid()
+    mask = np.array([AdvancedDynaQMarathon._is_valid_combination(a.type, a.duree, a.intensite, a.zone_fc)
+                     for a in grid])
+    if not include_invalid:
+        grid = [a for a, valid in zip(grid, mask) if valid]
+        mask = np.ones(len(grid), dtype=bool)
+    return grid, mask
+
+
+def state_observation(state: MarathonTrainingState) -> np.ndarray:
+    history = [TYPE_CODES[t] for t in state.derniers_entrainements[-HISTORY_LENGTH:]]
+    history = [NO_SESSION] * (HISTORY_LENGTH - len(history)) + history
+    return np.array([getattr(state, name) for name in OBSERVATION_FIELDS] +
+                    [CONDITION_VALUES.index(state.meteo.value)] + history, dtype=np.float32)
+
+
+def batch_observation(env: BatchMarathonEnvironment) -> np.ndarray:
+    return np.column_stack([env.feature_matrix(OBSERVATION_FIELDS), env.meteo, env.history]).astype(np.float32)
+
+
+class MarathonGymEnv(gym.Env):
+    """
+    MarathonEnvironment au format gymnasium : observation Box construite depuis
+    MarathonTrainingState, action Discrete sur action_catalog() et masque des actions
+    valides via action_masks() (compatible MaskablePPO). Une action invalide est jouée
+    comme un repos avec INVALID_ACTION_PENALTY.
+
+    Avec athlete_ranges, un nouvel athlète est tiré à chaque reset (domain randomization).
+    """
+    metadata = {"render_modes": []}
+
+    def __init__(self, include_invalid: bool = True, weather_bank: WeatherBank = None,
+                 athlete_params: Dict[str, float] = None,
+                 athlete_ranges: Dict[str, Tuple[float, float]] = None):
+        self.catalog, self.mask = action_catalog(include_invalid)
+        self.rest_index = 0
+        self.weather_bank = weather_bank
+        self.athlete_params = athlete_params
+        self.athlete_ranges = athlete_ranges
+        self.observation_space = gym.spaces.Box(OBSERVATION_LOW, OBSERVATION_HIGH, dtype=np.float32)
+        self.action_space = gym.spaces.Discrete(len(self.catalog))
+        self.env = MarathonEnvironment(athlete_params, weather_bank)
+
+    def action_masks(self) -> np.ndarray:
+        return self.mask.copy()
+
+    def reset(self, *, seed=None, options=None):
+        super().reset(seed=seed)
+        if self.athlete_ranges is not None:
+            athlete = sample_athletes(1, self.np_random, self.athlete_ranges)
+            self.env = MarathonEnvironment({name: float(value[0]) for name, value in athlete.items()},
+                                           self.weather_bank)
+        weather_seed = int(self.np_random.integers(2 ** 31)) if self.weather_bank is not None else None
+        state = self.env.reset(weather_seed)
+        return state_observation(state), {'action_mask': self.action_masks()}
+
+    def step(self, action):
+        action = int(action)
+        invalid = not self.mask[action]
+        state, reward, done = self.env.step(self.catalog[self.rest_index if invalid else action])
+        # L'historique (état, action) de MarathonEnvironment n'est pas utile ici
+        self.env.history.clear()
+        if invalid:
+            reward -= INVALID_ACTION_PENALTY
+        return state_observation(state), float(reward), done, False, {'invalid_action': invalid}
+
+
+class MarathonVectorEnv(VectorEnv):
+    """
+    num_envs épisodes MarathonGymEnv simulés ensemble par BatchMarathonEnvironment
+    (mêmes dynamiques et récompenses, en tableaux). Tous les épisodes ont la même
+    durée : ils se terminent ensemble et sont réinitialisés dans le même pas
+    (AutoresetMode.SAME_STEP, observations finales dans infos["final_obs"]).
+    """
+    metadata = {"render_modes": [], "autoreset_mode": AutoresetMode.SAME_STEP}
+
+    def __init__(self, num_envs: int, include_invalid: bool = True, weather_bank: WeatherBank = None,
+                 athlete_params: Dict[str, np.ndarray] = None,
+                 athlete_ranges: Dict[str, Tuple[float, float]] = None):
+        self.num_envs = num_envs
+        self.catalog, self.mask = action_catalog(include_invalid)
+        self.weather_bank = weather_bank
+        self.athlete_params = athlete_params
+        self.athlete_ranges = athlete_ranges
+        self.single_observation_space = gym.spaces.Box(OBSERVATION_LOW, OBSERVATION_HIGH, dtype=np.float32)
+        self.single_action_space = gym.spaces.Discrete(len(self.catalog))
+        self.observation_space = gym.vector.utils.batch_space(self.single_observation_space, num_envs)
+        self.action_space = gym.vector.utils.batch_space(self.single_action_space, num_envs)
+
+        # Le batch n'utilise que les actions valides ; les invalides sont jouées comme un repos
+        valid_actions = [a for a, valid in zip(self.catalog, self.mask) if valid]
+        self.batch_index = np.where(self.mask, np.cumsum(self.mask) - 1, 0)
+        self._valid_actions = valid_actions
+        self.env = BatchMarathonEnvironment(num_envs, valid_actions, athlete_params, weather_bank)
+
+    def action_masks(self) -> np.ndarray:
+        return np.broadcast_to(self.mask, (self.num_envs, len(self.mask))).copy()
+
+    def _reset_batch(self) -> np.ndarray:
+        if self.athlete_ranges is not None:
+            self.env = BatchMarathonEnvironment(self.num_envs, self._valid_actions,
+                                                sample_athletes(self.num_envs, self.np_random, self.athlete_ranges),
+                                                self.weather_bank)
+        weather_seeds = self.np_random.integers(0, 2 ** 31, size=self.num_envs) \
+            if self.weather_bank is not None else None
+        self.env.reset(weather_seeds)
+        return batch_observation(self.env)
+
+    def reset(self, *, seed=None, options=None):
+        super().reset(seed=seed)
+        return self._reset_batch(), {}
+
+    def step(self, actions):
+        actions = np.asarray(actions, dtype=np.int64)
+        invalid = ~self.mask[actions]
+        rewards, terminations = self.env.step(self.batch_index[actions])
+        rewards = rewards - INVALID_ACTION_PENALTY * invalid
+        observations = batch_observation(self.env)
+        infos = {'invalid_action': invalid}
+        if terminations.all():
+            infos['final_obs'] = observations
+            infos['_final_obs'] = terminations.copy()
+            observations = self._reset_batch()
+        truncations = np.zeros(self.num_envs, dtype=bool)
+        return observations, rewards, terminations, truncations, infos
@@ -0,0 +1,148 @@
+import time
+from typing import Dict
+
+import numpy as np
+
+
+class CompiledModel:
+    """
+    Modèle Dyna compilé en structure creuse : une arête par transition
+    (état source, action, récompense, état suivant), triée par état source.
+    """
+    def __init__(self, agent):
+        self.state_keys = list({s for s, _ in agent.model} |
+                               {next_state for _, next_state in agent.model.values()})
+        self.state_index = {key: i for i, key in enumerate(self.state_keys)}
+        self.action_keys = list(dict.fromkeys(a.discretize() for a in agent.actions))
+        self.action_index = {key: i for i, key in enumerate(self.action_keys)}
+
+        edges = [(self.state_index[s], self.action_index[a], reward, self.state_index[next_state])
+                 for (s, a), (reward, next_state) in agent.model.items()]
+        edges.sort(key=lambda e: e[0])
+        self.src = np.array([e[0] for e in edges], dtype=np.int64)
+        self.act = np.array([e[1] for e in edges], dtype=np.int64)
+        self.reward = np.array([e[2] for e in edges], dtype=np.float64)
+        self.dst = np.array([e[3] for e in edges], dtype=np.int64)
+
+        # Début de chaque segment d'arêtes partageant le même état source
+        self.sources, self.segment_starts = np.unique(self.src, return_index=True)
+        self.segment_of_edge = np.searchsorted(self.sources, self.src)
+
+        # Valeur des actions absentes du modèle (valeur courante de Q, 0 par défaut)
+        n_actions = len(self.action_keys)
+        self.outside_value = np.full(len(self.state_keys), -np.inf)
+        modeled = {}
+        for s, a in agent.model:
+            modeled.setdefault(s, set()).add(a)
+        for i, key in enumerate(self.state_keys):
+            actions = modeled.get(key, set())
+            n_unmodeled = n_actions - len(actions)
+            if n_unmodeled > 0:
+                others = [v for a, v in agent.Q.get(key, {}).items() if a not in actions]
+                if len(others) < n_unmodeled:
+                    others.append(0.0)
+                self.outside_value[i] = max(others)
+
+    @property
+    def n_states(self) -> int:
+        return len(self.state_keys)
+
+    @property
+    def n_transitions(self) -> int:
+        return len(self.src)
+
+    def edge_values(self, values: np.ndarray, gamma: float) -> np.ndarray:
+        return self.reward + gamma * values[self.dst]
+
+    def state_values(self, edge_q: np.ndarray) -> np.ndarray:
+        """V(s) = max(meilleure arête, actions hors modèle)"""
+        values = self.outside_value.copy()
+        if self.n_transitions:
+            best = np.maximum.reduceat(edge_q, self.segment_starts)
+            values[self.sources] = np.maximum(values[self.sources], best)
+        return values
+
+
+def value_iteration(compiled: CompiledModel, gamma: float, tol: float = 1e-6,
+                    max_iterations: int = 10000):
+    values = compiled.state_values(np.zeros(compiled.n_transitions))
+    values[~np.isfinite(values)] = 0.0
+    for iteration in range(1, max_iterations + 1):
+        edge_q = compiled.edge_values(values, gamma)
+        new_values = compiled.state_values(edge_q)
+        residual = float(np.max(np.abs(new_values - values))) if len(values) else 0.0
+        values = new_values
+        if residual < tol:
+            break
+    return compiled.edge_values(values, gamma), iteration, residual
+
+
+def policy_iteration(compiled: CompiledModel, gamma: float, tol: float = 1e-6,
+                     max_iterations: int = 1000):
+    values = compiled.outside_value.copy()
+    values[~np.isfinite(values)] = 0.0
+    outside = compiled.outside_value[compiled.sources]
+    previous_policy = None
+    residual = 0.0
+    for iteration in range(1, max_iterations + 1):
+        # Amélioration : meilleure arête de chaque état source (ou action hors modèle)
+        edge_q = compiled.edge_values(values, gamma)
+        best = np.maximum.reduceat(edge_q, compiled.segment_starts)
+        is_best = edge_q >= best[compiled.segment_of_edge]
+        _, first = np.unique(compiled.segment_of_edge[is_best], return_index=True)
+        policy_edge = np.flatnonzero(is_best)[first]
+        use_outside = outside > best
+
+        policy = np.where(use_outside, -1, policy_edge)
+        if previous_policy is not None and np.array_equal(policy, previous_policy):
+            break
+        previous_policy = policy
+
+        # Évaluation de la politique (déterministe) par itérations vectorisées
+        for _ in range(max_iterations):
+            follow = compiled.reward[policy_edge] + gamma * values[compiled.dst[policy_edge]]
+            new_values = values.copy()
+            new_values[compiled.sources] = np.where(use_outside, outside, follow)
+            residual = float(np.max(np.abs(new_values - values)))
+            values = new_values
+            if residual < tol:
+                break
+    return compiled.edge_values(values, gamma), iteration, residual
+
+
+def solve_model(agent, method: str = "value", tol: float = 1e-6,
+                max_iterations: int = 10000) -> Dict:
+    """
+    Résout le modèle appris par itération sur les valeurs (ou sur les politiques)
+    et réécrit les valeurs convergées dans la table Q de l'agent.
+    """
+    if agent.value_approx is not None:
+        raise ValueError("solve_model() requiert le backend tabulaire")
+    t0 = time.perf_counter()
+    compiled = CompiledModel(agent)
+    if compiled.n_transitions == 0:
+        return {'states': 0, 'transitions': 0, 'iterations': 0, 'residual': 0.0, 'duration_s': 0.0}
+
+    if method == "value":
+        edge_q, iterations, residual = value_iteration(compiled, agent.gamma, tol, max_iterations)
+    elif method == "policy":
+        edge_q, iterations, residual = policy_iteration(compiled, agent.gamma, tol, max_iterations)
+    else:
+        raise ValueError(f"Méthode inconnue : {method}")
+
+    # Valeurs convergées écrites telles quelles (update_q appliquerait le taux
+    # d'apprentissage), sous le verrou de Q et suivies pour les checkpoints
+    with agent._q_lock:
+        for s, a, q in zip(compiled.src, compiled.act, edge_q):
+            state_key, action_key = compiled.state_keys[s], compiled.action_keys[a]
+            agent.Q[state_key][action_key] = float(q)
+            if agent.q_changes is not None:
+                agent.q_changes.add((state_key, action_key))
+
+    return {
+        'states': compiled.n_states,
+        'transitions': compiled.n_transitions,
+        'iterations': iterations,
+        'residual': residual,
+        'duration_s': time.perf_counter() - t0,
+    }
@@ -0,0 +1,215 @@
+import threading
+import time
+from typing import Dict, Hashable, List
+
+import numpy as np
+
+from Dyna import AdvancedDynaQMarathon, MarathonEnvironment, MarathonTrainingState, TrainingAction
+from weather import WeatherBank
+
+
+def _same_session(a: TrainingAction, b: TrainingAction) -> bool:
+    return (a.type, a.duree, a.intensite, a.zone_fc) == (b.type, b.duree, b.intensite, b.zone_fc)
+
+
+class TrainingPlan:
+    """
+    Plan d'entraînement d'un athlète jusqu'au marathon, avec l'état de début de
+    chaque journée mis en cache (states[d] = état au matin du jour d).
+
+    Les jours déjà réalisés (completed_days) sont figés ; update() part du dernier
+    jour réalisé au lieu de rejouer le plan depuis le jour 0.
+    """
+    def __init__(self, agent: AdvancedDynaQMarathon, athlete_params: Dict[str, float] = None,
+                 weather_bank: WeatherBank = None, weather_seed: int = None,
+                 tol: float = 0.05):
+        self.agent = agent
+        # Écart maximal (fitness, fatigue, charges) pour considérer que deux trajectoires
+        # se sont rejointes (reconverged_day du rapport de update())
+        self.tol = tol
+        self.env = MarathonEnvironment(athlete_params, weather_bank)
+        self.states = [self.env.reset(weather_seed)]
+        self.actions = []
+        self.rewards = []
+        self.completed_days = 0
+        self._simulate_from(0)
+
+    @property
+    def n_days(self) -> int:
+        return len(self.actions)
+
+    def _policy(self, state: MarathonTrainingState) -> TrainingAction:
+        """Action gloutonne ; état jamais visité : repos (choix déterministe et prudent)"""
+        state_key = self.agent.state_key(state)
+        if self.agent.value_approx is None and state_key not in self.agent.Q:
+            return self.agent.actions[0]
+        return self.agent.actions[int(self.agent.greedy_action_indices([state_key])[0])]
+
+    def _env_at(self, day: int) -> MarathonEnvironment:
+        """Environnement replacé au matin du jour `day` (les états ne sont jamais modifiés en place)"""
+        self.env.state = self.states[day]
+        self.env.day = day
+        self.env.history = []
+        return self.env
+
+    def _simulate_from(self, day: int):
+        """Recalcule le plan du jour `day` jusqu'au marathon"""
+        del self.states[day + 1:], self.actions[day:], self.rewards[day:]
+        env = self._env_at(day)
+        state = self.states[day]
+        done = state.jours_avant_marathon <= 0
+        while not done:
+            action = self._policy(state)
+            state, reward, done = env.step(action)
+            self.actions.append(action)
+            self.rewards.append(reward)
+            self.states.append(state)
+
+    def _reconverged(self, state: MarathonTrainingState, planned: MarathonTrainingState) -> bool:
+        """Même clé d'état, même historique récent et grandeurs continues à tol près"""
+        if state.derniers_entrainements != planned.derniers_entrainements:
+            return False
+        if self.agent.state_key(state) != self.agent.state_key(planned):
+            return False
+        if abs(state.fitness - planned.fitness) > self.tol or abs(state.fatigue - planned.fatigue) > self.tol:
+            return False
+        for name in ('acute', 'chronic', 'volume'):
+            ours, theirs = getattr(state.charges, name), getattr(planned.charges, name)
+            # Le volume est en minutes : tolérance ramenée à l'échelle des heures
+            atol = self.tol * 60 if name == 'volume' else self.tol
+            if ours.position != theirs.position or not np.allclose(ours.buffer, theirs.buffer, atol=atol, rtol=0):
+                return False
+        return True
+
+    def update(self, completed: List[TrainingAction]) -> Dict:
+        """
+        Enregistre les séances réellement faites depuis le dernier jour réalisé
+        (une séance sautée est une séance de repos) et recalcule la suite du plan.
+
+        Les jours conformes au plan réutilisent les états en cache. Après un écart, la
+        suite est re-simulée par l'environnement : états et récompenses sont exacts. Tant
+        que la clé d'état coïncide avec celle du plan précédent, l'action gloutonne est la
+        même et reprise sans interroger la politique. Le rapport donne le jour où la
+        trajectoire rejoint l'ancienne (à tol près) et l'écart maximal de fitness/fatigue
+        entre les deux ensuite (tail_drift).
+        """
+        start = time.perf_counter()
+        day = self.completed_days
+        if day + len(completed) > self.n_days:
+            raise ValueError(f"{len(completed)} séances au-delà de la fin du plan (jour {day})")
+
+        old_states, old_actions, old_rewards = self.states, self.actions, self.rewards
+        self.states, self.actions, self.rewards = old_states[:day + 1], old_actions[:day], old_rewards[:day]
+
+        deviated = False
+        env = self._env_at(day)
+        for offset, action in enumerate(completed):
+            current = day + offset
+            if not deviated and _same_session(action, old_actions[current]):
+                self.actions.append(old_actions[current])
+                self.rewards.append(old_rewards[current])
+                self.states.append(old_states[current + 1])
+                continue
+            if not deviated:
+                deviated = True
+                env = self._env_at(current)
+            state, reward, _ = env.step(action)
+            self.actions.append(action)
+            self.rewards.append(reward)
+            self.states.append(state)
+        self.completed_days = day + len(completed)
+
+        recomputed = 0
+        reconverged_day = None
+        tail_drift = 0.0
+        if not deviated:
+            # Conforme au plan : la suite est inchangée
+            self.actions += old_actions[self.completed_days:]
+            self.rewards += old_rewards[self.completed_days:]
+            self.states += old_states[self.completed_days + 1:]
+        else:
+            env = self._env_at(self.completed_days)
+            state = self.states[-1]
+            current = self.completed_days
+            done = state.jours_avant_marathon <= 0
+            while not done:
+                planned = old_states[current]
+                if reconverged_day is None and self._reconverged(state, planned):
+                    reconverged_day = current
+                if reconverged_day is not None:
+                    tail_drift = max(tail_drift, abs(state.fitness - planned.fitness),
+                                     abs(state.fatigue - planned.fatigue))
+                # La politique ne dépend que de la clé d'état
+                if self.agent.state_key(state) == self.agent.state_key(planned):
+                    action = old_actions[current]
+                else:
+                    action = self._policy(state)
+                    recomputed += 1
+                state, reward, done = env.step(action)
+                self.actions.append(action)
+                self.rewards.append(reward)
+                self.states.append(state)
+                current += 1
+
+        return {
+            'completed_days': self.completed_days,
+            'deviated': deviated,
+            'recomputed_days': recomputed,
+            'reconverged_day': reconverged_day,
+            'tail_drift': float(tail_drift),
+            'elapsed_ms': (time.perf_counter() - start) * 1000,
+        }
+
+    def to_records(self) -> List[Dict]:
+        """Lignes du plan au format de generate_full_training_plan, avec le statut du jour"""
+        return [{
+            'jour': day + 1,
+            'type': action.type.value,
+            'duree': action.duree,
+            'zone_fc': action.zone_fc,
+            'fitness': self.states[day + 1].fitness,
+            'fatigue': self.states[day + 1].fatigue,
+            'performance': self.states[day + 1].performance,
+            'statut': 'réalisé' if day < self.completed_days else 'prévu',
+        } for day, action in enumerate(self.actions)]
+
+
+class Replanner:
+    """
+    Plans de plusieurs athlètes partageant un même agent. Chaque athlète a son
+    verrou : les mises à jour d'athlètes différents peuvent être concurrentes.
+    """
+    def __init__(self, agent: AdvancedDynaQMarathon, weather_bank: WeatherBank = None,
+                 tol: float = 0.05):
+        self.agent = agent
+        self.weather_bank = weather_bank
+        self.tol = tol
+        self.plans: Dict[Hashable, TrainingPlan] = {}
+        self._locks: Dict[Hashable, threading.Lock] = {}
+        self._registry_lock = threading.Lock()
+
+    def _lock(self, athlete_id: Hashable) -> threading.Lock:
+        with self._registry_lock:
+            return self._locks.setdefault(athlete_id, threading.Lock())
+
+    def create(self, athlete_id: Hashable, athlete_params: Dict[str, float] = None,
+               weather_seed: int = None) -> TrainingPlan:
+        plan = TrainingPlan(self.agent, athlete_params, self.weather_bank, weather_seed, self.tol)
+        with self._lock(athlete_id):
+            self.plans[athlete_id] = plan
+        return plan
+
+    def update(self, athlete_id: Hashable, completed: List[TrainingAction]) -> Dict:
+        with self._lock(athlete_id):
+            return self.plans[athlete_id].update(completed)
+
+    def remaining(self, athlete_id: Hashable) -> List[TrainingAction]:
+        """Séances encore prévues pour l'athlète"""
+        with self._lock(athlete_id):
+            plan = self.plans[athlete_id]
+            return plan.actions[plan.completed_days:]
+
+    def remove(self, athlete_id: Hashable):
+        with self._registry_lock:
+            self.plans.pop(athlete_id, None)
+            self._locks.pop(athlete_id, None)
@@ -0,0 +1,199 @@
+import asyncio
+import json
+import random
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from Dyna import AdvancedDynaQMarathon, MarathonTrainingState
+
+
+class LatencyHistogram:
+    """Histogramme de latences (ms) à seaux logarithmiques, avec percentiles approchés"""
+    def __init__(self, min_ms: float = 0.01, max_ms: float = 10000.0, buckets_per_decade: int = 10):
+        n_decades = np.log10(max_ms / min_ms)
+        self.edges = min_ms * 10 ** (np.arange(int(n_decades * buckets_per_decade) + 1) / buckets_per_decade)
+        self.counts = np.zeros(len(self.edges) + 1, dtype=np.int64)
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, value_ms: float):
+        self.counts[np.searchsorted(self.edges, value_ms)] += 1
+        self.total_ms += value_ms
+        self.max_ms = max(self.max_ms, value_ms)
+
+    @property
+    def count(self) -> int:
+        return int(self.counts.sum())
+
+    def percentile(self, q: float) -> float:
+        """Borne supérieure du seau contenant le q-ième percentile"""
+        if self.count == 0:
+            return 0.0
+        index = int(np.searchsorted(np.cumsum(self.counts), q / 100 * self.count))
+        return float(self.edges[index]) if index < len(self.edges) else self.max_ms
+
+    def snapshot(self) -> Dict:
+        return {
+            'count': self.count,
+            'mean_ms': self.total_ms / self.count if self.count else 0.0,
+            'p50_ms': self.percentile(50),
+            'p90_ms': self.percentile(90),
+            'p99_ms': self.percentile(99),
+            'max_ms': self.max_ms,
+            'buckets': {f"<={edge:.3g}": int(n) for edge, n in zip(self.edges, self.counts) if n},
+        }
+
+
+def load_agent(model_path: str) -> AdvancedDynaQMarathon:
+    agent = AdvancedDynaQMarathon(epsilon=0.0)
+    agent.load_model(model_path)
+    return agent
+
+
+def batch_state_keys(agent: AdvancedDynaQMarathon, states: List[MarathonTrainingState]) -> List[tuple]:
+    """Clés d'état d'un batch, encodées en une passe quand l'agent a un encodeur"""
+    if agent.value_approx is None and agent.state_encoder is not None:
+        encoder = agent.state_encoder
+        bins = encoder.encode_batch(encoder.states_to_array(states))
+        return [tuple(row) for row in bins.tolist()]
+    return [agent.state_key(state) for state in states]
+
+
+class RecommendationService:
+    """
+    Service asyncio de recommandations gloutonnes au-dessus d'un modèle Dyna chargé une fois.
+
+    Les requêtes concurrentes sont regroupées en micro-batchs (au plus max_batch_size
+    requêtes, attente d'au plus max_wait_ms après la première) pour l'encodage des
+    états et la recherche de politique. reload() remplace le modèle entre deux batchs,
+    sans perdre de requête. Les états inconnus du modèle reçoivent une action tirée
+    avec un générateur propre au service (graine seed), jamais avec le random global.
+    """
+    def __init__(self, model_path: str, max_batch_size: int = 64, max_wait_ms: float = 2.0,
+                 seed: int = 0):
+        self.model_path = model_path
+        self.agent = load_agent(model_path)
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.latency = LatencyHistogram()
+        self.batch_sizes = []
+        self.model_version = 1
+        self._fallback_rng = random.Random(seed)
+        self._queue = None
+        self._worker = None
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Traite les requêtes en attente puis arrête le worker"""
+        await self._queue.join()
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+
+    async def recommend(self, state_data: Dict) -> Dict:
+        """Recommandation pour un état sérialisé (MarathonTrainingState.to_dict)"""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((MarathonTrainingState.from_dict(state_data), future, time.perf_counter()))
+        return await future
+
+    async def reload(self, model_path: str = None) -> int:
+        """Charge un nouveau modèle hors de la boucle, puis l'échange atomiquement"""
+        model_path = model_path or self.model_path
+        agent = await asyncio.get_running_loop().run_in_executor(None, load_agent, model_path)
+        self.agent, self.model_path = agent, model_path
+        self.model_version += 1
+        return self.model_version
+
+    async def _next_batch(self) -> list:
+        batch = [await self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait_ms / 1000
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._next_batch()
+            # Le modèle est lu une fois par batch : un reload() concurrent s'applique au suivant
+            agent, version = self.agent, self.model_version
+            try:
+                states = [state for state, _, _ in batch]
+                keys = batch_state_keys(agent, states)
+                indices = agent.greedy_action_indices(keys, self._fallback_rng)
+                results = [dict(agent.describe_recommendation(state, agent.actions[index], key),
+                                model_version=version)
+                           for state, index, key in zip(states, indices, keys)]
+            except Exception as error:
+                results = [error] * len(batch)
+
+            now = time.perf_counter()
+            self.batch_sizes.append(len(batch))
+            for (_, future, received), result in zip(batch, results):
+                self.latency.record((now - received) * 1000)
+                if not future.done():
+                    if isinstance(result, Exception):
+                        future.set_exception(result)
+                    else:
+                        future.set_result(result)
+                self._queue.task_done()
+
+    def stats(self) -> Dict:
+        sizes = np.array(self.batch_sizes[-10000:])
+        return {
+            'model_path': self.model_path,
+            'model_version': self.model_version,
+            'latency': self.latency.snapshot(),
+            'batches': len(self.batch_sizes),
+            'mean_batch_size': float(sizes.mean()) if len(sizes) else 0.0,
+        }
+
+    # --- Transport : socket locale, une requête JSON par ligne ----------------
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """
+        Messages acceptés : {"state": {...}}, {"reload": "chemin"} et {"stats": true}.
+        Les réponses sont écrites dans l'ordre des requêtes de la connexion.
+        """
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            try:
+                message = json.loads(line)
+                if 'state' in message:
+                    response = await self.recommend(message['state'])
+                elif 'reload' in message:
+                    response = {'model_version': await self.reload(message['reload'])}
+                else:
+                    response = self.stats()
+            except Exception as error:
+                response = {'error': str(error)}
+            writer.write((json.dumps(response, default=float) + '\n').encode())
+            await writer.drain()
+        writer.close()
+
+    async def serve(self, host: str = '127.0.0.1', port: int = 8765):
+        await self.start()
+        server = await asyncio.start_server(self._handle_connection, host, port)
+        async with server:
+            await server.serve_forever()
+
+
+if __name__ == "__main__":
+    import sys
+
+    service = RecommendationService(sys.argv[1] if len(sys.argv) > 1 else 'trained_marathon_model.json')
+    asyncio.run(service.serve())
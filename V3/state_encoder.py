@@ -0,0 +1,147 @@
+from bisect import bisect_right
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Sequence
+
+import numpy as np
+
+
+@dataclass
+class FeatureSpec:
+    """Discrétisation d'un attribut de MarathonTrainingState par bornes de bins"""
+    name: str
+    edges: Sequence[float]
+
+    @property
+    def n_bins(self) -> int:
+        return len(self.edges) + 1
+
+
+class StateEncoder:
+    """
+    Encodeur d'état configurable pour le Q-learning tabulaire.
+
+    Chaque feature est découpée selon ses bornes (sémantique de np.digitize).
+    Un état s'encode en tuple d'indices de bins (clé de Q) ou en un identifiant
+    int64 unique (base mixte), et un batch d'états s'encode de façon vectorisée.
+    """
+    def __init__(self, features: List[FeatureSpec]):
+        self.features = [FeatureSpec(f.name, [float(e) for e in f.edges]) for f in features]
+        self.names = [f.name for f in self.features]
+        self.n_bins = np.array([f.n_bins for f in self.features], dtype=np.int64)
+
+        # Taille de l'espace d'états et pas de la base mixte pour l'identifiant int64
+        size = 1
+        for n in self.n_bins:
+            size *= int(n)
+        if size >= 2 ** 63:
+            raise ValueError(f"Espace d'états trop grand pour un int64 : {size}")
+        self.state_space_size = size
+        self.strides = np.ones(len(self.features), dtype=np.int64)
+        for i in range(len(self.features) - 2, -1, -1):
+            self.strides[i] = self.strides[i + 1] * self.n_bins[i + 1]
+        self._edges_arrays = [np.asarray(f.edges, dtype=np.float64) for f in self.features]
+
+    # --- Encodage scalaire -------------------------------------------------
+
+    def encode(self, state) -> tuple:
+        """Clé de Q pour un état (tuple d'indices de bins)"""
+        return tuple(bisect_right(f.edges, getattr(state, f.name)) for f in self.features)
+
+    def encode_id(self, state) -> int:
+        """Identifiant entier unique de l'état discrétisé"""
+        return self.pack(self.encode(state))
+
+    def pack(self, key: tuple) -> int:
+        return int(sum(int(b) * int(s) for b, s in zip(key, self.strides)))
+
+    def unpack(self, state_id: int) -> tuple:
+        return tuple(int(state_id // s % n) for s, n in zip(self.strides, self.n_bins))
+
+    # --- Encodage vectorisé ------------------------------------------------
+
+    def states_to_array(self, states: Iterable) -> np.ndarray:
+        """Matrice (N, F) des features brutes d'une liste d'états"""
+        return np.array([[getattr(s, name) for name in self.names] for s in states],
+                        dtype=np.float64)
+
+    def encode_batch(self, values: np.ndarray) -> np.ndarray:
+        """Indices de bins (N, F) pour une matrice de features brutes (N, F)"""
+        values = np.asarray(values, dtype=np.float64)
+        bins = np.empty(values.shape, dtype=np.int64)
+        for i, edges in enumerate(self._edges_arrays):
+            bins[:, i] = np.digitize(values[:, i], edges)
+        return bins
+
+    def encode_ids_batch(self, values: np.ndarray) -> np.ndarray:
+        """Identifiants int64 (N,) pour une matrice de features brutes (N, F)"""
+        return self.encode_batch(values) @ self.strides
+
+    # --- Configuration -----------------------------------------------------
+
+    def without(self, *names: str) -> "StateEncoder":
+        """Nouvel encodeur sans les features indiquées"""
+        return StateEncoder([f for f in self.features if f.name not in names])
+
+    def coarsen(self, name: str, factor: int) -> "StateEncoder":
+        """Nouvel encodeur ne gardant qu'une borne sur `factor` pour la feature indiquée"""
+        return StateEncoder([FeatureSpec(f.name, f.edges[factor - 1::factor])
+                             if f.name == name else f
+                             for f in self.features])
+
+    def to_dict(self) -> Dict:
+        return {'features': [{'name': f.name, 'edges': list(f.edges)} for f in self.features]}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "StateEncoder":
+        return cls([FeatureSpec(f['name'], f['edges']) for f in data['features']])
+
+    # --- Rapport d'occupation ----------------------------------------------
+
+    def occupancy(self, keys: Iterable[tuple]) -> Dict:
+        """Taux d'occupation de l'espace d'états à partir des clés visitées"""
+        keys = np.array(list(keys), dtype=np.int64).reshape(-1, len(self.features))
+        n_visited = len(np.unique(keys @ self.strides)) if len(keys) else 0
+        return {
+            'state_space_size': self.state_space_size,
+            'visited_states': n_visited,
+            'occupancy': n_visited / self.state_space_size,
+            'bins_used': {name: int(len(np.unique(keys[:, i]))) for i, name in enumerate(self.names)},
+            'n_bins': {name: int(n) for name, n in zip(self.names, self.n_bins)},
+        }
+
+
+def _rounding_edges(scale: float, low: float, high: float) -> np.ndarray:
+    """Bornes équivalentes à round(x * scale) sur [low, high]"""
+    return (np.arange(round(low * scale), round(high * scale)) + 0.5) / scale
+
+
+def legacy_encoder() -> StateEncoder:
+    """Même résolution que MarathonTrainingState.discretize()"""
+    return StateEncoder([
+        FeatureSpec('fitness', _rounding_edges(10, 0, 5)),
+        FeatureSpec('fatigue', _rounding_edges(10, 0, 3)),
+        FeatureSpec('performance', _rounding_edges(10, -2, 2)),
+        FeatureSpec('vma', _rounding_edges(2, 10, 25)),
+        FeatureSpec('volume_hebdo', _rounding_edges(0.1, 0, 200)),
+        FeatureSpec('risque_blessure', _rounding_edges(10, 0, 1)),
+        FeatureSpec('jours_avant_marathon', np.arange(1, 121)),
+        FeatureSpec('temperature', _rounding_edges(0.2, -10, 40)),
+    ])
+
+
+def compact_encoder(fitness_step: float = 0.2, fatigue_step: float = 0.2,
+                    days_per_bin: int = 7) -> StateEncoder:
+    """
+    Encodeur compact : supprime vma (constante sur un épisode), volume_hebdo (redondant)
+    et la météo. Avec une banque météo, temperature et meteo changent chaque jour :
+    la politique compacte les ignore, leur effet ne passe que par la charge et la
+    récompense. Garde le risque de blessure en 4 niveaux et ramène le compte à
+    rebours à une résolution hebdomadaire.
+    """
+    return StateEncoder([
+        FeatureSpec('fitness', np.arange(fitness_step, 4.0, fitness_step)),
+        FeatureSpec('fatigue', np.arange(fatigue_step, 2.0, fatigue_step)),
+        FeatureSpec('performance', np.arange(-1.0, 1.5, 0.25)),
+        FeatureSpec('risque_blessure', [0.25, 0.5, 0.75]),
+        FeatureSpec('jours_avant_marathon', np.arange(days_per_bin, 121, days_per_bin)),
+    ])
@@ -0,0 +1,223 @@
+import hashlib
+import itertools
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from Dyna import AdvancedDynaQMarathon, train_agent
+from evaluation import evaluate_agent
+from weather import WeatherBank
+
+# Hyperparamètres acceptés par train_agent
+SWEEP_PARAMS = ('n_planning_steps', 'learning_rate', 'discount_factor',
+                'initial_epsilon', 'final_epsilon')
+
+
+def grid_configs(space: Dict[str, List]) -> List[Dict]:
+    """Recherche en grille : produit cartésien des valeurs de chaque paramètre"""
+    _check_params(space)
+    names = sorted(space)
+    return [dict(zip(names, values))
+            for values in itertools.product(*(space[name] for name in names))]
+
+
+def random_configs(space: Dict, n_configs: int, seed: int = 0) -> List[Dict]:
+    """
+    Recherche aléatoire. Chaque paramètre est soit une liste (choix uniforme),
+    soit un tuple (min, max) tiré uniformément (entier si les deux bornes sont entières).
+    """
+    _check_params(space)
+    rng = random.Random(seed)
+    configs = []
+    for _ in range(n_configs):
+        config = {}
+        for name in sorted(space):
+            values = space[name]
+            if isinstance(values, tuple):
+                low, high = values
+                if isinstance(low, int) and isinstance(high, int):
+                    config[name] = rng.randint(low, high)
+                else:
+                    config[name] = rng.uniform(low, high)
+            else:
+                config[name] = rng.choice(values)
+        configs.append(config)
+    return configs
+
+
+def _check_params(space: Dict):
+    unknown = set(space) - set(SWEEP_PARAMS)
+    if unknown:
+        raise ValueError(f"Paramètres inconnus pour le sweep : {sorted(unknown)}")
+
+
+def config_hash(config: Dict) -> str:
+    """Identifiant stable d'une configuration"""
+    payload = json.dumps(config, sort_keys=True)
+    return hashlib.sha1(payload.encode()).hexdigest()[:12]
+
+
+def _write_json_atomic(path: str, data: Dict):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def _score(agent: AdvancedDynaQMarathon, evaluation: Dict) -> Dict:
+    """Retour glouton moyen sur des athlètes fixes, identiques pour tous les paliers et configurations"""
+    weather_bank = WeatherBank(evaluation['weather_dir']) if evaluation.get('weather_dir') else None
+    summary = evaluate_agent(agent, evaluation['episodes'], evaluation['seed'], weather_bank)
+    return {'score': summary['return']['mean'], 'score_ci': [summary['return']['ci_low'],
+                                                             summary['return']['ci_high']]}
+
+
+def _run_config(config: Dict, seed: int, total_episodes: int, start: int, stop: int,
+                cache_dir: str, evaluation: Dict, weather_dir: Optional[str] = None) -> Dict:
+    """Entraîne une configuration jusqu'à `stop` épisodes (exécuté dans un processus du pool)"""
+    # Le schéma epsilon, la graine et la banque météo font partie de la clé de cache
+    key_fields = dict(config, total_episodes=total_episodes, seed=seed)
+    if weather_dir is not None:
+        key_fields['weather_dir'] = weather_dir
+    key = config_hash(key_fields)
+    metrics_path = os.path.join(cache_dir, f"{key}_{stop}.metrics.json")
+    checkpoint_path = os.path.join(cache_dir, f"{key}_{stop}.json")
+
+    # Configuration déjà terminée lors d'un précédent lancement (réévaluée si le
+    # protocole d'évaluation a changé depuis)
+    if os.path.exists(metrics_path):
+        with open(metrics_path) as f:
+            metrics = json.load(f)
+        if metrics.get('evaluation') != evaluation:
+            agent = AdvancedDynaQMarathon()
+            agent.load_model(checkpoint_path)
+            metrics.update(_score(agent, evaluation), evaluation=evaluation)
+            _write_json_atomic(metrics_path, metrics)
+        return metrics
+
+    agent = AdvancedDynaQMarathon(n_planning_steps=config.get('n_planning_steps', 10),
+                                  learning_rate=config.get('learning_rate', 0.1),
+                                  discount_factor=config.get('discount_factor', 0.95))
+    returns = []
+    # Reprise depuis le palier précédent s'il est en cache
+    previous_metrics = os.path.join(cache_dir, f"{key}_{start}.metrics.json")
+    if start > 0 and os.path.exists(previous_metrics):
+        agent.load_model(os.path.join(cache_dir, f"{key}_{start}.json"))
+        with open(previous_metrics) as f:
+            returns = json.load(f)['returns']
+    else:
+        start = 0
+
+    t0 = time.perf_counter()
+    agent, _ = train_agent(episodes=total_episodes,
+                           initial_epsilon=config.get('initial_epsilon', 0.9),
+                           final_epsilon=config.get('final_epsilon', 0.1),
+                           seed=seed + start,
+                           agent=agent,
+                           start_episode=start,
+                           stop_episode=stop,
+                           weather_bank=WeatherBank(weather_dir) if weather_dir else None,
+                           verbose=False)
+    returns = returns + agent.episode_rewards
+
+    metrics = {
+        'config': config,
+        'hash': key,
+        'seed': seed,
+        'episodes': stop,
+        # Retours d'entraînement (exploration comprise), pour information
+        'returns': returns,
+        **_score(agent, evaluation),
+        'evaluation': evaluation,
+        'duration_s': time.perf_counter() - t0,
+    }
+    agent.save_model(checkpoint_path)
+    _write_json_atomic(metrics_path, metrics)
+    return metrics
+
+
+def _rung_budgets(min_episodes: int, max_episodes: int, eta: int) -> List[int]:
+    budgets = []
+    budget = min_episodes
+    while budget < max_episodes:
+        budgets.append(budget)
+        budget *= eta
+    budgets.append(max_episodes)
+    return budgets
+
+
+def run_sweep(configs: List[Dict],
+              max_episodes: int = 5000,
+              min_episodes: Optional[int] = 500,
+              eta: int = 3,
+              eval_episodes: int = 256,
+              eval_seed: int = 0,
+              base_seed: int = 0,
+              cache_dir: str = "sweep_cache",
+              max_workers: Optional[int] = None,
+              weather_dir: Optional[str] = None,
+              verbose: bool = True) -> List[Dict]:
+    """
+    Lance les configurations en parallèle avec élagage par successive halving :
+    à chaque palier de budget, seul le meilleur 1/eta continue. Le score est le retour
+    moyen de la politique gloutonne (evaluate_agent) sur `eval_episodes` athlètes tirés
+    avec `eval_seed`, les mêmes à chaque palier et pour chaque configuration : les
+    retours d'entraînement dépendent de l'exploration (epsilon) et ne sont pas comparables
+    entre paliers. `min_episodes=None` désactive l'élagage.
+    Avec `weather_dir` (WeatherBank), entraînement et évaluation utilisent la banque météo.
+
+    Retourne les métriques du dernier palier atteint par chaque configuration,
+    triées de la meilleure à la moins bonne.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    budgets = [max_episodes] if min_episodes is None else \
+        _rung_budgets(min_episodes, max_episodes, eta)
+
+    # Graine indépendante par configuration, dérivée de son hash
+    seeds = {config_hash(c): base_seed + int(config_hash(c), 16) % 100000 for c in configs}
+
+    evaluation = {'episodes': eval_episodes, 'seed': eval_seed}
+    if weather_dir is not None:
+        # Chemin absolu : les processus du pool ouvrent la banque eux-mêmes (memory-map)
+        weather_dir = os.path.abspath(weather_dir)
+        evaluation['weather_dir'] = weather_dir
+    results = {}
+    survivors = list(configs)
+    previous_budget = 0
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        for rung, budget in enumerate(budgets):
+            futures = [pool.submit(_run_config, config, seeds[config_hash(config)], max_episodes,
+                                   previous_budget, budget, cache_dir, evaluation, weather_dir)
+                       for config in survivors]
+            rung_results = [future.result() for future in futures]
+            for config, metrics in zip(survivors, rung_results):
+                results[config_hash(config)] = metrics
+
+            rung_results.sort(key=lambda m: m['score'], reverse=True)
+            if verbose:
+                print(f"Palier {rung} ({budget} épisodes) : {len(rung_results)} configurations, "
+                      f"meilleur score {rung_results[0]['score']:.2f}")
+
+            if budget == max_episodes:
+                break
+            n_keep = max(1, len(rung_results) // eta)
+            survivors = [m['config'] for m in rung_results[:n_keep]]
+            previous_budget = budget
+
+    return sorted(results.values(), key=lambda m: (m['episodes'], m['score']), reverse=True)
+
+
+if __name__ == "__main__":
+    configs = grid_configs({
+        'n_planning_steps': [5, 10, 20],
+        'learning_rate': [0.05, 0.1, 0.2],
+        'discount_factor': [0.9, 0.95],
+    })
+    results = run_sweep(configs, max_episodes=5000, min_episodes=500)
+    best = results[0]
+    print(f"\nMeilleure configuration : {best['config']} (score {best['score']:.2f})")
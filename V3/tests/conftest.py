@@ -0,0 +1,22 @@
+import os
+import sys
+
+import pytest
+
+# Les modules de V3 sont des scripts qui s'importent entre eux par leur nom
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Dyna import train_agent  # noqa: E402
+from weather import WeatherBank  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def trained_agent():
+    """Petit agent tabulaire entraîné quelques épisodes (partagé, à ne pas modifier)"""
+    agent, _ = train_agent(episodes=10, seed=1, n_planning_steps=5, verbose=False)
+    return agent
+
+
+@pytest.fixture(scope="session")
+def weather_bank(tmp_path_factory):
+    return WeatherBank.generate(str(tmp_path_factory.mktemp("weather")), n_scenarios=16, n_days=121, seed=0)
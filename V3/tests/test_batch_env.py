@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from Dyna import AdvancedDynaQMarathon, MarathonEnvironment
+from batch_env import BatchMarathonEnvironment
+
+FIELDS = ('fitness', 'fatigue', 'performance', 'forme', 'volume_hebdo', 'risque_blessure',
+          'jours_avant_marathon', 'temperature')
+N_ENVS = 4
+
+
+@pytest.fixture(scope="module")
+def actions():
+    return AdvancedDynaQMarathon().actions
+
+
+def _assert_same_state(batch, envs):
+    for i, env in enumerate(envs):
+        for name in FIELDS:
+            assert getattr(batch, name)[i] == pytest.approx(getattr(env.state, name)), name
+    assert batch.discretize() == [env.state.discretize() for env in envs]
+
+
+def _play(batch, envs, actions, rng, n_days):
+    for _ in range(n_days):
+        indices = rng.integers(0, len(actions), size=len(envs))
+        rewards, dones = batch.step(indices)
+        expected = [env.step(actions[i]) for env, i in zip(envs, indices)]
+        assert rewards == pytest.approx([reward for _, reward, _ in expected])
+        assert list(dones) == [done for _, _, done in expected]
+        _assert_same_state(batch, envs)
+
+
+def test_full_episode_parity(actions):
+    rng = np.random.default_rng(0)
+    envs = [MarathonEnvironment() for _ in range(N_ENVS)]
+    for env in envs:
+        env.reset()
+    batch = BatchMarathonEnvironment(N_ENVS, actions)
+    _play(batch, envs, actions, rng, envs[0].state.jours_avant_marathon)
+
+
+def test_weather_parity(actions, weather_bank):
+    rng = np.random.default_rng(1)
+    seeds = [3, 7, 7, 20]
+    envs = [MarathonEnvironment(weather_bank=weather_bank) for _ in seeds]
+    for env, seed in zip(envs, seeds):
+        env.reset(seed)
+    batch = BatchMarathonEnvironment(N_ENVS, actions, weather_bank=weather_bank).reset(seeds)
+    _assert_same_state(batch, envs)
+    _play(batch, envs, actions, rng, 30)
+
+
+def test_load_states_mid_episode(actions):
+    """Athlètes différents arrêtés à des jours différents, puis simulés ensemble"""
+    rng = np.random.default_rng(2)
+    envs = [MarathonEnvironment({'tau_fitness': 38.0 + 4 * i, 'k_fatigue': 1.8 + 0.1 * i})
+            for i in range(N_ENVS)]
+    for day, env in zip([0, 3, 10, 40], envs):
+        env.reset()
+        for _ in range(day):
+            env.step(actions[int(rng.integers(len(actions)))])
+
+    batch = BatchMarathonEnvironment(N_ENVS, actions).load_states([env.state for env in envs])
+    _assert_same_state(batch, envs)
+    _play(batch, envs, actions, rng, 20)
+
+    for i, env in enumerate(envs):
+        state = batch.to_state(i)
+        assert state.derniers_entrainements == env.state.derniers_entrainements
+        assert state.tau_fitness == env.state.tau_fitness
+        for name in ('acute', 'chronic', 'volume'):
+            assert getattr(state.charges, name).total == pytest.approx(getattr(env.state.charges, name).total)
+
+
+def test_load_states_checks_size(actions):
+    with pytest.raises(ValueError):
+        BatchMarathonEnvironment(2, actions).load_states([MarathonEnvironment().reset()])
@@ -0,0 +1,93 @@
+import os
+import random
+
+import numpy as np
+
+from Dyna import AdvancedDynaQMarathon, train_agent
+from checkpoint import CheckpointManager
+
+TRAINING = dict(episodes=10, seed=3, n_planning_steps=5, checkpoint_every=1, verbose=False)
+
+
+def agent_state(agent):
+    """Contenu comparable d'un agent : Q, modèle, file de priorité, compteurs et tampon"""
+    return {
+        'Q': {s: dict(row) for s, row in agent.Q.items() if row},
+        'model': dict(agent.model),
+        'priorities': dict(agent.model.priorities),
+        'predecessors': {s: set(p) for s, p in agent.predecessors.items() if p},
+        'pq': sorted(agent.pq.pq.queue),
+        'epsilon': agent.epsilon,
+        'episode_rewards': list(agent.episode_rewards),
+        'n_real_steps': agent.n_real_steps,
+        'recent_states': [s.to_dict() for s in agent.recent_states],
+    }
+
+
+def test_restore_round_trip(tmp_path):
+    agent, _ = train_agent(stop_episode=4, checkpoint_dir=str(tmp_path), compact_every=2, **TRAINING)
+    expected, py_state, np_state = agent_state(agent), random.getstate(), np.random.get_state()
+
+    restored = AdvancedDynaQMarathon(n_planning_steps=5)
+    report = CheckpointManager(str(tmp_path)).restore(restored)
+    assert report['episode'] == 4
+    assert agent_state(restored) == expected
+    assert random.getstate() == py_state
+    assert np.array_equal(np.random.get_state()[1], np_state[1])
+
+
+def test_truncated_delta_restores_previous_checkpoint(tmp_path):
+    """Crash pendant l'écriture d'un delta : la reprise retrouve l'état du checkpoint précédent"""
+    agent = AdvancedDynaQMarathon(n_planning_steps=5)
+    manager = CheckpointManager(str(tmp_path))
+    train_agent(episodes=10, stop_episode=6, agent=agent, verbose=False)
+    assert manager.save(agent, 6)['kind'] == 'snapshot'
+    train_agent(episodes=10, start_episode=6, stop_episode=7, agent=agent, verbose=False)
+    assert manager.save(agent, 7)['kind'] == 'delta'
+    expected, py_state = agent_state(agent), random.getstate()
+    train_agent(episodes=10, start_episode=7, stop_episode=8, agent=agent, verbose=False)
+    assert manager.save(agent, 8)['kind'] == 'delta'
+
+    with open(manager.log_path, 'rb') as f:
+        lines = f.read().splitlines(keepends=True)
+    with open(manager.log_path, 'wb') as f:
+        f.write(lines[0] + lines[1][:len(lines[1]) // 2])
+
+    restored = AdvancedDynaQMarathon(n_planning_steps=5)
+    assert CheckpointManager(str(tmp_path)).restore(restored)['episode'] == 7
+    assert agent_state(restored) == expected
+    assert random.getstate() == py_state
+    # La ligne incomplète est retirée du journal
+    with open(manager.log_path, 'rb') as f:
+        assert f.read() == lines[0]
+
+
+def test_resume_matches_uninterrupted_training(tmp_path):
+    straight, _ = train_agent(stop_episode=4, **TRAINING)
+    train_agent(stop_episode=2, checkpoint_dir=str(tmp_path), **TRAINING)
+    resumed, _ = train_agent(stop_episode=4, checkpoint_dir=str(tmp_path), **TRAINING)
+    assert agent_state(resumed) == agent_state(straight)
+
+
+def test_compact_writes_tombstones(tmp_path):
+    agent, _ = train_agent(stop_episode=1, checkpoint_dir=str(tmp_path), **TRAINING)
+    manager = CheckpointManager(str(tmp_path))
+    manager.restore(AdvancedDynaQMarathon(n_planning_steps=5))
+    manager.attach(agent)
+    agent.compact()
+    manager.save(agent, 1)
+
+    restored = AdvancedDynaQMarathon(n_planning_steps=5)
+    CheckpointManager(str(tmp_path)).restore(restored)
+    assert agent_state(restored)['Q'] == agent_state(agent)['Q']
+
+
+def test_tile_coding_weights(tmp_path):
+    agent = AdvancedDynaQMarathon(n_planning_steps=5, value_backend="tile_coding")
+    train_agent(stop_episode=3, agent=agent, checkpoint_dir=str(tmp_path), **TRAINING)
+
+    restored = AdvancedDynaQMarathon(n_planning_steps=5, value_backend="tile_coding")
+    CheckpointManager(str(tmp_path)).restore(restored)
+    assert np.array_equal(restored.value_approx.weights, agent.value_approx.weights)
+    # Seuls les poids de l'instantané courant sont conservés
+    assert len([name for name in os.listdir(str(tmp_path)) if name.endswith(".npy")]) == 1
@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from Dyna import AdvancedDynaQMarathon
+from batch_env import DISCRETIZED_FIELDS
+from distill import TablePolicy, TreePolicy, collect_states, distill, load_policy
+
+
+def test_table_policy_matches_q_table(trained_agent, tmp_path):
+    policy, report = distill(trained_agent, str(tmp_path / "table.npz"), "table", report_episodes=16)
+    assert report['agreement'] == 1.0
+    assert report['return_loss'] == pytest.approx(0.0)
+
+    values, labels, known = collect_states(trained_agent, DISCRETIZED_FIELDS, 8, seed=3)
+    assert known.any()
+    assert np.array_equal(policy.action_indices(values[known]), labels[known])
+    # États inconnus : action par défaut (repos)
+    assert (policy.action_indices(values[~known]) == 0).all()
+
+    reloaded = load_policy(str(tmp_path / "table.npz"))
+    assert isinstance(reloaded, TablePolicy)
+    assert np.array_equal(reloaded.action_indices(values), policy.action_indices(values))
+
+
+def test_tree_fits_separable_labels(tmp_path):
+    rng = np.random.default_rng(0)
+    values = rng.random((400, 2))
+    labels = (values[:, 1] > 0.5).astype(np.int64)
+    actions = [{'type': 'repos'}, {'type': 'endurance'}]
+    tree = TreePolicy.fit(values, labels, ('a', 'b'), actions, max_depth=3, min_samples_leaf=5,
+                          n_thresholds=64)
+    assert np.mean(tree.action_indices(values) == labels) > 0.97
+
+    tree.save(str(tmp_path / "tree.npz"))
+    reloaded = load_policy(str(tmp_path / "tree.npz"))
+    assert np.array_equal(reloaded.action_indices(values), tree.action_indices(values))
+
+
+def test_distill_requires_tabular_agent(tmp_path):
+    with pytest.raises(ValueError):
+        distill(AdvancedDynaQMarathon(value_backend="tile_coding"), str(tmp_path / "p.npz"))
+    with pytest.raises(ValueError):
+        distill(AdvancedDynaQMarathon(), str(tmp_path / "p.npz"), "forest")
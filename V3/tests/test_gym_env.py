@@ -0,0 +1,54 @@
+import numpy as np
+
+from gym_env import INVALID_ACTION_PENALTY, MarathonGymEnv, MarathonVectorEnv, action_catalog
+
+
+def test_catalog_mask():
+    full, mask = action_catalog()
+    valid, valid_mask = action_catalog(include_invalid=False)
+    assert len(valid) == mask.sum() and valid_mask.all()
+    assert [a.discretize() for a, ok in zip(full, mask) if ok] == [a.discretize() for a in valid]
+
+
+def test_episode_with_masked_actions():
+    env = MarathonGymEnv()
+    observation, info = env.reset(seed=0)
+    assert env.observation_space.contains(observation)
+    assert np.array_equal(info['action_mask'], env.action_masks())
+
+    rng = np.random.default_rng(0)
+    valid = np.flatnonzero(env.action_masks())
+    n_steps, terminated = 0, False
+    while not terminated:
+        observation, reward, terminated, truncated, info = env.step(rng.choice(valid))
+        assert env.observation_space.contains(observation)
+        assert not truncated and not info['invalid_action']
+        n_steps += 1
+    assert n_steps == 120
+
+
+def test_invalid_action_is_penalized_rest():
+    invalid = int(np.flatnonzero(~MarathonGymEnv().action_masks())[0])
+    env, rest_env = MarathonGymEnv(), MarathonGymEnv()
+    env.reset(seed=1)
+    rest_env.reset(seed=1)
+    observation, reward, _, _, info = env.step(invalid)
+    rest_observation, rest_reward, _, _, _ = rest_env.step(env.rest_index)
+    assert info['invalid_action']
+    assert np.array_equal(observation, rest_observation)
+    assert reward == rest_reward - INVALID_ACTION_PENALTY
+
+
+def test_vector_env_matches_single_envs():
+    vector = MarathonVectorEnv(3)
+    singles = [MarathonGymEnv() for _ in range(3)]
+    observations, _ = vector.reset(seed=0)
+    assert np.array_equal(observations, np.stack([env.reset(seed=0)[0] for env in singles]))
+
+    rng = np.random.default_rng(2)
+    for _ in range(10):
+        actions = rng.integers(0, vector.single_action_space.n, size=3)
+        observations, rewards, _, _, _ = vector.step(actions)
+        expected = [env.step(a) for env, a in zip(singles, actions)]
+        assert np.allclose(observations, np.stack([e[0] for e in expected]))
+        assert np.allclose(rewards, [e[1] for e in expected])
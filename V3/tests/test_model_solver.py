@@ -0,0 +1,42 @@
+import pytest
+
+from Dyna import AdvancedDynaQMarathon
+from model_solver import solve_model
+
+
+@pytest.mark.parametrize("method", ["value", "policy"])
+def test_two_state_cycle(method):
+    """s0 -(1)-> s1 -(2)-> s0 : V(s0) = (1 + 2γ) / (1 - γ²), les autres actions valent 0"""
+    agent = AdvancedDynaQMarathon(discount_factor=0.9)
+    action = agent.actions[0].discretize()
+    agent.model.record((('s0',), action), 1.0, ('s1',))
+    agent.model.record((('s1',), action), 2.0, ('s0',))
+    agent.q_changes = set()
+
+    report = solve_model(agent, method, tol=1e-10)
+
+    gamma = agent.gamma
+    v0 = (1 + 2 * gamma) / (1 - gamma ** 2)
+    v1 = 2 + gamma * v0
+    assert report['states'] == 2 and report['transitions'] == 2
+    assert agent.Q[('s0',)][action] == pytest.approx(v0, abs=1e-6)
+    assert agent.Q[('s1',)][action] == pytest.approx(v1, abs=1e-6)
+    assert agent.q_changes == {(('s0',), action), (('s1',), action)}
+
+
+def test_negative_rewards_keep_unmodeled_actions():
+    """Une action hors modèle (Q = 0) domine une boucle à récompense négative"""
+    agent = AdvancedDynaQMarathon(discount_factor=0.9)
+    action = agent.actions[0].discretize()
+    agent.model.record((('s0',), action), -1.0, ('s0',))
+    solve_model(agent, tol=1e-10)
+    assert agent.Q[('s0',)][action] == pytest.approx(-1.0)
+
+
+def test_empty_model():
+    assert solve_model(AdvancedDynaQMarathon())['transitions'] == 0
+
+
+def test_tile_coding_rejected():
+    with pytest.raises(ValueError):
+        solve_model(AdvancedDynaQMarathon(value_backend="tile_coding"))
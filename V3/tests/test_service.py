@@ -0,0 +1,92 @@
+import asyncio
+import random
+
+import pytest
+
+from Dyna import MarathonEnvironment
+from service import RecommendationService, batch_state_keys, load_agent
+
+
+@pytest.fixture(scope="module")
+def model_path(trained_agent, tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("service") / "model.json")
+    trained_agent.save_model(path)
+    return path
+
+
+@pytest.fixture(scope="module")
+def states(trained_agent):
+    """États d'un épisode glouton : connus de la table Q pour la plupart"""
+    rng = random.Random(0)
+    env = MarathonEnvironment()
+    state = env.reset()
+    result = [state]
+    for _ in range(15):
+        index = trained_agent.greedy_action_indices([trained_agent.state_key(state)], rng)[0]
+        state, _, _ = env.step(trained_agent.actions[index])
+        result.append(state)
+    return result
+
+
+def _recommend_all(service, states):
+    async def run():
+        await service.start()
+        results = await asyncio.gather(*[service.recommend(s.to_dict()) for s in states])
+        await service.stop()
+        return results
+    return asyncio.run(run())
+
+
+def test_batched_results_match_scalar_policy(model_path, states):
+    service = RecommendationService(model_path, max_batch_size=8, max_wait_ms=50.0)
+    results = _recommend_all(service, states)
+
+    agent = load_agent(model_path)
+    # load_model restaure l'epsilon d'entraînement : référence gloutonne
+    agent.epsilon = 0.0
+    keys = batch_state_keys(agent, states)
+    assert sum(bool(agent.Q.get(key)) for key in keys) >= len(states) // 4
+    for state, key, result in zip(states, keys, results):
+        if agent.Q.get(key):
+            expected = agent.describe_recommendation(state, agent.get_action(state), key)
+            assert {k: v for k, v in result.items() if k != 'model_version'} == expected
+        assert result['model_version'] == 1
+    assert max(service.batch_sizes) > 1 and max(service.batch_sizes) <= 8
+    assert sum(service.batch_sizes) == len(states)
+    assert service.stats()['latency']['count'] == len(states)
+
+
+def test_fallback_does_not_touch_global_random(model_path, states):
+    unknown = [s.to_dict() for s in states]
+    for data in unknown:
+        data['fitness'] += 100.0
+    random.seed(5)
+    expected = random.random()
+
+    runs = []
+    for _ in range(2):
+        random.seed(5)
+        service = RecommendationService(model_path, seed=1)
+
+        async def run():
+            await service.start()
+            results = await asyncio.gather(*[service.recommend(d) for d in unknown])
+            await service.stop()
+            return results
+        runs.append(asyncio.run(run()))
+        assert random.random() == expected
+    assert runs[0] == runs[1]
+
+
+def test_reload_bumps_version(model_path, states):
+    service = RecommendationService(model_path)
+
+    async def run():
+        await service.start()
+        before = await service.recommend(states[0].to_dict())
+        version = await service.reload()
+        after = await service.recommend(states[0].to_dict())
+        await service.stop()
+        return before, version, after
+    before, version, after = asyncio.run(run())
+    assert (before['model_version'], version, after['model_version']) == (1, 2, 2)
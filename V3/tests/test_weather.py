@@ -0,0 +1,44 @@
+import os
+
+import numpy as np
+
+from Dyna import AdvancedDynaQMarathon, MarathonEnvironment
+from weather import WeatherBank
+
+
+def test_generate_is_deterministic(tmp_path):
+    a = WeatherBank.generate(str(tmp_path / "a"), n_scenarios=5, n_days=30, seed=3, chunk_size=2)
+    b = WeatherBank.generate(str(tmp_path / "b"), n_scenarios=5, n_days=30, seed=3, chunk_size=2)
+    assert len(a) == 5 and a.n_days == 30
+    assert np.array_equal(a.conditions, b.conditions)
+    assert np.array_equal(a.temperature, b.temperature)
+    assert np.array_equal(a.load_factor, b.load_factor)
+
+
+def test_scenario_wraps_seed(weather_bank):
+    for first, second in zip(weather_bank.scenario(3), weather_bank.scenario(3 + len(weather_bank))):
+        assert np.array_equal(first, second)
+
+
+def test_get_or_create_reuses_matching_bank(tmp_path):
+    directory = str(tmp_path / "bank")
+    WeatherBank.get_or_create(directory, n_scenarios=4, n_days=10, seed=1)
+    meta_mtime = os.stat(os.path.join(directory, "meta.json")).st_mtime_ns
+    bank = WeatherBank.get_or_create(directory, n_scenarios=4, n_days=10, seed=1)
+    assert os.stat(os.path.join(directory, "meta.json")).st_mtime_ns == meta_mtime
+    assert len(bank) == 4
+
+    # Paramètres différents : la banque est régénérée
+    bank = WeatherBank.get_or_create(directory, n_scenarios=6, n_days=10, seed=1)
+    assert len(bank) == 6 and bank.meta['n_scenarios'] == 6
+
+
+def test_environment_follows_scenario(weather_bank):
+    rest = AdvancedDynaQMarathon().actions[0]
+    env = MarathonEnvironment(weather_bank=weather_bank)
+    _, temperature, _ = weather_bank.scenario(5)
+    state = env.reset(5)
+    assert state.temperature == float(temperature[0])
+    for day in range(1, 4):
+        state, _, _ = env.step(rest)
+        assert state.temperature == float(temperature[day])
@@ -0,0 +1,46 @@
+import numpy as np
+
+from workload import RollingSum, WorkloadTracker
+
+
+def test_rolling_sum_matches_window_sum():
+    values = np.random.default_rng(0).random(50)
+    rolling = RollingSum(7)
+    for day, value in enumerate(values):
+        rolling.push(value)
+        window = values[max(0, day - 6):day + 1]
+        assert np.isclose(rolling.total, window.sum())
+        assert np.isclose(rolling.mean, window.mean())
+
+
+def test_rolling_sum_batch_matches_scalar():
+    values = np.random.default_rng(1).random((40, 3))
+    batch = RollingSum(28, (3,))
+    scalars = [RollingSum(28) for _ in range(3)]
+    for row in values:
+        batch.push(row)
+        for rolling, value in zip(scalars, row):
+            rolling.push(value)
+    assert np.allclose(batch.total, [r.total for r in scalars])
+    assert np.allclose(batch.mean, [r.mean for r in scalars])
+
+
+def test_copy_is_independent():
+    rolling = RollingSum(7)
+    rolling.push(1.0)
+    other = rolling.copy()
+    other.push(2.0)
+    assert rolling.total == 1.0 and other.total == 3.0
+
+
+def test_tracker_risk():
+    tracker = WorkloadTracker()
+    assert tracker.acwr == 0.0 and tracker.risk == 0.0
+    for _ in range(28):
+        tracker.update(1.0, 60)
+    assert np.isclose(tracker.acwr, 1.0) and tracker.risk == 0.0
+    assert np.isclose(tracker.weekly_hours, 7.0)
+    # Semaine surchargée : ratio aigu:chronique au-delà de la zone sûre
+    for _ in range(7):
+        tracker.update(4.0, 60)
+    assert tracker.acwr > 1.3 and tracker.risk > 0.0
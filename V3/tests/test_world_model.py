@@ -0,0 +1,57 @@
+from collections import defaultdict
+
+import pytest
+
+from Dyna import AdvancedDynaQMarathon, train_agent
+from world_model import WorldModel
+
+
+def test_lru_eviction_unlinks_predecessors():
+    model = WorldModel(capacity=2)
+    model.record(('a', 0), 1.0, 'x')
+    model.record(('b', 0), 1.0, 'y')
+    model.record(('a', 0), 1.0, 'x')
+    model.record(('c', 0), 1.0, 'z')
+    assert list(model) == [('a', 0), ('c', 0)]
+    assert model.n_evicted == 1
+    assert 'y' not in model.predecessors
+    assert model.predecessors['x'] == {('a', 0)}
+
+
+def test_priority_eviction_removes_lowest_priority():
+    model = WorldModel(capacity=2, eviction="priority")
+    model.record(('a', 0), 1.0, 'x', priority=5.0)
+    model.record(('b', 0), 1.0, 'y', priority=1.0)
+    model.record(('c', 0), 1.0, 'z', priority=3.0)
+    assert set(model) == {('a', 0), ('c', 0)}
+    # Une priorité relevée protège la transition
+    model.update_priority(('c', 0), 10.0)
+    model.record(('d', 0), 1.0, 'w', priority=6.0)
+    assert set(model) == {('c', 0), ('d', 0)}
+    # Une nouvelle transition moins prioritaire que toutes les autres est évincée aussitôt
+    model.record(('e', 0), 1.0, 'v', priority=0.5)
+    assert set(model) == {('c', 0), ('d', 0)}
+
+
+def test_new_next_state_replaces_predecessor():
+    model = WorldModel()
+    model.record(('a', 0), 1.0, 'x')
+    model.record(('a', 0), 1.0, 'y')
+    assert 'x' not in model.predecessors
+    assert model.predecessors['y'] == {('a', 0)}
+
+
+def test_unknown_eviction_policy():
+    with pytest.raises(ValueError):
+        WorldModel(eviction="fifo")
+
+
+@pytest.mark.parametrize("eviction", WorldModel.EVICTION_POLICIES)
+def test_bounded_agent_keeps_index_consistent(eviction):
+    agent = AdvancedDynaQMarathon(n_planning_steps=5, model_capacity=200, model_eviction=eviction)
+    train_agent(episodes=3, seed=0, agent=agent, verbose=False)
+    assert len(agent.model) == 200 and agent.model.n_evicted > 0
+    expected = defaultdict(set)
+    for state_action, (_, next_state) in agent.model.items():
+        expected[next_state].add(state_action)
+    assert {s: p for s, p in agent.predecessors.items() if p} == dict(expected)
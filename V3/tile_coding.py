@@ -0,0 +1,150 @@
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+# Features continues de MarathonTrainingState utilisées par défaut, avec leurs bornes
+DEFAULT_FEATURES = {
+    'fitness': (0.0, 4.0),
+    'fatigue': (0.0, 2.0),
+    'performance': (-1.0, 1.5),
+    'jours_avant_marathon': (0.0, 120.0),
+}
+
+
+class TileCoder:
+    """
+    Tile coding : `n_tilings` grilles décalées de `n_tiles` cases par dimension.
+    Chaque état active exactement une tuile par grille.
+    """
+    def __init__(self, low: Sequence[float], high: Sequence[float],
+                 n_tiles: int = 6, n_tilings: int = 8):
+        self.low = np.asarray(low, dtype=np.float64)
+        self.high = np.asarray(high, dtype=np.float64)
+        self.n_tiles = n_tiles
+        self.n_tilings = n_tilings
+        self.n_dims = len(self.low)
+
+        self.tile_width = (self.high - self.low) / n_tiles
+        # Décalages asymétriques (1, 3, 5, ...) recommandés pour le tile coding
+        displacement = np.arange(1, 2 * self.n_dims, 2)
+        self.offsets = (np.arange(n_tilings)[:, None] * displacement[None, :] / n_tilings) % 1.0
+
+        # Une case de plus par dimension pour absorber le décalage
+        self.cells_per_dim = n_tiles + 1
+        self.tiles_per_tiling = self.cells_per_dim ** self.n_dims
+        self.n_features = n_tilings * self.tiles_per_tiling
+        self._dim_strides = self.cells_per_dim ** np.arange(self.n_dims - 1, -1, -1)
+        self._tiling_base = np.arange(n_tilings) * self.tiles_per_tiling
+
+    def cells(self, x: np.ndarray) -> np.ndarray:
+        """
+        Cellule élémentaire de x par dimension : intersection des tuiles de toutes les grilles
+        (largeur tile_width / n_tilings). Deux points de la même cellule activent les mêmes tuiles.
+        """
+        x = np.asarray(x, dtype=np.float64)
+        cells = np.floor((x - self.low) / self.tile_width * self.n_tilings).astype(np.int64)
+        # Hors des bornes, toutes les grilles sont saturées : une seule cellule de chaque côté
+        return np.clip(cells, -self.n_tilings, self.n_tiles * self.n_tilings)
+
+    def cell_centers(self, cells: np.ndarray) -> np.ndarray:
+        """Point représentatif (centre) de chaque cellule"""
+        return self.low + (np.asarray(cells, dtype=np.float64) + 0.5) / self.n_tilings * self.tile_width
+
+    def active_tiles(self, x: np.ndarray) -> np.ndarray:
+        """Indices des tuiles actives : (n_tilings,) pour un état, (N, n_tilings) pour un batch"""
+        x = np.asarray(x, dtype=np.float64)
+        scaled = (x - self.low) / self.tile_width
+        # (..., n_tilings, n_dims)
+        coords = np.floor(scaled[..., None, :] + self.offsets).astype(np.int64)
+        coords = np.clip(coords, 0, self.n_tiles)
+        return coords @ self._dim_strides + self._tiling_base
+
+
+class TileCodingQ:
+    """
+    Approximation linéaire de Q par tile coding, utilisable comme backend de
+    valeurs d'AdvancedDynaQMarathon à la place de la table Q.
+
+    La mémoire est fixe : une matrice de poids (n_features, n_actions).
+    Les clés d'état sont les cellules élémentaires du tile coding (TileCoder.cells) :
+    le modèle et l'index des prédécesseurs restent bornés, et l'approximateur ne perd
+    rien puisque tous les points d'une cellule activent les mêmes tuiles. Les valeurs
+    sont évaluées au centre de la cellule.
+    """
+    def __init__(self, action_keys: List[tuple],
+                 features: Dict[str, tuple] = None,
+                 n_tiles: int = 6, n_tilings: int = 8):
+        self.features = dict(features or DEFAULT_FEATURES)
+        self.feature_names = list(self.features)
+        self.action_keys = list(dict.fromkeys(action_keys))
+        self.action_index = {key: i for i, key in enumerate(self.action_keys)}
+
+        low = [bounds[0] for bounds in self.features.values()]
+        high = [bounds[1] for bounds in self.features.values()]
+        self.coder = TileCoder(low, high, n_tiles, n_tilings)
+        self.weights = np.zeros((self.coder.n_features, len(self.action_keys)), dtype=np.float32)
+        # Poids modifiés depuis le dernier checkpoint (masque booléen, None : suivi désactivé)
+        self.changes = None
+
+    def state_key(self, state) -> tuple:
+        """Clé d'état discrète : cellule élémentaire des features continues"""
+        values = [float(getattr(state, name)) for name in self.feature_names]
+        return tuple(self.coder.cells(values).tolist())
+
+    def state_keys(self, values: np.ndarray) -> List[tuple]:
+        """state_key() pour une matrice (N, n_features) de valeurs continues"""
+        return [tuple(row) for row in self.coder.cells(values).tolist()]
+
+    def _tiles(self, state_keys) -> np.ndarray:
+        return self.coder.active_tiles(self.coder.cell_centers(state_keys))
+
+    def values(self, state_key: tuple) -> np.ndarray:
+        """Q(s, ·) pour toutes les actions"""
+        return self.weights[self._tiles(state_key)].sum(axis=0)
+
+    def values_batch(self, state_keys: np.ndarray) -> np.ndarray:
+        """Q(s, ·) pour un batch de clés (N, n_features) -> (N, n_actions)"""
+        return self.weights[self._tiles(state_keys)].sum(axis=1)
+
+    def value(self, state_key: tuple, action_key: tuple) -> float:
+        tiles = self._tiles(state_key)
+        return float(self.weights[tiles, self.action_index[action_key]].sum())
+
+    def max_value(self, state_key: tuple) -> float:
+        return float(self.values(state_key).max())
+
+    def update(self, state_key: tuple, action_key: tuple, target: float, lr: float):
+        """Descente de gradient vers la cible, pas réparti sur les tilings"""
+        tiles = self._tiles(state_key)
+        column = self.action_index[action_key]
+        error = target - self.weights[tiles, column].sum()
+        self.weights[tiles, column] += lr / self.coder.n_tilings * error
+        if self.changes is not None:
+            self.changes[tiles, column] = True
+
+    def update_batch(self, state_keys: np.ndarray, columns: np.ndarray, targets: np.ndarray, lr: float):
+        """update() pour un batch de clés (N, n_features), en une passe : erreurs calculées avant l'application"""
+        tiles = self._tiles(state_keys)
+        columns = np.asarray(columns)[:, None]
+        errors = np.asarray(targets) - self.weights[tiles, columns].sum(axis=1)
+        np.add.at(self.weights, (tiles, columns), (lr / self.coder.n_tilings * errors)[:, None])
+        if self.changes is not None:
+            self.changes[tiles, columns] = True
+
+    @property
+    def nbytes(self) -> int:
+        return self.weights.nbytes
+
+    def to_dict(self) -> Dict:
+        return {
+            'action_keys': [list(key) for key in self.action_keys],
+            'features': {name: list(bounds) for name, bounds in self.features.items()},
+            'n_tiles': self.coder.n_tiles,
+            'n_tilings': self.coder.n_tilings,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "TileCodingQ":
+        return cls([tuple(key) for key in data['action_keys']],
+                   {name: tuple(bounds) for name, bounds in data['features'].items()},
+                   data['n_tiles'], data['n_tilings'])
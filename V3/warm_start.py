@@ -0,0 +1,142 @@
+import csv
+import time
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from Dyna import AdvancedDynaQMarathon, MarathonEnvironment, TrainingAction, TrainingType
+
+# Colonnes minimales d'un journal de séances (celles de plan_marathon.csv) ; les colonnes
+# optionnelles athlete_id, intensite et les paramètres de Banister sont utilisées si présentes
+REQUIRED_COLUMNS = ('type', 'duree', 'zone_fc')
+ATHLETE_PARAM_COLUMNS = ('tau_fitness', 'tau_fatigue', 'k_fitness', 'k_fatigue')
+
+
+def read_session_logs(paths: Iterable[str], chunk_size: int = 10000) -> Iterator[List[Dict]]:
+    """Lit un ou plusieurs journaux CSV par blocs de chunk_size lignes"""
+    if isinstance(paths, str):
+        paths = [paths]
+    for path in paths:
+        with open(path, newline='') as f:
+            reader = csv.DictReader(f)
+            missing = [c for c in REQUIRED_COLUMNS if c not in (reader.fieldnames or [])]
+            if missing:
+                raise ValueError(f"{path} : colonnes manquantes {missing}")
+            chunk = []
+            for row in reader:
+                chunk.append(row)
+                if len(chunk) >= chunk_size:
+                    yield chunk
+                    chunk = []
+            if chunk:
+                yield chunk
+
+
+class LogReplayer:
+    """
+    Rejoue des journaux de séances dans MarathonEnvironment pour produire des transitions
+    (clé d'état, clé d'action, récompense, clé d'état suivant) au format de l'agent.
+
+    Chaque athlète garde son environnement d'un bloc à l'autre ; un nouvel épisode
+    commence quand `jour` repart en arrière ou quand le marathon est atteint.
+    Les séances hors du catalogue d'actions font avancer l'état sans produire de transition.
+    """
+    def __init__(self, agent: AdvancedDynaQMarathon):
+        self.agent = agent
+        # Séance du journal -> action canonique de l'agent
+        self.canonical = {}
+        for action in agent.actions:
+            for variant in agent.action_variants.get(action.discretize(), [action]):
+                self.canonical.setdefault((variant.type, variant.duree, variant.zone_fc, variant.intensite), action)
+                self.canonical.setdefault((variant.type, variant.duree, variant.zone_fc, None), action)
+        self.athletes = {}
+        self.n_sessions = 0
+        self.n_skipped = 0
+        self.n_episodes = 0
+
+    def _athlete(self, athlete_id: str, row: Dict):
+        if athlete_id not in self.athletes:
+            params = {name: float(row[name]) for name in ATHLETE_PARAM_COLUMNS if row.get(name)}
+            self.athletes[athlete_id] = {'env': MarathonEnvironment(params), 'state': None, 'jour': None}
+        return self.athletes[athlete_id]
+
+    def _session(self, row: Dict) -> Tuple[TrainingAction, bool]:
+        """Action jouée pour une ligne, et si elle appartient au catalogue de l'agent"""
+        training_type = TrainingType(row['type'])
+        duree = int(float(row['duree']))
+        zone_fc = int(float(row['zone_fc']))
+        intensite = float(row['intensite']) if row.get('intensite') else None
+        canonical = self.canonical.get((training_type, duree, zone_fc, intensite)) \
+            or self.canonical.get((training_type, duree, zone_fc, None))
+        if canonical is not None:
+            return canonical, True
+        return TrainingAction(training_type, duree, intensite or 0.0, zone_fc), False
+
+    def replay(self, rows: List[Dict]) -> List[Tuple[tuple, tuple, float, tuple]]:
+        transitions = []
+        for row in rows:
+            athlete = self._athlete(row.get('athlete_id', ''), row)
+            env = athlete['env']
+            jour = int(float(row['jour'])) if row.get('jour') else None
+            new_episode = athlete['state'] is None or athlete['state'].jours_avant_marathon <= 0 or \
+                (jour is not None and athlete['jour'] is not None and jour <= athlete['jour'])
+            if new_episode:
+                athlete['state'] = env.reset()
+                self.n_episodes += 1
+            athlete['jour'] = jour
+
+            action, known = self._session(row)
+            state = athlete['state']
+            next_state, reward, _ = env.step(action)
+            # L'historique de l'environnement n'est pas utile ici : mémoire bornée par athlète
+            env.history.clear()
+            athlete['state'] = next_state
+            self.n_sessions += 1
+            if not known:
+                self.n_skipped += 1
+                continue
+            transitions.append((self.agent.state_key(state), action.discretize(),
+                                reward, self.agent.state_key(next_state)))
+        return transitions
+
+
+def warm_start(agent: AdvancedDynaQMarathon, paths: Iterable[str], chunk_size: int = 10000,
+               max_sweeps: int = None, sweeps_per_transition: float = 10.0,
+               verbose: bool = True) -> Dict:
+    """
+    Pré-entraîne l'agent sur des journaux historiques avant tout épisode en ligne :
+    les transitions rejouées sont chargées en bloc (modèle, prédécesseurs, file de priorité),
+    puis un balayage prioritaire est lancé jusqu'à vider la file, dans la limite de
+    max_sweeps balayages (par défaut sweeps_per_transition par transition chargée).
+    """
+    start = time.perf_counter()
+    replayer = LogReplayer(agent)
+    n_transitions = 0
+    for chunk in read_session_logs(paths, chunk_size):
+        n_transitions += agent.bulk_record(replayer.replay(chunk))
+        if verbose:
+            print(f"{replayer.n_sessions} séances rejouées, {len(agent.model)} transitions dans le modèle")
+    load_seconds = time.perf_counter() - start
+
+    if max_sweeps is None:
+        max_sweeps = int(sweeps_per_transition * n_transitions)
+    n_sweeps = 0
+    while n_sweeps < max_sweeps:
+        if not agent.sweep_once():
+            break
+        n_sweeps += 1
+    agent.total_planning_sweeps += n_sweeps
+
+    report = {
+        'sessions': replayer.n_sessions,
+        'episodes': replayer.n_episodes,
+        'athletes': len(replayer.athletes),
+        'transitions': n_transitions,
+        'skipped_sessions': replayer.n_skipped,
+        'model_size': len(agent.model),
+        'sweeps': n_sweeps,
+        'load_seconds': load_seconds,
+        'total_seconds': time.perf_counter() - start,
+    }
+    if verbose:
+        print(f"Démarrage à chaud : {n_transitions} transitions, {n_sweeps} balayages "
+              f"en {report['total_seconds']:.1f} s")
+    return report
@@ -0,0 +1,137 @@
+import json
+import os
+from typing import Tuple
+
+import numpy as np
+
+# Codes des conditions, dans l'ordre de WeatherCondition
+CONDITION_VALUES = ("ideal", "chaud", "froid", "pluie", "vent")
+IDEAL, CHAUD, FROID, PLUIE, VENT = range(len(CONDITION_VALUES))
+
+# Matrices de transition de Markov entre conditions, en hiver et en été
+# (interpolées selon la saison du jour)
+TRANSITIONS_HIVER = np.array([
+    [0.55, 0.00, 0.20, 0.15, 0.10],
+    [0.50, 0.30, 0.00, 0.10, 0.10],
+    [0.25, 0.00, 0.55, 0.10, 0.10],
+    [0.30, 0.00, 0.20, 0.40, 0.10],
+    [0.35, 0.00, 0.15, 0.15, 0.35],
+])
+TRANSITIONS_ETE = np.array([
+    [0.60, 0.20, 0.00, 0.10, 0.10],
+    [0.30, 0.55, 0.00, 0.10, 0.05],
+    [0.60, 0.10, 0.10, 0.10, 0.10],
+    [0.45, 0.10, 0.00, 0.35, 0.10],
+    [0.45, 0.10, 0.00, 0.10, 0.35],
+])
+
+# Effet de chaque condition sur la température du jour (°C) et sur la charge
+TEMPERATURE_OFFSETS = np.array([0.0, 6.0, -6.0, -2.0, -1.0])
+LOAD_FACTORS = np.array([1.0, 1.15, 1.05, 1.05, 1.1])
+
+
+def seasonal_temperature(day_of_year: np.ndarray, mean: float = 12.0,
+                         amplitude: float = 10.0, peak_day: int = 200) -> np.ndarray:
+    """Température moyenne saisonnière (pic en été)"""
+    return mean + amplitude * np.cos(2 * np.pi * (day_of_year - peak_day) / 365)
+
+
+def weather_load_factor(conditions: np.ndarray, temperature: np.ndarray) -> np.ndarray:
+    """Multiplicateur de charge : condition, plus 1 % par degré au-dessus de 25 °C"""
+    return LOAD_FACTORS[conditions] * (1 + 0.01 * np.maximum(np.asarray(temperature) - 25.0, 0.0))
+
+
+def _generate_chunk(rng: np.random.Generator, n: int, n_days: int):
+    start_day = rng.integers(0, 365, size=n)
+    days = (start_day[:, None] + np.arange(n_days)) % 365
+    season = (1 + np.cos(2 * np.pi * (days - 200) / 365)) / 2  # 0 en hiver, 1 en été
+
+    conditions = np.empty((n, n_days), dtype=np.int8)
+    current = np.full(n, IDEAL)
+    cumulative_hiver = np.cumsum(TRANSITIONS_HIVER, axis=1)
+    cumulative_ete = np.cumsum(TRANSITIONS_ETE, axis=1)
+    for t in range(n_days):
+        w = season[:, t:t + 1]
+        cumulative = (1 - w) * cumulative_hiver[current] + w * cumulative_ete[current]
+        u = rng.random((n, 1))
+        current = np.minimum((u > cumulative).sum(axis=1), len(CONDITION_VALUES) - 1)
+        conditions[:, t] = current
+
+    # Bruit AR(1) autour de la température saisonnière
+    noise = np.empty((n, n_days))
+    noise[:, 0] = rng.normal(0, 2.0, size=n)
+    eps = rng.normal(0, 1.2, size=(n, n_days))
+    for t in range(1, n_days):
+        noise[:, t] = 0.8 * noise[:, t - 1] + eps[:, t]
+    temperature = seasonal_temperature(days) + TEMPERATURE_OFFSETS[conditions] + noise
+    return conditions, temperature.astype(np.float32)
+
+
+class WeatherBank:
+    """
+    Banque précalculée de scénarios météo (condition + température sur n_days jours),
+    stockée dans des fichiers .npy ouverts en mémoire partagée (memory-map).
+    Un scénario est choisi par la graine de l'épisode : tous les processus qui
+    ouvrent la même banque voient les mêmes scénarios.
+    """
+    def __init__(self, directory: str):
+        self.directory = directory
+        with open(os.path.join(directory, "meta.json")) as f:
+            self.meta = json.load(f)
+        self.conditions = np.load(os.path.join(directory, "conditions.npy"), mmap_mode='r')
+        self.temperature = np.load(os.path.join(directory, "temperature.npy"), mmap_mode='r')
+        self.load_factor = np.load(os.path.join(directory, "load_factor.npy"), mmap_mode='r')
+
+    def __len__(self) -> int:
+        return self.conditions.shape[0]
+
+    @property
+    def n_days(self) -> int:
+        return self.conditions.shape[1]
+
+    def scenario(self, seed: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Conditions, températures et facteurs de charge du scénario associé à la graine"""
+        index = seed % len(self)
+        return self.conditions[index], self.temperature[index], self.load_factor[index]
+
+    @classmethod
+    def generate(cls, directory: str, n_scenarios: int = 10000, n_days: int = 121,
+                 seed: int = 0, chunk_size: int = 4096) -> "WeatherBank":
+        """Génère la banque par blocs (mémoire bornée) directement dans les fichiers"""
+        os.makedirs(directory, exist_ok=True)
+        open_memmap = np.lib.format.open_memmap
+        conditions = open_memmap(os.path.join(directory, "conditions.npy"), mode='w+',
+                                 dtype=np.int8, shape=(n_scenarios, n_days))
+        temperature = open_memmap(os.path.join(directory, "temperature.npy"), mode='w+',
+                                  dtype=np.float32, shape=(n_scenarios, n_days))
+        load_factor = open_memmap(os.path.join(directory, "load_factor.npy"), mode='w+',
+                                  dtype=np.float32, shape=(n_scenarios, n_days))
+
+        rng = np.random.default_rng(seed)
+        for start in range(0, n_scenarios, chunk_size):
+            stop = min(start + chunk_size, n_scenarios)
+            chunk_conditions, chunk_temperature = _generate_chunk(rng, stop - start, n_days)
+            conditions[start:stop] = chunk_conditions
+            temperature[start:stop] = chunk_temperature
+            load_factor[start:stop] = weather_load_factor(chunk_conditions, chunk_temperature)
+        for array in (conditions, temperature, load_factor):
+            array.flush()
+        del conditions, temperature, load_factor
+
+        # Les métadonnées sont écrites en dernier : leur présence marque une banque complète
+        with open(os.path.join(directory, "meta.json"), 'w') as f:
+            json.dump({'n_scenarios': n_scenarios, 'n_days': n_days, 'seed': seed}, f)
+        return cls(directory)
+
+    @classmethod
+    def get_or_create(cls, directory: str, n_scenarios: int = 10000, n_days: int = 121,
+                      seed: int = 0) -> "WeatherBank":
+        """Ouvre la banque si elle existe avec les mêmes paramètres, sinon la génère"""
+        meta_path = os.path.join(directory, "meta.json")
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+            if meta == {'n_scenarios': n_scenarios, 'n_days': n_days, 'seed': seed}:
+                return cls(directory)
+            os.remove(meta_path)
+        return cls.generate(directory, n_scenarios, n_days, seed)
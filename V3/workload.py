@@ -0,0 +1,92 @@
+from typing import Tuple, Union
+
+import numpy as np
+
+ArrayLike = Union[float, np.ndarray]
+
+# Zone de charge "sûre" du ratio aigu:chronique ; au-delà le risque croît linéairement
+ACWR_SAFE_MAX = 1.3
+ACWR_DANGER = 2.0
+
+
+class RollingSum:
+    """
+    Somme glissante sur `window` jours dans un tampon circulaire, mise à jour en O(1).
+    Fonctionne pour un athlète (shape=()) ou un batch d'athlètes (shape=(N,)).
+    """
+    def __init__(self, window: int, shape: Tuple[int, ...] = ()):
+        self.window = window
+        self.buffer = np.zeros((window,) + tuple(shape))
+        self.total = np.zeros(shape)
+        self.position = 0
+        self.count = 0
+
+    def push(self, value: ArrayLike):
+        self.total = self.total + value - self.buffer[self.position]
+        self.buffer[self.position] = value
+        self.position = (self.position + 1) % self.window
+        # Le compteur peut être propre à chaque athlète (batch chargé depuis des états à des jours différents)
+        self.count = np.minimum(self.count + 1, self.window) if np.ndim(self.count) else min(self.count + 1, self.window)
+        # Recalcul exact une fois par tour pour éviter la dérive numérique (coût amorti O(1))
+        if self.position == 0:
+            self.total = self.buffer.sum(axis=0)
+
+    @property
+    def mean(self) -> ArrayLike:
+        return self.total / (np.maximum(self.count, 1) if np.ndim(self.count) else max(self.count, 1))
+
+    def copy(self) -> "RollingSum":
+        other = RollingSum.__new__(RollingSum)
+        other.window = self.window
+        other.buffer = self.buffer.copy()
+        other.total = np.copy(self.total)
+        other.position = self.position
+        other.count = np.copy(self.count) if np.ndim(self.count) else self.count
+        return other
+
+
+def acute_chronic_ratio(acute_mean: ArrayLike, chronic_mean: ArrayLike) -> ArrayLike:
+    """Ratio charge aiguë (7 j) / charge chronique (28 j) ; 0 sans charge chronique"""
+    chronic_mean = np.asarray(chronic_mean, dtype=np.float64)
+    safe = np.where(chronic_mean > 0, chronic_mean, 1.0)
+    return np.where(chronic_mean > 0, np.asarray(acute_mean) / safe, 0.0)
+
+
+def injury_risk(acwr: ArrayLike) -> ArrayLike:
+    """Risque de blessure (0-1), nul dans la zone sûre puis linéaire jusqu'à ACWR_DANGER"""
+    return np.clip((np.asarray(acwr) - ACWR_SAFE_MAX) / (ACWR_DANGER - ACWR_SAFE_MAX), 0.0, 1.0)
+
+
+class WorkloadTracker:
+    """
+    Charges glissantes 7 j et 28 j et volume hebdomadaire, pour un athlète ou un batch.
+    Chaque jour coûte O(1), sans reparcourir l'historique.
+    """
+    def __init__(self, shape: Tuple[int, ...] = ()):
+        self.acute = RollingSum(7, shape)
+        self.chronic = RollingSum(28, shape)
+        self.volume = RollingSum(7, shape)
+
+    def update(self, load: ArrayLike, minutes: ArrayLike):
+        self.acute.push(load)
+        self.chronic.push(load)
+        self.volume.push(minutes)
+
+    @property
+    def acwr(self) -> ArrayLike:
+        return acute_chronic_ratio(self.acute.mean, self.chronic.mean)
+
+    @property
+    def risk(self) -> ArrayLike:
+        return injury_risk(self.acwr)
+
+    @property
+    def weekly_hours(self) -> ArrayLike:
+        return self.volume.total / 60
+
+    def copy(self) -> "WorkloadTracker":
+        other = WorkloadTracker.__new__(WorkloadTracker)
+        other.acute = self.acute.copy()
+        other.chronic = self.chronic.copy()
+        other.volume = self.volume.copy()
+        return other
@@ -0,0 +1,92 @@
+import heapq
+import itertools
+from collections import OrderedDict, defaultdict
+from typing import Dict, Set, Tuple
+
+
+class WorldModel(OrderedDict):
+    """
+    Modèle du monde de Dyna : (état, action) -> (récompense, état suivant).
+
+    Se comporte comme un dict. Avec une capacité, les transitions sont évincées
+    selon la politique choisie :
+      - "lru" : la transition visitée le moins récemment
+      - "priority" : la transition de plus faible erreur TD
+    L'index des prédécesseurs partagé avec l'agent reste cohérent à chaque éviction.
+    """
+    EVICTION_POLICIES = ("lru", "priority")
+
+    def __init__(self, capacity: int = None, eviction: str = "lru",
+                 predecessors: Dict[tuple, Set[Tuple]] = None):
+        super().__init__()
+        if eviction not in self.EVICTION_POLICIES:
+            raise ValueError(f"Politique d'éviction inconnue : {eviction}")
+        self.capacity = capacity
+        self.eviction = eviction
+        self.predecessors = predecessors if predecessors is not None else defaultdict(set)
+        self.priorities = {}
+        self.n_evicted = 0
+        # Transitions ajoutées, modifiées ou retirées depuis le dernier checkpoint (None : suivi désactivé)
+        self.changes = None
+        # Tas à suppression paresseuse pour la politique "priority"
+        self._heap = []
+        self._counter = itertools.count()
+
+    def record(self, state_action: Tuple, reward: float, next_state: tuple,
+               priority: float = 0.0):
+        """Enregistre une transition réelle et met à jour les prédécesseurs"""
+        previous = self.get(state_action)
+        if previous is not None and previous[1] != next_state:
+            self._unlink(state_action, previous[1])
+
+        self[state_action] = (reward, next_state)
+        self.move_to_end(state_action)
+        if self.changes is not None:
+            self.changes.add(state_action)
+        self.predecessors[next_state].add(state_action)
+        self.update_priority(state_action, priority)
+
+        if self.capacity is not None:
+            while len(self) > self.capacity:
+                self._evict()
+
+    def update_priority(self, state_action: Tuple, priority: float):
+        """Mémorise la dernière erreur TD d'une transition (utilisée par l'éviction)"""
+        if state_action not in self:
+            return
+        self.priorities[state_action] = priority
+        if self.changes is not None:
+            self.changes.add(state_action)
+        if self.eviction == "priority":
+            heapq.heappush(self._heap, (priority, next(self._counter), state_action))
+            # Éviter que le tas ne grossisse indéfiniment avec les entrées périmées
+            if len(self._heap) > 4 * len(self) + 64:
+                self._heap = [(p, next(self._counter), sa) for sa, p in self.priorities.items()]
+                heapq.heapify(self._heap)
+
+    def _unlink(self, state_action: Tuple, next_state: tuple):
+        predecessors = self.predecessors.get(next_state)
+        if predecessors is not None:
+            predecessors.discard(state_action)
+            if not predecessors:
+                del self.predecessors[next_state]
+
+    def _evict(self):
+        if self.eviction == "lru":
+            state_action = next(iter(self))
+        else:
+            while True:
+                priority, _, state_action = heapq.heappop(self._heap)
+                # Entrée périmée : transition déjà évincée ou priorité modifiée depuis
+                if self.priorities.get(state_action) == priority:
+                    break
+        self.remove(state_action)
+        self.n_evicted += 1
+
+    def remove(self, state_action: Tuple):
+        """Retire une transition du modèle et de l'index des prédécesseurs"""
+        _, next_state = self.pop(state_action)
+        if self.changes is not None:
+            self.changes.add(state_action)
+        self.priorities.pop(state_action, None)
+        self._unlink(state_action, next_state)
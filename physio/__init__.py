@@ -0,0 +1,2 @@
+from .banister import BanisterEngine, get_engine, performance, forme
+from .fitting import BanisterFit, fit_banister, impulse_response
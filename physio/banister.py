@@ -0,0 +1,96 @@
+from functools import lru_cache
+from typing import Tuple, Union
+
+import numpy as np
+
+ArrayLike = Union[float, np.ndarray]
+
+
+def performance(fitness: ArrayLike, fatigue: ArrayLike) -> ArrayLike:
+    """Performance = (Fitness - Fatigue)/2"""
+    return (fitness - fatigue) / 2
+
+
+def forme(fitness: ArrayLike, fatigue: ArrayLike) -> ArrayLike:
+    """Forme = Fitness - 2*Fatigue"""
+    return fitness - 2 * fatigue
+
+
+class BanisterEngine:
+    """
+    Modèle impulsion-réponse de Banister (fitness / fatigue) partagé par V2 et V3.
+
+    Les constantes de décroissance exp(-1/tau) sont calculées une seule fois.
+    Les paramètres peuvent être des scalaires ou des tableaux (un par athlète),
+    diffusés (broadcast) sur la dimension athlète des entrées batchées.
+    """
+    def __init__(self,
+                 tau_fitness: ArrayLike = 45,
+                 tau_fatigue: ArrayLike = 15,
+                 k_fitness: ArrayLike = 1.0,
+                 k_fatigue: ArrayLike = 1.0):
+        self.tau_fitness = np.asarray(tau_fitness, dtype=np.float64)
+        self.tau_fatigue = np.asarray(tau_fatigue, dtype=np.float64)
+        self.k_fitness = np.asarray(k_fitness, dtype=np.float64)
+        self.k_fatigue = np.asarray(k_fatigue, dtype=np.float64)
+
+        # Constantes de décroissance précalculées
+        self.decay_fitness = np.exp(-1 / self.tau_fitness)
+        self.decay_fatigue = np.exp(-1 / self.tau_fatigue)
+
+        # Chemin rapide en flottants python quand tous les paramètres sont scalaires
+        params = (self.decay_fitness, self.decay_fatigue, self.k_fitness, self.k_fatigue)
+        if all(p.ndim == 0 for p in params):
+            self._scalar_params = tuple(float(p) for p in params)
+        else:
+            self._scalar_params = None
+
+    @property
+    def n_athletes(self) -> int:
+        """Nombre d'athlètes décrits par les paramètres (1 si scalaires)"""
+        shape = np.broadcast_shapes(self.decay_fitness.shape, self.decay_fatigue.shape,
+                                    self.k_fitness.shape, self.k_fatigue.shape)
+        return int(np.prod(shape)) if shape else 1
+
+    def step(self, fitness: float, fatigue: float, effort: float) -> Tuple[float, float]:
+        """Mise à jour d'un seul jour pour un seul athlète (paramètres scalaires)"""
+        if self._scalar_params is None:
+            raise ValueError("step() requiert des paramètres scalaires, utiliser step_batch()")
+        decay_fitness, decay_fatigue, k_fitness, k_fatigue = self._scalar_params
+        return (k_fitness * effort + decay_fitness * fitness,
+                k_fatigue * effort + decay_fatigue * fatigue)
+
+    def step_batch(self, fitness: np.ndarray, fatigue: np.ndarray,
+                   effort: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Mise à jour d'un jour pour un batch d'athlètes, shape (N,)"""
+        effort = np.asarray(effort, dtype=np.float64)
+        new_fitness = self.k_fitness * effort + self.decay_fitness * fitness
+        new_fatigue = self.k_fatigue * effort + self.decay_fatigue * fatigue
+        return new_fitness, new_fatigue
+
+    def rollout(self, efforts: np.ndarray,
+                fitness0: ArrayLike = 0.0,
+                fatigue0: ArrayLike = 0.0) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Trajectoire complète : efforts de shape (T,) ou (N, T).
+        Retourne fitness et fatigue après chaque jour, même shape que efforts.
+        """
+        efforts = np.asarray(efforts, dtype=np.float64)
+        fitness = np.empty_like(efforts)
+        fatigue = np.empty_like(efforts)
+
+        fit = np.asarray(fitness0, dtype=np.float64)
+        fat = np.asarray(fatigue0, dtype=np.float64)
+        # Boucle sur le temps uniquement, vectorisée sur les athlètes
+        for t in range(efforts.shape[-1]):
+            fit, fat = self.step_batch(fit, fat, efforts[..., t])
+            fitness[..., t] = fit
+            fatigue[..., t] = fat
+        return fitness, fatigue
+
+
+@lru_cache(maxsize=1024)
+def get_engine(tau_fitness: float = 45, tau_fatigue: float = 15,
+               k_fitness: float = 1.0, k_fatigue: float = 1.0) -> BanisterEngine:
+    """Moteur scalaire partagé pour un jeu de paramètres donné"""
+    return BanisterEngine(tau_fitness, tau_fatigue, k_fitness, k_fatigue)
@@ -0,0 +1,159 @@
+from dataclasses import dataclass
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from .banister import BanisterEngine
+
+# Grilles initiales (jours), géométriques ; affinées ensuite autour du meilleur couple
+TAU_FITNESS_GRID = np.geomspace(20, 80, 12)
+TAU_FATIGUE_GRID = np.geomspace(4, 30, 10)
+
+
+@dataclass
+class BanisterFit:
+    """
+    Paramètres de Banister ajustés, un élément par athlète.
+
+    Modèle : performance(t) = p0 + (k_fitness * F_t - k_fatigue * G_t) / 2, où F et G
+    sont les réponses impulsionnelles de la charge avec tau_fitness et tau_fatigue
+    (même convention que MarathonTrainingState.performance).
+    """
+    tau_fitness: np.ndarray
+    tau_fatigue: np.ndarray
+    k_fitness: np.ndarray
+    k_fatigue: np.ndarray
+    p0: np.ndarray
+    rmse: np.ndarray
+    n_observations: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.tau_fitness)
+
+    def athlete_params(self, i: int) -> Dict[str, float]:
+        """Paramètres de l'athlète i, au format de MarathonEnvironment(athlete_params=...)"""
+        return {
+            'tau_fitness': float(self.tau_fitness[i]),
+            'tau_fatigue': float(self.tau_fatigue[i]),
+            'k_fitness': float(self.k_fitness[i]),
+            'k_fatigue': float(self.k_fatigue[i]),
+        }
+
+    def all_athlete_params(self) -> List[Dict[str, float]]:
+        return [self.athlete_params(i) for i in range(len(self))]
+
+
+def impulse_response(loads: np.ndarray, tau: np.ndarray) -> np.ndarray:
+    """Réponse (gain 1, départ à 0) de chaque série de charges (N, T) ; tau scalaire ou (N,)"""
+    tau = np.asarray(tau, dtype=np.float64)
+    response, _ = BanisterEngine(tau_fitness=tau, tau_fatigue=tau).rollout(loads)
+    return response
+
+
+def _solve_gains(fitness_resp: np.ndarray, fatigue_resp: np.ndarray,
+                 perf: np.ndarray, mask: np.ndarray):
+    """
+    Moindres carrés par athlète pour (p0, c_fitness, c_fatigue), tau fixés :
+    équations normales 3x3 batchées. Retourne les coefficients (N, 3) et la somme
+    des carrés des résidus (N,).
+    """
+    ones = mask.astype(np.float64)
+    columns = (ones, fitness_resp * ones, -fatigue_resp * ones)
+    gram = np.empty(perf.shape[:1] + (3, 3))
+    for i in range(3):
+        for j in range(i, 3):
+            gram[:, i, j] = gram[:, j, i] = np.einsum('nt,nt->n', columns[i], columns[j])
+    rhs = np.stack([np.einsum('nt,nt->n', column, perf) for column in columns], axis=1)
+
+    # Régularisation minime : athlètes sans charge ou sans observation
+    ridge = 1e-9 * (np.trace(gram, axis1=1, axis2=2) + 1.0)
+    gram = gram + ridge[:, None, None] * np.eye(3)
+    coefs = np.linalg.solve(gram, rhs[..., None])[..., 0]
+    sse = np.einsum('nt,nt->n', perf, perf) - np.einsum('nk,nk->n', coefs, rhs)
+    return coefs, np.maximum(sse, 0.0)
+
+
+def _fit_chunk(loads: np.ndarray, perf: np.ndarray, mask: np.ndarray,
+               tau_fitness_grid: np.ndarray, tau_fatigue_grid: np.ndarray,
+               refine_rounds: int):
+    n = loads.shape[0]
+    best_sse = np.full(n, np.inf)
+    best_tau = np.zeros((n, 2))
+    best_coefs = np.zeros((n, 3))
+
+    def consider(tau_fit, tau_fat, fitness_resp, fatigue_resp):
+        coefs, sse = _solve_gains(fitness_resp, fatigue_resp, perf, mask)
+        # La fatigue doit décroître plus vite que la fitness
+        sse = np.where(np.broadcast_to(tau_fit, (n,)) > np.broadcast_to(tau_fat, (n,)), sse, np.inf)
+        better = sse < best_sse
+        best_sse[better] = sse[better]
+        best_tau[better, 0] = np.broadcast_to(tau_fit, (n,))[better]
+        best_tau[better, 1] = np.broadcast_to(tau_fat, (n,))[better]
+        best_coefs[better] = coefs[better]
+
+    # 1. Grille commune : une réponse par valeur de tau, partagée par tous les couples
+    fitness_resps = [impulse_response(loads, tau) for tau in tau_fitness_grid]
+    fatigue_resps = [impulse_response(loads, tau) for tau in tau_fatigue_grid]
+    for tau_fit, fitness_resp in zip(tau_fitness_grid, fitness_resps):
+        for tau_fat, fatigue_resp in zip(tau_fatigue_grid, fatigue_resps):
+            consider(tau_fit, tau_fat, fitness_resp, fatigue_resp)
+    del fitness_resps, fatigue_resps
+
+    # 2. Affinage local en échelle log, tau propres à chaque athlète
+    step = np.log(tau_fitness_grid[1] / tau_fitness_grid[0]) if len(tau_fitness_grid) > 1 else 0.2
+    for _ in range(refine_rounds):
+        step /= 2
+        center = best_tau.copy()
+        factors = np.exp(step * np.array([-1.0, 0.0, 1.0]))
+        fitness_cands = [(center[:, 0] * f, impulse_response(loads, center[:, 0] * f)) for f in factors]
+        fatigue_cands = [(center[:, 1] * f, impulse_response(loads, center[:, 1] * f)) for f in factors]
+        for tau_fit, fitness_resp in fitness_cands:
+            for tau_fat, fatigue_resp in fatigue_cands:
+                consider(tau_fit, tau_fat, fitness_resp, fatigue_resp)
+
+    return best_tau, best_coefs, best_sse
+
+
+def fit_banister(loads: np.ndarray, performances: np.ndarray,
+                 tau_fitness_grid: Sequence[float] = TAU_FITNESS_GRID,
+                 tau_fatigue_grid: Sequence[float] = TAU_FATIGUE_GRID,
+                 refine_rounds: int = 4, chunk_size: int = 2048) -> BanisterFit:
+    """
+    Ajuste tau_fitness, tau_fatigue, k_fitness, k_fatigue (et p0) pour N athlètes à la fois.
+
+    loads : charges quotidiennes (N, T) ; performances : performances mesurées (N, T),
+    NaN pour les jours sans mesure. Les gains sont obtenus par moindres carrés exacts
+    pour chaque couple (tau_fitness, tau_fatigue) ; les tau par recherche sur grille
+    commune puis affinage local, le tout vectorisé sur les athlètes (par blocs de
+    chunk_size pour borner la mémoire).
+    """
+    loads = np.atleast_2d(np.asarray(loads, dtype=np.float64))
+    performances = np.atleast_2d(np.asarray(performances, dtype=np.float64))
+    if loads.shape != performances.shape:
+        raise ValueError(f"Shapes incompatibles : charges {loads.shape}, performances {performances.shape}")
+
+    mask = ~np.isnan(performances)
+    perf = np.where(mask, performances, 0.0)
+    tau_fitness_grid = np.asarray(tau_fitness_grid, dtype=np.float64)
+    tau_fatigue_grid = np.asarray(tau_fatigue_grid, dtype=np.float64)
+
+    n = loads.shape[0]
+    taus = np.empty((n, 2))
+    coefs = np.empty((n, 3))
+    sse = np.empty(n)
+    for start in range(0, n, chunk_size):
+        chunk = slice(start, min(start + chunk_size, n))
+        taus[chunk], coefs[chunk], sse[chunk] = _fit_chunk(
+            loads[chunk], perf[chunk], mask[chunk], tau_fitness_grid, tau_fatigue_grid, refine_rounds)
+
+    n_observations = mask.sum(axis=1)
+    return BanisterFit(
+        tau_fitness=taus[:, 0],
+        tau_fatigue=taus[:, 1],
+        # performance = p0 + (k_fitness * F - k_fatigue * G) / 2
+        k_fitness=2 * coefs[:, 1],
+        k_fatigue=2 * coefs[:, 2],
+        p0=coefs[:, 0],
+        rmse=np.sqrt(sse / np.maximum(n_observations, 1)),
+        n_observations=n_observations,
+    )